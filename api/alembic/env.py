@@ -14,8 +14,8 @@ from app.models import User, Lesson, LessonCompletion
 # access to the values within the .ini file in use.
 config = context.config
 
-# Override database URL with environment variable if available
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Override database URL with the one passed by app.migrations, or the environment
+DATABASE_URL = config.attributes.get("database_url") or os.getenv("DATABASE_URL")
 if DATABASE_URL:
     # Fix for Render: Convert postgresql:// to postgresql+asyncpg://
     if DATABASE_URL.startswith("postgresql://"):
@@ -0,0 +1,40 @@
+"""Add case-insensitive unique indexes on user email and username
+
+Revision ID: 4f6b9e2d1c38
+Revises: d2a8c41f7e93
+Create Date: 2026-10-19 15:03:41.227604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f6b9e2d1c38'
+down_revision = 'd2a8c41f7e93'
+branch_labels = None
+depends_on = None
+
+
+def _check_case_conflicts(column: str) -> None:
+    """Refuse to migrate while accounts differ only by case."""
+    conflicts = op.get_bind().execute(sa.text(
+        f'SELECT lower({column}) FROM "user" GROUP BY lower({column}) HAVING count(*) > 1'
+    )).scalars().all()
+    if conflicts:
+        raise RuntimeError(
+            f"Cannot add case-insensitive index: {len(conflicts)} {column} values differ only by case "
+            f"(e.g. {conflicts[0]!r}). Merge or rename these accounts first."
+        )
+
+
+def upgrade() -> None:
+    _check_case_conflicts('email')
+    _check_case_conflicts('username')
+    op.create_index('ix_user_email_lower', 'user', [sa.text('lower(email)')], unique=True)
+    op.create_index('ix_user_username_lower', 'user', [sa.text('lower(username)')], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_username_lower', table_name='user')
+    op.drop_index('ix_user_email_lower', table_name='user')
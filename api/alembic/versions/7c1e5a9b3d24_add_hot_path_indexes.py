@@ -0,0 +1,49 @@
+"""Add hot-path indexes on lesson and lessoncompletion
+
+Revision ID: 7c1e5a9b3d24
+Revises: 4f6b9e2d1c38
+Create Date: 2026-10-19 15:47:12.804431
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e5a9b3d24'
+down_revision = '4f6b9e2d1c38'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_lesson_is_published_order', 'lesson', ['is_published', 'order']),
+    ('ix_lesson_module_number_order', 'lesson', ['module_number', 'order']),
+    ('ix_lesson_order', 'lesson', ['order']),
+    ('ix_lessoncompletion_user_id_lesson_id', 'lessoncompletion', ['user_id', 'lesson_id']),
+    ('ix_lessoncompletion_lesson_id', 'lessoncompletion', ['lesson_id']),
+    ('ix_lessoncompletion_completed_at', 'lessoncompletion', ['completed_at']),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # CONCURRENTLY cannot run inside a transaction, and avoids locking writes
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(
+                    name, table, columns, unique=False,
+                    postgresql_concurrently=True, if_not_exists=True,
+                )
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table)
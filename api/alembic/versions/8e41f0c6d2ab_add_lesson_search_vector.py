@@ -0,0 +1,43 @@
+"""Add lesson search vector
+
+Revision ID: 8e41f0c6d2ab
+Revises: 3c7d2a91b4e5
+Create Date: 2026-10-19 11:03:17.554920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = '8e41f0c6d2ab'
+down_revision = '3c7d2a91b4e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Full-text search column is Postgres-only; other databases use the
+    # in-memory index (see app/search.py)
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("""
+        ALTER TABLE lesson ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english',
+                coalesce(story, '') || ' ' || coalesce(reflection, '') || ' ' || coalesce(challenge, '')
+            ), 'B')
+        ) STORED
+    """)
+    op.execute("CREATE INDEX ix_lesson_search_vector ON lesson USING GIN (search_vector)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_lesson_search_vector")
+    op.execute("ALTER TABLE lesson DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,118 @@
+"""Add archived_progress table and optional lessoncompletion partitioning
+
+Revision ID: a93d0f5c7e18
+Revises: 7c1e5a9b3d24
+Create Date: 2026-10-19 16:31:05.642918
+
+On PostgreSQL with COMPLETION_PARTITIONING=on, lessoncompletion is rebuilt as
+a table range-partitioned by completed_at (one partition per month plus a
+DEFAULT partition). The primary key becomes (id, completed_at), as PostgreSQL
+requires the partition key in unique constraints.
+"""
+import os
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a93d0f5c7e18'
+down_revision = '7c1e5a9b3d24'
+branch_labels = None
+depends_on = None
+
+PARTITION_MONTHS_AHEAD = int(os.getenv('COMPLETION_PARTITION_MONTHS_AHEAD', '3'))
+COMPLETION_INDEXES = [
+    ('ix_lessoncompletion_user_id_lesson_id', ['user_id', 'lesson_id']),
+    ('ix_lessoncompletion_lesson_id', ['lesson_id']),
+    ('ix_lessoncompletion_completed_at', ['completed_at']),
+]
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partition(month: date) -> None:
+    upper = _add_months(month, 1)
+    op.execute(
+        f"CREATE TABLE IF NOT EXISTS lessoncompletion_p{month.year}{month.month:02d} PARTITION OF lessoncompletion "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+    )
+
+
+def _partitioning_requested() -> bool:
+    return (
+        op.get_bind().dialect.name == 'postgresql'
+        and os.getenv('COMPLETION_PARTITIONING', 'off').lower() in ('1', 'on', 'true')
+    )
+
+
+def _rebuild_completions(partitioned: bool) -> None:
+    """Recreate lessoncompletion (partitioned or plain) and copy every row across."""
+    op.execute('ALTER TABLE lessoncompletion RENAME TO lessoncompletion_old')
+    op.execute('ALTER TABLE lessoncompletion_old RENAME CONSTRAINT lessoncompletion_pkey TO lessoncompletion_old_pkey')
+    for name, _ in COMPLETION_INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+    primary_key = 'PRIMARY KEY (id, completed_at)' if partitioned else 'PRIMARY KEY (id)'
+    op.execute(f"""
+        CREATE TABLE lessoncompletion (
+            id INTEGER NOT NULL DEFAULT nextval('lessoncompletion_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES "user" (id),
+            lesson_id INTEGER NOT NULL REFERENCES lesson (id),
+            completed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT lessoncompletion_pkey {primary_key}
+        ){' PARTITION BY RANGE (completed_at)' if partitioned else ''}
+    """)
+    op.execute('ALTER SEQUENCE lessoncompletion_id_seq OWNED BY lessoncompletion.id')
+
+    if partitioned:
+        oldest = op.get_bind().execute(sa.text('SELECT min(completed_at) FROM lessoncompletion_old')).scalar()
+        first = oldest or datetime.utcnow()
+        month = date(first.year, first.month, 1)
+        now = datetime.utcnow()
+        last = _add_months(date(now.year, now.month, 1), PARTITION_MONTHS_AHEAD)
+        while month <= last:
+            _create_partition(month)
+            month = _add_months(month, 1)
+        op.execute('CREATE TABLE lessoncompletion_default PARTITION OF lessoncompletion DEFAULT')
+
+    op.execute(
+        'INSERT INTO lessoncompletion (id, user_id, lesson_id, completed_at) '
+        'SELECT id, user_id, lesson_id, completed_at FROM lessoncompletion_old'
+    )
+    op.execute('DROP TABLE lessoncompletion_old')
+    for name, columns in COMPLETION_INDEXES:
+        op.create_index(name, 'lessoncompletion', columns, unique=False)
+
+
+def upgrade() -> None:
+    op.create_table('archivedprogress',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('lesson_id', sa.Integer(), nullable=False),
+    sa.Column('completion_id', sa.Integer(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['lesson_id'], ['lesson.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'lesson_id')
+    )
+
+    if _partitioning_requested():
+        _rebuild_completions(partitioned=True)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        partitioned = bind.execute(sa.text(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = 'lessoncompletion'"
+        )).first()
+        if partitioned:
+            _rebuild_completions(partitioned=False)
+
+    op.drop_table('archivedprogress')
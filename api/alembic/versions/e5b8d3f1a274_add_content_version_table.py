@@ -0,0 +1,84 @@
+"""Add contentversion table and lesson triggers
+
+Revision ID: e5b8d3f1a274
+Revises: c4e7a2b9f6d1
+Create Date: 2026-10-19 20:03:17.552930
+
+"""
+import uuid
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8d3f1a274'
+down_revision = 'c4e7a2b9f6d1'
+branch_labels = None
+depends_on = None
+
+# Same DDL as app/content_version.py at the time of this revision
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS lesson_content_version_{operation.lower()}
+    AFTER {operation} ON lesson
+    BEGIN
+        UPDATE contentversion SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+    END
+    """
+    for operation in ('INSERT', 'UPDATE', 'DELETE')
+]
+
+POSTGRES_TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION bump_content_version() RETURNS trigger AS $$
+    DECLARE
+        new_version bigint;
+    BEGIN
+        UPDATE contentversion SET version = version + 1, updated_at = timezone('utc', now())
+        WHERE id = 1 RETURNING version INTO new_version;
+        -- API transactions announce their lessons themselves
+        IF coalesce(current_setting('app.content_write', true), '') <> 'api' THEN
+            PERFORM pg_notify('cache_invalidate', 'content:' || new_version);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    'DROP TRIGGER IF EXISTS lesson_content_version ON lesson',
+    """
+    CREATE TRIGGER lesson_content_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON lesson
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_content_version()
+    """,
+]
+
+
+def upgrade() -> None:
+    op.create_table('contentversion',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('epoch', sqlmodel.sql.sqltypes.AutoString(length=16), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    bind = op.get_bind()
+    bind.execute(sa.text(
+        'INSERT INTO contentversion (id, epoch, version, updated_at) VALUES (1, :epoch, 0, :now)'
+    ), {'epoch': uuid.uuid4().hex[:8], 'now': datetime.utcnow()})
+    triggers = {'sqlite': SQLITE_TRIGGERS, 'postgresql': POSTGRES_TRIGGERS}
+    for statement in triggers.get(bind.dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute('DROP TRIGGER IF EXISTS lesson_content_version ON lesson')
+        op.execute('DROP FUNCTION IF EXISTS bump_content_version()')
+    elif bind.dialect.name == 'sqlite':
+        for operation in ('insert', 'update', 'delete'):
+            op.execute(f'DROP TRIGGER IF EXISTS lesson_content_version_{operation}')
+    op.drop_table('contentversion')
@@ -0,0 +1,395 @@
+"""
+Admin analytics over lesson completions.
+
+Scanning `lessoncompletion` per request does not scale (20M rows), so the
+numbers come from rollup tables folded in incrementally: each refresh takes
+the completions with ids above the rollup's `rollupcursor` position, in
+batches. The cursor moves with a compare-and-set in the same transaction as
+the rollup rows, so concurrent refreshes never count a batch twice.
+Completions are committed slightly out of id order under concurrent writes,
+so refreshes stop below the first completion newer than SETTLE_SECONDS.
+
+Lesson funnel (`lessonfunnelrollup`): for every published lesson, in `order`,
+how many users reached it (completed the lesson before it; every user for the
+first one), how many completed it, the drop-off between the two, and the
+median time since the user's previous completion. Window functions over the
+affected users' completions tell whether a row is the user's first completion
+of the lesson (ROW_NUMBER) and when their previous completion was (LAG); the
+gaps go into a fixed log-scale histogram, from which the median is
+interpolated. Drop-off is derived when reading, with LAG over the lessons.
+
+Cohorts (`modulecompletion`): when each user first had every published lesson
+of modules 1-6 completed. The matrix (signup week x module x weeks since
+signup, cumulative) is computed from it with NumPy and kept for
+COHORT_CACHE_SECONDS. Lessons added to a module later do not reopen it.
+
+Usage (backfill or catch up from the command line):
+    python -m app.analytics [--batch-size 50000]
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.metrics import metrics
+from app.models import Lesson, LessonFunnelRollup, ModuleCompletion, RollupCursor, User
+from app.partitions import COMPLETION_TABLE
+
+FUNNEL_CURSOR = "lesson_funnel"
+MODULE_CURSOR = "module_completion"
+BATCH_SIZE = 50000
+SETTLE_SECONDS = 5
+# Upper bounds (seconds) of the gap histogram buckets; the last bucket is open
+GAP_BUCKETS = [
+    60, 5 * 60, 15 * 60, 30 * 60, 3600, 3 * 3600, 6 * 3600, 12 * 3600,
+    86400, 2 * 86400, 3 * 86400, 7 * 86400, 14 * 86400, 30 * 86400, 90 * 86400,
+]
+MODULES = range(1, 7)
+COHORT_WEEKS = int(os.getenv("COHORT_WEEKS", "12"))  # Weeks since signup shown per cohort
+COHORT_CACHE_SECONDS = float(os.getenv("COHORT_CACHE_SECONDS", "300"))
+
+
+def _as_datetime(value) -> Optional[datetime]:
+    if isinstance(value, str):  # SQLite returns text from raw SQL
+        return datetime.fromisoformat(value)
+    return value
+
+
+def gap_bucket(seconds: float) -> int:
+    """Histogram bucket index for a gap between completions."""
+    return bisect.bisect_left(GAP_BUCKETS, seconds)
+
+
+def histogram_median(histogram: List[int]) -> Optional[float]:
+    """Median gap in seconds, interpolated linearly within its bucket."""
+    total = sum(histogram)
+    if not total:
+        return None
+    half = total / 2
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= half:
+            lower = GAP_BUCKETS[index - 1] if index else 0
+            if index >= len(GAP_BUCKETS):
+                return float(lower)
+            return lower + (GAP_BUCKETS[index] - lower) * (half - seen) / count
+        seen += count
+    return None
+
+
+async def _settled_upper_id(session: AsyncSession) -> int:
+    """Highest id below every recent completion, so no lower id can still commit."""
+    settled = datetime.utcnow() - timedelta(seconds=SETTLE_SECONDS)
+    # Only the last few seconds of the completed_at index are scanned
+    recent = await session.execute(text(
+        f"SELECT min(id) FROM {COMPLETION_TABLE} WHERE completed_at > :settled"
+    ), {"settled": settled})
+    first_recent = recent.scalar()
+    if first_recent is not None:
+        return first_recent - 1
+    return (await session.execute(text(f"SELECT max(id) FROM {COMPLETION_TABLE}"))).scalar() or 0
+
+
+async def _cursor_position(session: AsyncSession, name: str) -> int:
+    """Where a cursor stands, creating it at 0 on first use."""
+    statement = select(RollupCursor.last_id).where(RollupCursor.name == name)
+    position = (await session.execute(statement)).scalar()
+    if position is None:
+        # Concurrent first refreshes may both get here: one insert wins, the others do nothing
+        await session.execute(text(
+            f"INSERT INTO {RollupCursor.__tablename__} (name, last_id, updated_at) VALUES (:name, 0, :now) "
+            "ON CONFLICT (name) DO NOTHING"
+        ), {"name": name, "now": datetime.utcnow()})
+        await session.commit()
+        position = (await session.execute(statement)).scalar_one()
+    return position
+
+
+async def _claim_batch(session: AsyncSession, name: str, last_id: int, upper_id: int) -> bool:
+    """Move a cursor from last_id to upper_id. False if another refresh got there first."""
+    claimed = await session.execute(
+        update(RollupCursor)
+        .where(RollupCursor.name == name, RollupCursor.last_id == last_id)
+        .values(last_id=upper_id, updated_at=datetime.utcnow())
+    )
+    if claimed.rowcount != 1:
+        await session.rollback()
+        return False
+    return True
+
+
+async def _refresh(
+    session: AsyncSession,
+    name: str,
+    fold: Callable[[AsyncSession, int, int], Awaitable[None]],
+    batch_size: int,
+    max_batches: Optional[int]
+) -> int:
+    """Fold settled completions into a rollup in batches; returns the cursor position afterwards."""
+    upper_id = await _settled_upper_id(session)
+    last_id = await _cursor_position(session, name)
+    batches = 0
+    while last_id < upper_id and (max_batches is None or batches < max_batches):
+        batch_upper = min(upper_id, last_id + batch_size)
+        if not await _claim_batch(session, name, last_id, batch_upper):
+            # Another worker is refreshing; read its progress and stop
+            return await _cursor_position(session, name)
+        await fold(session, last_id, batch_upper)
+        await session.commit()
+        last_id = batch_upper
+        batches += 1
+    return last_id
+
+
+async def _fold_funnel_batch(session: AsyncSession, last_id: int, upper_id: int) -> None:
+    """Add completions with last_id < id <= upper_id to the lesson funnel rollup."""
+    # The windows need each affected user's earlier completions too, not just the batch
+    result = await session.execute(text(
+        "WITH history AS ("
+        " SELECT c.id, c.lesson_id, c.completed_at,"
+        " LAG(c.completed_at) OVER (PARTITION BY c.user_id ORDER BY c.completed_at, c.id) AS previous_at,"
+        " ROW_NUMBER() OVER (PARTITION BY c.user_id, c.lesson_id ORDER BY c.id) AS attempt"
+        f" FROM {COMPLETION_TABLE} c"
+        f" WHERE c.id <= :upper_id AND c.user_id IN (SELECT user_id FROM {COMPLETION_TABLE} WHERE id > :last_id AND id <= :upper_id)"
+        ") "
+        "SELECT lesson_id, completed_at, previous_at FROM history WHERE id > :last_id AND attempt = 1"
+    ), {"last_id": last_id, "upper_id": upper_id})
+
+    completions: Dict[int, int] = {}
+    gaps: Dict[int, List[int]] = {}
+    for row in result:
+        completions[row.lesson_id] = completions.get(row.lesson_id, 0) + 1
+        if row.previous_at is not None:
+            seconds = (_as_datetime(row.completed_at) - _as_datetime(row.previous_at)).total_seconds()
+            histogram = gaps.setdefault(row.lesson_id, [0] * (len(GAP_BUCKETS) + 1))
+            histogram[gap_bucket(seconds)] += 1
+
+    if completions:
+        existing = await session.execute(
+            select(LessonFunnelRollup).where(LessonFunnelRollup.lesson_id.in_(list(completions)))
+        )
+        rollups = {rollup.lesson_id: rollup for rollup in existing.scalars()}
+        for lesson_id, count in completions.items():
+            rollup = rollups.get(lesson_id)
+            if rollup is None:
+                rollup = LessonFunnelRollup(lesson_id=lesson_id)
+                session.add(rollup)
+            histogram = json.loads(rollup.gap_histogram) or [0] * (len(GAP_BUCKETS) + 1)
+            added = gaps.get(lesson_id, [])
+            for index, value in enumerate(added):
+                histogram[index] += value
+            rollup.completions += count
+            rollup.gap_count += sum(added)
+            rollup.gap_histogram = json.dumps(histogram)
+            rollup.updated_at = datetime.utcnow()
+    metrics.inc("lesson_funnel_rows_folded_total", sum(completions.values()))
+
+
+async def refresh_lesson_funnel(
+    session: AsyncSession,
+    batch_size: int = BATCH_SIZE,
+    max_batches: Optional[int] = None
+) -> int:
+    """Fold settled completions into the funnel rollup; returns the cursor position afterwards."""
+    return await _refresh(session, FUNNEL_CURSOR, _fold_funnel_batch, batch_size, max_batches)
+
+
+async def get_lesson_funnel(session: AsyncSession) -> List[dict]:
+    """Funnel rows for published lessons, in order, from the rollup."""
+    completions = func.coalesce(LessonFunnelRollup.completions, 0)
+    previous = func.lag(completions).over(order_by=(Lesson.order, Lesson.id))
+    result = await session.execute(
+        select(
+            Lesson.id, Lesson.title, Lesson.order, Lesson.module_number,
+            completions.label("completions"),
+            previous.label("previous_completions"),
+            LessonFunnelRollup.gap_histogram,
+        )
+        .outerjoin(LessonFunnelRollup, LessonFunnelRollup.lesson_id == Lesson.id)
+        .where(Lesson.is_published == True)
+        .order_by(Lesson.order, Lesson.id)
+    )
+    rows = result.all()
+    total_users = (await session.execute(select(func.count(User.id)))).scalar() or 0
+
+    funnel = []
+    for row in rows:
+        reach = total_users if row.previous_completions is None else row.previous_completions
+        drop_off = max(0, reach - row.completions)
+        funnel.append({
+            "lesson_id": row.id,
+            "title": row.title,
+            "order": row.order,
+            "module_number": row.module_number,
+            "reach": reach,
+            "completions": row.completions,
+            "drop_off": drop_off,
+            "drop_off_rate": drop_off / reach if reach else 0.0,
+            "median_seconds_since_previous": histogram_median(json.loads(row.gap_histogram or "[]")),
+        })
+    return funnel
+
+
+async def _fold_module_batch(session: AsyncSession, last_id: int, upper_id: int) -> None:
+    """Record the modules that completions with last_id < id <= upper_id finished."""
+    # Archived first completions count too, like in the progress queries
+    result = await session.execute(text(
+        "WITH affected AS ("
+        f" SELECT DISTINCT c.user_id, l.module_number FROM {COMPLETION_TABLE} c JOIN lesson l ON l.id = c.lesson_id"
+        " WHERE c.id > :last_id AND c.id <= :upper_id AND l.is_published AND l.module_number BETWEEN :first AND :last"
+        "), firsts AS ("
+        " SELECT user_id, lesson_id, min(completed_at) AS completed_at FROM ("
+        f"  SELECT user_id, lesson_id, completed_at FROM {COMPLETION_TABLE}"
+        "   WHERE id <= :upper_id AND user_id IN (SELECT user_id FROM affected)"
+        "  UNION ALL"
+        "  SELECT user_id, lesson_id, completed_at FROM archivedprogress WHERE user_id IN (SELECT user_id FROM affected)"
+        " ) AS done GROUP BY user_id, lesson_id"
+        "), module_lessons AS ("
+        " SELECT module_number, count(*) AS lessons FROM lesson WHERE is_published GROUP BY module_number"
+        ") "
+        "SELECT a.user_id, a.module_number, max(f.completed_at) AS completed_at "
+        "FROM affected a "
+        "JOIN lesson l ON l.module_number = a.module_number AND l.is_published "
+        "JOIN firsts f ON f.user_id = a.user_id AND f.lesson_id = l.id "
+        "JOIN module_lessons m ON m.module_number = a.module_number "
+        "LEFT JOIN modulecompletion mc ON mc.user_id = a.user_id AND mc.module_number = a.module_number "
+        "WHERE mc.user_id IS NULL "
+        "GROUP BY a.user_id, a.module_number, m.lessons "
+        "HAVING count(*) = m.lessons"
+    ), {"last_id": last_id, "upper_id": upper_id, "first": MODULES[0], "last": MODULES[-1]})
+
+    finished = 0
+    for row in result:
+        session.add(ModuleCompletion(
+            user_id=row.user_id, module_number=row.module_number, completed_at=_as_datetime(row.completed_at),
+        ))
+        finished += 1
+    metrics.inc("module_completions_recorded_total", finished)
+
+
+async def refresh_module_completions(
+    session: AsyncSession,
+    batch_size: int = BATCH_SIZE,
+    max_batches: Optional[int] = None
+) -> int:
+    """Fold settled completions into `modulecompletion`; returns the cursor position afterwards."""
+    return await _refresh(session, MODULE_CURSOR, _fold_module_batch, batch_size, max_batches)
+
+
+def _week_numbers(days):
+    """Monday-based week numbers for day counts since 1970-01-01 (a Thursday)."""
+    return (days + 3) // 7
+
+
+async def build_cohort_matrix(
+    session: AsyncSession,
+    weeks: int = COHORT_WEEKS,
+    now: Optional[datetime] = None
+) -> dict:
+    """
+    Users per signup-week cohort who had finished each module within 0..weeks-1
+    weeks of signing up (cumulative). Weeks a cohort has not reached yet are None.
+    """
+    import numpy as np
+
+    now = now or datetime.utcnow()
+    signups = (await session.execute(select(User.created_at))).scalars().all()
+    if not signups:
+        return {"weeks": weeks, "generated_at": now, "cohorts": []}
+    finished = (await session.execute(
+        select(User.created_at, ModuleCompletion.module_number, ModuleCompletion.completed_at)
+        .join(User, User.id == ModuleCompletion.user_id)
+    )).all()
+
+    signup_weeks = _week_numbers(np.array(signups, dtype="datetime64[D]").astype(np.int64))
+    first_week = signup_weeks.min()
+    sizes = np.bincount(signup_weeks - first_week)
+    cube = np.zeros((len(sizes), len(MODULES), weeks), dtype=np.int64)
+
+    if finished:
+        created, module_numbers, completed = zip(*finished)
+        created = np.array(created, dtype="datetime64[s]")
+        cohorts = _week_numbers(created.astype("datetime64[D]").astype(np.int64)) - first_week
+        elapsed = np.maximum(np.array(completed, dtype="datetime64[s]") - created, np.timedelta64(0, "s"))
+        offsets = elapsed // np.timedelta64(7, "D")
+        modules = np.array(module_numbers, dtype=np.int64) - MODULES[0]
+        within = offsets < weeks
+        np.add.at(cube, (cohorts[within], modules[within], offsets[within]), 1)
+    cube = cube.cumsum(axis=2)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.where(sizes[:, None, None] > 0, cube / sizes[:, None, None], 0.0)
+    today_week = _week_numbers(np.datetime64(now, "D").astype(np.int64))
+    # Week w of a cohort is complete once w whole weeks have passed since it started
+    reached = (today_week - first_week - np.arange(len(sizes)))[:, None] >= np.arange(weeks)[None, :]
+
+    cohorts = []
+    for index in np.flatnonzero(sizes):
+        cohort_week = np.datetime64("1969-12-29") + np.timedelta64(int(first_week + index) * 7, "D")
+        visible = reached[index]
+        cohorts.append({
+            "cohort_week": cohort_week.astype(date),
+            "users": int(sizes[index]),
+            "modules": [
+                {
+                    "module_number": module_number,
+                    "completed": [int(value) if shown else None for value, shown in zip(cube[index, offset], visible)],
+                    "completion_rates": [float(value) if shown else None for value, shown in zip(rates[index, offset], visible)],
+                }
+                for offset, module_number in enumerate(MODULES)
+            ],
+        })
+    return {"weeks": weeks, "generated_at": now, "cohorts": cohorts}
+
+
+class ExpiringValue:
+    """One computed value, rebuilt on the first request after it is ttl seconds old."""
+
+    def __init__(self, ttl: float, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._value = None
+        self._built_at = float("-inf")
+
+    async def get_or_build(self, build: Callable[[], Awaitable]):
+        if self._value is None or self._clock() - self._built_at >= self.ttl:
+            self._value = await build()
+            self._built_at = self._clock()
+        return self._value
+
+    def clear(self) -> None:
+        self._value = None
+
+
+cohort_cache = ExpiringValue(COHORT_CACHE_SECONDS)
+
+
+async def refresh_all(engine: AsyncEngine, batch_size: int) -> dict:
+    async with AsyncSession(engine) as session:
+        return {
+            FUNNEL_CURSOR: await refresh_lesson_funnel(session, batch_size=batch_size),
+            MODULE_CURSOR: await refresh_module_completions(session, batch_size=batch_size),
+        }
+
+
+def main():
+    from app.deps import engine
+
+    parser = argparse.ArgumentParser(description="Fold new lesson completions into the analytics rollups.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Completions per transaction")
+    args = parser.parse_args()
+
+    positions = asyncio.run(refresh_all(engine, args.batch_size))
+    for name, position in positions.items():
+        print(f"{name}: up to date through completion {position}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Archival of cold lesson completions.
+
+Moves whole calendar months of `lessoncompletion` rows older than a cutoff
+into gzip-compressed JSON Lines files (one per month), then removes them from
+the database: a detached-and-dropped partition when the table is partitioned,
+a range DELETE otherwise. Before removal, each user's first completion of each
+lesson is recorded in `archivedprogress`, which the progress queries union
+with live completions, so unlock state and progress never change.
+
+The file for a month is written and fsynced before the database transaction
+that removes its rows, so a crash at any point leaves the rows either still in
+the database or safely in the archive. Re-running is safe.
+
+Usage:
+    python -m app.archive_completions ./archive --older-than-days 365
+    python -m app.archive_completions ./archive --before 2025-01-01
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.deps import engine as default_engine
+from app.partitions import (
+    COMPLETION_TABLE,
+    add_months,
+    existing_partitions,
+    is_partitioned,
+    month_start,
+    partition_name,
+)
+
+CHUNK_SIZE = 10000
+
+
+@dataclass
+class ArchivedMonth:
+    """One month moved out of the database."""
+    month: date
+    path: str
+    rows: int
+    last_id: int  # Highest completion id written; later rows are left alone
+    sha256: str  # Of the compressed file
+
+
+def _month_range(month: date):
+    """Datetime bounds of a month, as naive UTC like completed_at."""
+    return datetime.combine(month, time()), datetime.combine(add_months(month, 1), time())
+
+
+def archive_path(output_dir: str, month: date) -> str:
+    return os.path.join(output_dir, f"{COMPLETION_TABLE}-{month.year}-{month.month:02d}.jsonl.gz")
+
+
+def read_archive(path: str) -> List[dict]:
+    """Load the completion rows stored in an archive file."""
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        return [json.loads(line) for line in archive if line.strip()]
+
+
+async def _write_month(conn, output_dir: str, month: date) -> Optional[ArchivedMonth]:
+    """Stream one month of rows into a compressed file, in id order and chunks."""
+    lower, upper = _month_range(month)
+    os.makedirs(output_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    rows = 0
+    last_id = 0
+    try:
+        with os.fdopen(fd, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=9, mtime=0) as archive:
+                while True:
+                    result = await conn.execute(text(
+                        f"SELECT id, user_id, lesson_id, completed_at FROM {COMPLETION_TABLE} "
+                        "WHERE completed_at >= :lower AND completed_at < :upper AND id > :last_id "
+                        "ORDER BY id LIMIT :limit"
+                    ), {"lower": lower, "upper": upper, "last_id": last_id, "limit": CHUNK_SIZE})
+                    chunk = result.all()
+                    if not chunk:
+                        break
+                    for row in chunk:
+                        completed_at = row.completed_at
+                        if isinstance(completed_at, str):  # SQLite returns text from raw SQL
+                            completed_at = datetime.fromisoformat(completed_at)
+                        archive.write(json.dumps({
+                            "id": row.id,
+                            "user_id": row.user_id,
+                            "lesson_id": row.lesson_id,
+                            "completed_at": completed_at.isoformat(),
+                        }, separators=(",", ":")).encode("utf-8") + b"\n")
+                    rows += len(chunk)
+                    last_id = chunk[-1].id
+            raw.flush()
+            os.fsync(raw.fileno())
+        if not rows:
+            os.remove(tmp_path)
+            return None
+        path = archive_path(output_dir, month)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    with open(path, "rb") as archive_file:
+        digest = hashlib.sha256(archive_file.read()).hexdigest()
+    return ArchivedMonth(month=month, path=path, rows=rows, last_id=last_id, sha256=digest)
+
+
+async def _remove_month(conn, archived: ArchivedMonth, partitioned: bool) -> None:
+    """Record archived progress, then drop the month's rows."""
+    month = archived.month
+    lower, upper = _month_range(month)
+    params = {"lower": lower, "upper": upper, "last_id": archived.last_id}
+    await conn.execute(text(
+        "INSERT INTO archivedprogress (user_id, lesson_id, completion_id, completed_at, archived_at) "
+        f"SELECT user_id, lesson_id, min(id), min(completed_at), :now FROM {COMPLETION_TABLE} "
+        "WHERE completed_at >= :lower AND completed_at < :upper AND id <= :last_id "
+        "GROUP BY user_id, lesson_id "
+        "ON CONFLICT (user_id, lesson_id) DO NOTHING"
+    ), {**params, "now": datetime.utcnow()})
+
+    name = partition_name(month)
+    if partitioned and name in await existing_partitions(conn):
+        late = await conn.execute(text(f"SELECT 1 FROM {name} WHERE id > :last_id LIMIT 1"), {"last_id": archived.last_id})
+        if late.first() is None:
+            await conn.execute(text(f"ALTER TABLE {COMPLETION_TABLE} DETACH PARTITION {name}"))
+            await conn.execute(text(f"DROP TABLE {name}"))
+    # The whole month when unpartitioned; otherwise rows that landed in the DEFAULT partition
+    await conn.execute(text(
+        f"DELETE FROM {COMPLETION_TABLE} "
+        "WHERE completed_at >= :lower AND completed_at < :upper AND id <= :last_id"
+    ), params)
+
+
+async def archive_completions(
+    output_dir: str,
+    before: datetime,
+    engine: AsyncEngine = default_engine
+) -> List[ArchivedMonth]:
+    """Archive every whole month that ends on or before the cutoff."""
+    cutoff = month_start(before)
+    async with engine.connect() as conn:
+        oldest = (await conn.execute(text(f"SELECT min(completed_at) FROM {COMPLETION_TABLE}"))).scalar()
+        partitioned = await is_partitioned(conn)
+    if oldest is None:
+        return []
+    if isinstance(oldest, str):
+        oldest = datetime.fromisoformat(oldest)
+
+    archived = []
+    month = month_start(oldest)
+    while month < cutoff:
+        async with engine.connect() as conn:
+            written = await _write_month(conn, output_dir, month)
+        if written:
+            async with engine.begin() as conn:
+                await _remove_month(conn, written, partitioned)
+            archived.append(written)
+        month = add_months(month, 1)
+    return archived
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive cold lesson completions to compressed files.")
+    parser.add_argument("output_dir", help="Directory for the .jsonl.gz archive files")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--before", type=date.fromisoformat, help="Archive whole months before this date")
+    group.add_argument("--older-than-days", type=int, help="Archive whole months older than this many days")
+    args = parser.parse_args()
+
+    if args.before:
+        before = datetime.combine(args.before, datetime.min.time())
+    else:
+        before = datetime.utcnow() - timedelta(days=args.older_than_days)
+
+    archived = asyncio.run(archive_completions(args.output_dir, before))
+    for item in archived:
+        print(f"{item.month:%Y-%m}: {item.rows} rows -> {item.path} (sha256 {item.sha256})")
+    print(f"Archived {sum(item.rows for item in archived)} completions in {len(archived)} months")
+
+
+if __name__ == "__main__":
+    main()
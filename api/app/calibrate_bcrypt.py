@@ -0,0 +1,64 @@
+"""
+bcrypt cost calibration.
+
+Every bcrypt round doubles the time of a hash or verify, so a cost that is
+comfortable on a large machine can dominate login latency in a small
+container. This command measures verify time on the current host for a range
+of costs and recommends the highest one that stays within a target time.
+
+Usage:
+    python -m app.calibrate_bcrypt [--target-ms 250] [--min-rounds 10] [--max-rounds 15]
+"""
+import argparse
+import statistics
+import time
+from typing import Dict
+
+from passlib.hash import bcrypt
+
+SAMPLE_PASSWORD = "calibration-password"
+
+
+def measure_verify(rounds: int, samples: int = 3) -> float:
+    """Median verify time in milliseconds for a hash of the given cost."""
+    hashed = bcrypt.using(rounds=rounds).hash(SAMPLE_PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.verify(SAMPLE_PASSWORD, hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, min_rounds: int = 10, max_rounds: int = 15, samples: int = 3) -> Dict:
+    """
+    Pick the highest cost whose verify time fits the target.
+    Never recommends less than min_rounds, even on a slow host.
+    """
+    timings = {}
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        timings[rounds] = measure_verify(rounds, samples)
+        if timings[rounds] > target_ms:
+            break
+        chosen = rounds
+    return {"rounds": chosen, "timings_ms": timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Choose a bcrypt cost for this host.")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Target verify time per login")
+    parser.add_argument("--min-rounds", type=int, default=10, help="Lowest acceptable cost")
+    parser.add_argument("--max-rounds", type=int, default=15, help="Highest cost to try")
+    parser.add_argument("--samples", type=int, default=3, help="Verifies timed per cost")
+    args = parser.parse_args()
+
+    result = calibrate(args.target_ms, args.min_rounds, args.max_rounds, args.samples)
+    for rounds, elapsed in result["timings_ms"].items():
+        marker = " <" if rounds == result["rounds"] else ""
+        print(f"rounds={rounds:2d}  verify={elapsed:8.1f} ms{marker}")
+    print(f"BCRYPT_ROUNDS={result['rounds']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+"""
+Lesson content compilation.
+
+Lesson markdown is static between edits, so it is compiled once at write time
+into sanitized HTML plus a structured block AST. Compiled sections are
+content-addressed by the SHA-256 of their source text, which lets the API serve
+them without re-parsing and lets identical sections share one entry.
+"""
+import hashlib
+import html
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Lesson fields that hold markdown (quiz is JSON and is served as-is)
+SECTION_FIELDS = ("story", "reflection", "challenge")
+
+# Bump when the output format changes so stale compiled rows are ignored
+COMPILER_VERSION = 2
+
+_CACHE_MAX_ENTRIES = 512
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_RULE_RE = re.compile(r"^(\*\s*){3,}$|^(-\s*){3,}$")
+_ORDERED_RE = re.compile(r"^\s*(\d+)[.)]\s+(.*)$")
+_BULLET_RE = re.compile(r"^\s*[-*+]\s+(.*)$")
+_CHECKBOX_RE = re.compile(r"^\s*(?:[-*+]\s+)?(?:\[( |x|X)\](?=\s|$)|(☐|□|☑|✅))\s*(.*)$")
+_INLINE_CHECKBOX_RE = re.compile(r"\s*[☐□]\s*")
+_COMPONENT_RE = re.compile(
+    r"^\s*<([a-z][a-z0-9]*(?:-[a-z0-9]+)+)((?:\s+[a-z][\w-]*=\"[^\"]*\")*)\s*/?>\s*(?:</\1>)?\s*$"
+)
+_ATTRIBUTE_RE = re.compile(r'([a-z][\w-]*)="([^"]*)"')
+_COMPONENT_CLOSE_RE = re.compile(r"^\s*</([a-z][a-z0-9]*(?:-[a-z0-9]+)+)>\s*$")
+_FIELD_RE = re.compile(r"\[(text|textarea|slider):\s*([^\]]*)\]|(_{3,})")
+_TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$")
+
+_BOLD_RE = re.compile(r"\*\*(.+?)\*\*|__(.+?)__")
+_ITALIC_RE = re.compile(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?!\*)|(?<![\w_])_(?!\s)(.+?)(?<!\s)_(?![\w_])")
+_CODE_RE = re.compile(r"`([^`]+)`")
+_LINK_RE = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)")
+_SAFE_URL_RE = re.compile(r"^(https?://|mailto:|/|#)", re.IGNORECASE)
+_STASHED_RE = re.compile(r"\0(\d+)\0")
+
+
+def content_hash(text: str) -> str:
+    """Return the content address of a piece of lesson markdown."""
+    digest = hashlib.sha256()
+    digest.update(f"v{COMPILER_VERSION}\0".encode())
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _emphasis(text: str) -> str:
+    """Apply bold and italic markup to already-escaped text."""
+    text = _BOLD_RE.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text)
+    return _ITALIC_RE.sub(lambda m: f"<em>{m.group(1) or m.group(2)}</em>", text)
+
+
+def render_inline(text: str) -> str:
+    """Render inline markdown (bold, italic, code, links) to escaped HTML."""
+    # Code spans and finished links are protected from further inline processing,
+    # so emphasis markers inside them (e.g. "_" in a URL) are left alone
+    # (NUL marks the stashed spans, so any NUL already in the text is dropped)
+    stash: List[str] = []
+
+    def _restore(rendered: str) -> str:
+        return _STASHED_RE.sub(lambda m: stash[int(m.group(1))], rendered)
+
+    def _protect(rendered: str) -> str:
+        # Resolve spans nested in this one (code in a link label) so stashed
+        # entries never hold markers and one restore pass is enough
+        stash.append(_restore(rendered))
+        return f"\0{len(stash) - 1}\0"
+
+    text = text.replace("\0", "")
+    text = _CODE_RE.sub(lambda m: _protect(f"<code>{html.escape(m.group(1))}</code>"), text)
+    text = html.escape(text, quote=True)
+
+    def _link(match: re.Match) -> str:
+        label, url = match.group(1), html.unescape(match.group(2))
+        if not _SAFE_URL_RE.match(url):
+            return label
+        return _protect(
+            f'<a href="{html.escape(url, quote=True)}" '
+            f'rel="noopener noreferrer">{_emphasis(label)}</a>'
+        )
+
+    text = _LINK_RE.sub(_link, text)
+    text = _emphasis(text)
+    return _restore(text)
+
+
+def _field_parts(line: str) -> Optional[List[dict]]:
+    """Split a line containing input fields into text and field parts."""
+    if not _FIELD_RE.search(line):
+        return None
+
+    parts: List[dict] = []
+    position = 0
+    for match in _FIELD_RE.finditer(line):
+        if match.start() > position:
+            parts.append({"text": line[position:match.start()]})
+        if match.group(3):
+            parts.append({"field": "blank", "placeholder": ""})
+        else:
+            parts.append({"field": match.group(1), "placeholder": match.group(2).strip()})
+        position = match.end()
+    if position < len(line):
+        parts.append({"text": line[position:]})
+    return parts
+
+
+def _render_field(part: dict) -> str:
+    """Render a single input field placeholder element."""
+    placeholder = html.escape(part["placeholder"], quote=True)
+    return (
+        f'<span class="lesson-field" data-field="{part["field"]}" '
+        f'data-placeholder="{placeholder}"></span>'
+    )
+
+
+def _render_parts(parts: List[dict]) -> str:
+    """Render mixed text/field parts to HTML."""
+    rendered = []
+    for part in parts:
+        if "field" in part:
+            rendered.append(_render_field(part))
+        else:
+            rendered.append(render_inline(part["text"]))
+    return "".join(rendered)
+
+
+def _split_row(line: str) -> List[str]:
+    """Split a markdown table row into cell texts."""
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+# Block parsers take the lines and the index of the current (non-blank) line.
+# They return (blocks, next index) when the line starts their kind of block,
+# otherwise None.
+BlockParse = Optional[Tuple[List[dict], int]]
+
+
+def _parse_code(lines: List[str], i: int) -> BlockParse:
+    """Fenced code block."""
+    stripped = lines[i].strip()
+    if not stripped.startswith("```"):
+        return None
+    language = stripped[3:].strip()
+    code_lines = []
+    i += 1
+    while i < len(lines) and not lines[i].strip().startswith("```"):
+        code_lines.append(lines[i])
+        i += 1
+    return [{"type": "code", "language": language, "text": "\n".join(code_lines)}], i + 1
+
+
+def _parse_heading(lines: List[str], i: int) -> BlockParse:
+    heading = _HEADING_RE.match(lines[i].strip())
+    if not heading:
+        return None
+    return [{
+        "type": "heading",
+        "level": len(heading.group(1)),
+        "text": heading.group(2),
+        "html": render_inline(heading.group(2)),
+    }], i + 1
+
+
+def _parse_rule(lines: List[str], i: int) -> BlockParse:
+    if not _RULE_RE.match(lines[i].strip()):
+        return None
+    return [{"type": "rule"}], i + 1
+
+
+def _parse_component(lines: List[str], i: int) -> BlockParse:
+    """Interactive component tags such as <ei-compass></ei-compass>."""
+    stripped = lines[i].strip()
+    component = _COMPONENT_RE.match(stripped)
+    if component:
+        return [{
+            "type": "component",
+            "name": component.group(1),
+            "attributes": dict(_ATTRIBUTE_RE.findall(component.group(2))),
+        }], i + 1
+    if _COMPONENT_CLOSE_RE.match(stripped):
+        return [], i + 1
+    return None
+
+
+def _parse_quote(lines: List[str], i: int) -> BlockParse:
+    if not lines[i].strip().startswith(">"):
+        return None
+    quote_lines = []
+    while i < len(lines) and lines[i].strip().startswith(">"):
+        quote_lines.append(lines[i].strip()[1:].strip())
+        i += 1
+    return [{"type": "quote", "html": render_inline(" ".join(quote_lines))}], i
+
+
+def _parse_table(lines: List[str], i: int) -> BlockParse:
+    """Tables need a header row followed by a separator row."""
+    stripped = lines[i].strip()
+    if not (stripped.startswith("|") and i + 1 < len(lines) and _TABLE_SEPARATOR_RE.match(lines[i + 1])):
+        return None
+    header = _split_row(stripped)
+    rows = []
+    i += 2
+    while i < len(lines) and lines[i].strip().startswith("|"):
+        rows.append(_split_row(lines[i]))
+        i += 1
+    return [{"type": "table", "header": header, "rows": rows}], i
+
+
+def _parse_checklist(lines: List[str], i: int) -> BlockParse:
+    if not _CHECKBOX_RE.match(lines[i]):
+        return None
+    items = []
+    while i < len(lines):
+        checkbox = _CHECKBOX_RE.match(lines[i])
+        if not checkbox:
+            break
+        checked = checkbox.group(1) in ("x", "X") or checkbox.group(2) in ("☑", "✅")
+        # "□ Tight chest □ Clenched jaw" lists several options on one line
+        for label in _INLINE_CHECKBOX_RE.split(checkbox.group(3)):
+            if label.strip():
+                items.append({"label": label.strip(), "checked": checked})
+        i += 1
+    return [{"type": "checklist", "items": items}], i
+
+
+def _parse_list(lines: List[str], i: int) -> BlockParse:
+    line = lines[i]
+    if not (_BULLET_RE.match(line) or _ORDERED_RE.match(line)):
+        return None
+    ordered = bool(_ORDERED_RE.match(line))
+    item_re = _ORDERED_RE if ordered else _BULLET_RE
+    items = []
+    while i < len(lines):
+        # Loose lists separate their items with blank lines
+        if not lines[i].strip() and i + 1 < len(lines) and item_re.match(lines[i + 1]):
+            i += 1
+            continue
+        item = item_re.match(lines[i])
+        if not item or _CHECKBOX_RE.match(lines[i]):
+            break
+        item_text = item.group(item.lastindex)
+        parts = _field_parts(item_text)
+        items.append({
+            "html": _render_parts(parts) if parts else render_inline(item_text),
+            "fields": [p for p in parts if "field" in p] if parts else [],
+        })
+        i += 1
+    return [{"type": "list", "ordered": ordered, "items": items}], i
+
+
+def _parse_fields(lines: List[str], i: int) -> BlockParse:
+    parts = _field_parts(lines[i].strip())
+    if not parts:
+        return None
+    return [{"type": "fields", "parts": parts, "html": _render_parts(parts)}], i + 1
+
+
+# In priority order; a line no parser claims belongs to a paragraph
+_BLOCK_PARSERS = (
+    _parse_code,
+    _parse_heading,
+    _parse_rule,
+    _parse_component,
+    _parse_quote,
+    _parse_table,
+    _parse_checklist,
+    _parse_list,
+    _parse_fields,
+)
+
+
+def parse_blocks(text: str) -> List[dict]:
+    """Parse lesson markdown into a list of structured blocks."""
+    lines = text.replace("\r\n", "\n").split("\n")
+    blocks: List[dict] = []
+    paragraph: List[str] = []
+    i = 0
+
+    def flush_paragraph():
+        if paragraph:
+            joined = " ".join(line.strip() for line in paragraph)
+            blocks.append({"type": "paragraph", "html": render_inline(joined)})
+            paragraph.clear()
+
+    while i < len(lines):
+        if not lines[i].strip():
+            flush_paragraph()
+            i += 1
+            continue
+
+        for parser in _BLOCK_PARSERS:
+            parsed = parser(lines, i)
+            if parsed is not None:
+                break
+        if parsed is None:
+            paragraph.append(lines[i])
+            i += 1
+            continue
+
+        parsed_blocks, i = parsed
+        # A stray closing component tag produces nothing and does not end a paragraph
+        if parsed_blocks:
+            flush_paragraph()
+            blocks.extend(parsed_blocks)
+
+    flush_paragraph()
+    return blocks
+
+
+def render_blocks(blocks: List[dict]) -> str:
+    """Render parsed blocks to sanitized HTML."""
+    out: List[str] = []
+    for block in blocks:
+        kind = block["type"]
+        if kind == "heading":
+            out.append(f"<h{block['level']}>{block['html']}</h{block['level']}>")
+        elif kind == "paragraph":
+            out.append(f"<p>{block['html']}</p>")
+        elif kind == "quote":
+            out.append(f"<blockquote><p>{block['html']}</p></blockquote>")
+        elif kind == "rule":
+            out.append("<hr>")
+        elif kind == "code":
+            out.append(f"<pre><code>{html.escape(block['text'])}</code></pre>")
+        elif kind == "component":
+            attributes = "".join(
+                f' data-{name}="{html.escape(value, quote=True)}"'
+                for name, value in block["attributes"].items()
+            )
+            out.append(
+                f'<div class="lesson-component" data-component="{block["name"]}"{attributes}></div>'
+            )
+        elif kind == "fields":
+            out.append(f'<p class="lesson-fields">{block["html"]}</p>')
+        elif kind == "list":
+            tag = "ol" if block["ordered"] else "ul"
+            items = "".join(f"<li>{item['html']}</li>" for item in block["items"])
+            out.append(f"<{tag}>{items}</{tag}>")
+        elif kind == "checklist":
+            items = "".join(
+                f'<li><input type="checkbox" disabled{" checked" if item["checked"] else ""}> '
+                f"{render_inline(item['label'])}</li>"
+                for item in block["items"]
+            )
+            out.append(f'<ul class="lesson-checklist">{items}</ul>')
+        elif kind == "table":
+            header = "".join(f"<th>{render_inline(cell)}</th>" for cell in block["header"])
+            rows = "".join(
+                "<tr>" + "".join(f"<td>{render_inline(cell)}</td>" for cell in row) + "</tr>"
+                for row in block["rows"]
+            )
+            out.append(f"<table><thead><tr>{header}</tr></thead><tbody>{rows}</tbody></table>")
+    return "\n".join(out)
+
+
+def compile_section(text: str) -> dict:
+    """Compile one markdown section into its HTML and block AST."""
+    blocks = parse_blocks(text or "")
+    return {
+        "content_hash": content_hash(text or ""),
+        "html": render_blocks(blocks),
+        "blocks": blocks,
+    }
+
+
+class CompiledSectionCache:
+    """Bounded in-process cache of compiled sections keyed by content hash."""
+
+    def __init__(self, max_entries: int = _CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, compiled: dict) -> None:
+        self._entries[key] = compiled
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+compiled_cache = CompiledSectionCache()
+
+
+def lesson_section_hashes(lesson) -> Dict[str, str]:
+    """Return the content hash of each markdown section of a lesson."""
+    return {field: content_hash(getattr(lesson, field) or "") for field in SECTION_FIELDS}
+
+
+def lesson_content_hash(section_hashes: Dict[str, str]) -> str:
+    """Combine per-section hashes into a single lesson content hash."""
+    joined = "|".join(section_hashes[field] for field in SECTION_FIELDS)
+    return hashlib.sha256(joined.encode()).hexdigest()
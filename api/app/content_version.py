@@ -0,0 +1,183 @@
+"""
+Database-maintained content version.
+
+Lessons are also written outside the API: deploy and fix scripts connect
+with psycopg2 or their own engines. A trigger on the `lesson` table bumps a
+single `contentversion` row on every insert, update or delete, whoever makes
+it, so the version is always authoritative. On PostgreSQL the trigger also
+sends a "content:<version>" cache invalidation notification, except for API
+transactions (marked with mark_api_write), which announce each lesson they
+wrote with a "lesson:<id>@<version>" message instead.
+
+Each worker reads the row (a primary-key lookup) at most once every
+CONTENT_VERSION_CHECK_SECONDS, from requests and from a background check so
+idle workers converge too. API writes record the version they produced, both
+in the writing worker and, through their lesson messages, in the others,
+whose caches the message updates lesson by lesson. "content" messages force
+an immediate re-read. When the version moves in any other way, the search
+index is rebuilt and the guest list dropped; everything keyed by the version
+(packs, exports) misses on its own. Compiled sections are content-addressed
+and never go stale.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CONTENT_VERSION_CHECK_SECONDS = float(os.getenv("CONTENT_VERSION_CHECK_SECONDS", "1"))
+
+_SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS lesson_content_version_{operation.lower()}
+    AFTER {operation} ON lesson
+    BEGIN
+        UPDATE contentversion SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+    END
+    """
+    for operation in ("INSERT", "UPDATE", "DELETE")
+]
+
+_POSTGRES_TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION bump_content_version() RETURNS trigger AS $$
+    DECLARE
+        new_version bigint;
+    BEGIN
+        UPDATE contentversion SET version = version + 1, updated_at = timezone('utc', now())
+        WHERE id = 1 RETURNING version INTO new_version;
+        -- API transactions announce their lessons themselves
+        IF coalesce(current_setting('app.content_write', true), '') <> 'api' THEN
+            PERFORM pg_notify('cache_invalidate', 'content:' || new_version);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS lesson_content_version ON lesson",
+    """
+    CREATE TRIGGER lesson_content_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON lesson
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_content_version()
+    """,
+]
+
+TRIGGER_DDL = {"sqlite": _SQLITE_TRIGGERS, "postgresql": _POSTGRES_TRIGGERS}
+
+
+def install_content_version_triggers(connection) -> None:
+    """
+    Seed the version row and (re)create the lesson triggers. Idempotent.
+    Takes a synchronous connection: used by the migration and after create_all.
+    """
+    # A fresh epoch per database, so versions never repeat after a rebuild
+    connection.execute(text(
+        "INSERT INTO contentversion (id, epoch, version, updated_at) VALUES (1, :epoch, 0, :now) "
+        "ON CONFLICT (id) DO NOTHING"
+    ), {"epoch": uuid.uuid4().hex[:8], "now": datetime.utcnow()})
+    for statement in TRIGGER_DDL.get(connection.dialect.name, []):
+        connection.execute(text(statement))
+
+
+async def read_content_version(session: AsyncSession) -> Optional[str]:
+    """Version token from the row (epoch.counter), or None when it does not exist."""
+    row = (await session.execute(text("SELECT epoch, version FROM contentversion WHERE id = 1"))).first()
+    return f"{row.epoch}.{row.version}" if row else None
+
+
+async def mark_api_write(session: AsyncSession) -> None:
+    """Call before an API lesson write, so the PostgreSQL trigger does not announce it too."""
+    if session.bind.dialect.name == "postgresql":
+        await session.execute(text("SELECT set_config('app.content_write', 'api', true)"))
+
+
+def _is_older(version: str, than: Optional[str]) -> bool:
+    """Whether version precedes than (same database epoch, lower counter)."""
+    if than is None:
+        return False
+    epoch, _, counter = version.partition(".")
+    than_epoch, _, than_counter = than.partition(".")
+    return epoch == than_epoch and int(counter) < int(than_counter)
+
+
+class ContentVersionWatcher:
+    """Per-worker view of the content version, re-read at most once per interval."""
+
+    def __init__(self, interval: float = CONTENT_VERSION_CHECK_SECONDS, clock=time.monotonic):
+        self.interval = interval
+        self._clock = clock
+        self._version: Optional[str] = None
+        self._checked_at = float("-inf")
+        self._tasks: Set[asyncio.Task] = set()
+
+    def set(self, version: Optional[str]) -> None:
+        """Record a version whose writes this worker's caches already reflect."""
+        if version is not None and not _is_older(version, self._version):
+            self._version = version
+            self._checked_at = self._clock()
+
+    def expire(self) -> None:
+        """Re-read the version on the next call to current()."""
+        self._checked_at = float("-inf")
+
+    def reset(self) -> None:
+        self._version = None
+        self.expire()
+
+    async def current(self, session: AsyncSession) -> Optional[str]:
+        """The content version token, read from the database when the cached one is stale."""
+        now = self._clock()
+        if self._version is not None and now - self._checked_at < self.interval:
+            return self._version
+
+        version = await read_content_version(session)
+        self._checked_at = now
+        if self._version is not None and version != self._version:
+            metrics.inc("content_version_changes_total")
+            self._refresh_caches()
+        self._version = version
+        return version
+
+    async def watch(self, engine, interval: Optional[float] = None) -> None:
+        """Check the version on a timer, so idle workers notice out-of-band writes too."""
+        while True:
+            try:
+                async with AsyncSession(engine) as session:
+                    await self.current(session)
+            except Exception:
+                logger.warning("Content version check failed", exc_info=True)
+            await asyncio.sleep(interval or self.interval)
+
+    def _refresh_caches(self) -> None:
+        """Rebuild the per-worker caches derived from lessons (in the background)."""
+        # Import here to avoid circular imports
+        from app.response_cache import guest_lessons_cache
+
+        guest_lessons_cache.clear()
+        task = asyncio.create_task(_rebuild_search_index())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+async def _rebuild_search_index() -> None:
+    from app.crud import get_lessons
+    from app.deps import engine
+    from app.search import search_index
+
+    try:
+        async with AsyncSession(engine) as session:
+            search_index.build(await get_lessons(session, limit=None))
+    except Exception:
+        logger.warning("Search index rebuild after a content change failed", exc_info=True)
+
+
+content_version = ContentVersionWatcher()
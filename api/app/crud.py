@@ -1,47 +1,228 @@
 """
 CRUD operations for database models.
 """
-from datetime import datetime
-from typing import List, Optional
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 from sqlmodel import select
+from sqlalchemy import delete, func, insert, union, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import User, Lesson, LessonCompletion
+from app.content import (
+    SECTION_FIELDS,
+    compile_section,
+    compiled_cache,
+    lesson_content_hash,
+    lesson_section_hashes,
+)
+from app.content_version import content_version, mark_api_write, read_content_version
+from app.invalidation import publish_invalidation
+from app.live import announce_counters
+from app.models import (
+    User,
+    UserRole,
+    Lesson,
+    LessonCompletion,
+    ArchivedProgress,
+    CompiledSection,
+    LessonRevision,
+    RefreshToken,
+    StreamTicket,
+)
+from app.revisions import compress_delta, decompress_delta, lesson_snapshot, make_delta
+from app.search import search_index
 # from app.models import Reflection  # Temporarily disabled
 from app.schemas import UserCreate, LessonCreate, LessonUpdate
-from app.deps import get_password_hash
+from app.deps import (
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    generate_refresh_token,
+    get_password_hash,
+    hash_refresh_token,
+)
+from app.metrics import metrics
 
 
 # User CRUD
-async def create_user(session: AsyncSession, user_create: UserCreate) -> User:
-    """Create a new user."""
-    db_user = User(
+class DuplicateUserError(Exception):
+    """Registration hit a unique constraint on email or username."""
+
+    def __init__(self, field: str):
+        super().__init__(f"Duplicate user {field}")
+        self.field = field
+
+
+def _duplicate_user_field(error: IntegrityError) -> Optional[str]:
+    """Name the User column behind a unique violation (SQLite or PostgreSQL)."""
+    orig = error.orig
+    # asyncpg reports the violated index; SQLite only has the message
+    constraint = getattr(orig, "constraint_name", None) or getattr(
+        getattr(orig, "__cause__", None), "constraint_name", None
+    )
+    text = f"{constraint or ''} {orig}".lower()
+    for field in ("email", "username"):
+        if f"user_{field}" in text or f"user.{field}" in text or f"({field})" in text:
+            return field
+    return None
+
+
+async def create_user(
+    session: AsyncSession,
+    user_create: UserCreate,
+    hashed_password: Optional[str] = None
+) -> User:
+    """
+    Create a new user with a single INSERT ... RETURNING.
+    Uniqueness is enforced by the database; duplicates raise DuplicateUserError.
+    Pass hashed_password to hash before the transaction starts.
+    """
+    statement = insert(User).values(
         email=user_create.email,
         username=user_create.username,
-        hashed_password=get_password_hash(user_create.password)
-    )
-    session.add(db_user)
-    await session.commit()
-    await session.refresh(db_user)
+        hashed_password=hashed_password or get_password_hash(user_create.password),
+        role=UserRole.USER,
+        is_active=True,
+        created_at=datetime.utcnow(),
+    ).returning(User)
+    try:
+        result = await session.execute(statement)
+        db_user = result.scalar_one()
+        # RETURNING already loaded every column; keep it readable after commit
+        session.expunge(db_user)
+        await announce_counters(session, total_users=1, active_users=1)
+        await session.commit()
+    except IntegrityError as error:
+        await session.rollback()
+        field = _duplicate_user_field(error)
+        if field is None:
+            raise
+        raise DuplicateUserError(field) from error
     return db_user
 
 
 async def get_user_by_email(session: AsyncSession, email: str) -> Optional[User]:
-    """Get user by email."""
-    statement = select(User).where(User.email == email)
+    """Get user by email, ignoring case (uses ix_user_email_lower)."""
+    statement = select(User).where(func.lower(User.email) == func.lower(email))
     result = await session.execute(statement)
     return result.scalar_one_or_none()
 
 
 async def get_user_by_username(session: AsyncSession, username: str) -> Optional[User]:
-    """Get user by username."""
-    statement = select(User).where(User.username == username)
+    """Get user by username, ignoring case (uses ix_user_username_lower)."""
+    statement = select(User).where(func.lower(User.username) == func.lower(username))
     result = await session.execute(statement)
     return result.scalar_one_or_none()
 
 
+# Refresh token CRUD
+async def issue_refresh_token(
+    session: AsyncSession,
+    user_id: int,
+    family_id: Optional[str] = None,
+    commit: bool = True
+) -> str:
+    """Store a new refresh token and return its raw value."""
+    token = generate_refresh_token()
+    session.add(RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    if commit:
+        await session.commit()
+    return token
+
+
+async def rotate_refresh_token(session: AsyncSession, token: str) -> Optional[Tuple[User, str]]:
+    """
+    Exchange a refresh token for a new one in the same family.
+    Presenting an already-rotated token revokes the whole family, since either
+    the client or an attacker holds a stolen copy. Returns None if rejected.
+    """
+    statement = select(RefreshToken, User).join(
+        User, User.id == RefreshToken.user_id
+    ).where(RefreshToken.token_hash == hash_refresh_token(token))
+    result = await session.execute(statement)
+    row = result.first()
+    if not row:
+        return None
+    
+    stored, user = row
+    now = datetime.utcnow()
+    if stored.revoked_at or stored.expires_at <= now or not user.is_active:
+        return None
+    # Keep the loaded user usable after commit without another round trip
+    session.expunge(user)
+    
+    # Claim the token atomically so concurrent refreshes cannot both succeed
+    claimed = await session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == stored.id, RefreshToken.used_at.is_(None))
+        .values(used_at=now)
+    )
+    if claimed.rowcount != 1:
+        await revoke_refresh_token_family(session, stored.family_id)
+        metrics.inc("refresh_token_reuse_total")
+        return None
+    
+    # Claim and replacement commit together
+    new_token = await issue_refresh_token(session, user.id, stored.family_id, commit=False)
+    await session.commit()
+    return user, new_token
+
+
+async def revoke_refresh_token_family(session: AsyncSession, family_id: str) -> None:
+    """Revoke every token issued from one login."""
+    await session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+    await session.commit()
+
+
+async def revoke_refresh_token(session: AsyncSession, token: str) -> bool:
+    """Revoke the family of a presented refresh token (logout)."""
+    result = await session.execute(
+        select(RefreshToken.family_id).where(RefreshToken.token_hash == hash_refresh_token(token))
+    )
+    family_id = result.scalar_one_or_none()
+    if family_id is None:
+        return False
+    await revoke_refresh_token_family(session, family_id)
+    return True
+
+
+# Stream ticket CRUD
+async def issue_stream_ticket(session: AsyncSession, user_id: int, expires_in: timedelta) -> str:
+    """Store a single-use stream ticket and return its raw value; expired tickets are pruned."""
+    ticket = generate_refresh_token()
+    now = datetime.utcnow()
+    await session.execute(delete(StreamTicket).where(StreamTicket.expires_at <= now))
+    session.add(StreamTicket(token_hash=hash_refresh_token(ticket), user_id=user_id, expires_at=now + expires_in))
+    await session.commit()
+    return ticket
+
+
+async def redeem_stream_ticket(session: AsyncSession, ticket: str) -> Optional[User]:
+    """Consume a stream ticket; returns its user, or None if it is unknown, used or expired."""
+    # Deleting claims it atomically, so a ticket opens one stream on one worker only
+    result = await session.execute(
+        delete(StreamTicket)
+        .where(StreamTicket.token_hash == hash_refresh_token(ticket))
+        .returning(StreamTicket.user_id, StreamTicket.expires_at)
+    )
+    claimed = result.first()
+    await session.commit()
+    if claimed is None or claimed.expires_at <= datetime.utcnow():
+        return None
+    return await get_user_by_id(session, claimed.user_id)
+
+
 # Lesson CRUD
-async def get_lessons(session: AsyncSession, skip: int = 0, limit: int = 100, include_unpublished: bool = False) -> List[Lesson]:
+async def get_lessons(session: AsyncSession, skip: int = 0, limit: Optional[int] = 100, include_unpublished: bool = False) -> List[Lesson]:
     """Get all lessons ordered by order field."""
     statement = select(Lesson).order_by(Lesson.order).offset(skip).limit(limit)
     if not include_unpublished:
@@ -51,6 +232,22 @@ async def get_lessons(session: AsyncSession, skip: int = 0, limit: int = 100, in
     return result.scalars().all()
 
 
+def guest_lesson_list(lessons: List[Lesson]) -> List[dict]:
+    """Lesson list as shown to unauthenticated visitors."""
+    return [
+        {
+            'id': lesson.id,
+            'title': lesson.title,
+            'slug': lesson.slug,
+            'order': lesson.order,
+            'module_number': getattr(lesson, 'module_number', 1),
+            'is_unlocked': lesson.order <= 2,  # Only first module unlocked for guests
+            'is_completed': False
+        }
+        for lesson in lessons
+    ]
+
+
 async def get_lesson(session: AsyncSession, lesson_id: int) -> Optional[Lesson]:
     """Get lesson by ID."""
     statement = select(Lesson).where(Lesson.id == lesson_id)
@@ -65,12 +262,26 @@ async def get_lesson_by_slug(session: AsyncSession, slug: str) -> Optional[Lesso
     return result.scalar_one_or_none()
 
 
+async def publish_lesson_change(session: AsyncSession, lesson_id: int, version: Optional[str]) -> None:
+    """Tell other workers to re-read a lesson; they take on the content version it produced."""
+    await publish_invalidation(session, "lesson", f"{lesson_id}@{version}" if version else lesson_id)
+
+
 async def create_lesson(session: AsyncSession, lesson_create: LessonCreate) -> Lesson:
     """Create a new lesson."""
+    await mark_api_write(session)
     db_lesson = Lesson(**lesson_create.model_dump())
     session.add(db_lesson)
+    await session.flush()
+    add_lesson_revision(session, db_lesson.id, "create", make_delta({}, lesson_snapshot(db_lesson)))
+    await store_compiled_sections(session, db_lesson)
+    version = await read_content_version(session)
+    await publish_lesson_change(session, db_lesson.id, version)
+    await announce_counters(session, total_lessons=1)
     await session.commit()
     await session.refresh(db_lesson)
+    search_index.add(db_lesson)
+    content_version.set(version)
     return db_lesson
 
 
@@ -84,13 +295,23 @@ async def update_lesson(
     if not db_lesson:
         return None
     
+    await mark_api_write(session)
+    before = lesson_snapshot(db_lesson)
     lesson_data = lesson_update.model_dump(exclude_unset=True)
     for key, value in lesson_data.items():
         setattr(db_lesson, key, value)
     
     db_lesson.updated_at = datetime.utcnow()
+    delta = make_delta(before, lesson_snapshot(db_lesson))
+    if delta:
+        add_lesson_revision(session, lesson_id, "update", delta)
+    await store_compiled_sections(session, db_lesson)
+    version = await read_content_version(session)
+    await publish_lesson_change(session, lesson_id, version)
     await session.commit()
     await session.refresh(db_lesson)
+    search_index.add(db_lesson)
+    content_version.set(version)
     return db_lesson
 
 
@@ -100,11 +321,208 @@ async def delete_lesson(session: AsyncSession, lesson_id: int) -> bool:
     if not db_lesson:
         return False
     
+    await mark_api_write(session)
     await session.delete(db_lesson)
+    add_lesson_revision(session, lesson_id, "delete", {})
+    version = await read_content_version(session)
+    await publish_lesson_change(session, lesson_id, version)
+    await announce_counters(session, total_lessons=-1)
     await session.commit()
+    search_index.remove(lesson_id)
+    content_version.set(version)
     return True
 
 
+# Lesson revision CRUD
+def add_lesson_revision(session: AsyncSession, lesson_id: int, operation: str, delta: dict) -> LessonRevision:
+    """Stage a revision record; it commits with the lesson write itself."""
+    revision = LessonRevision(
+        lesson_id=lesson_id,
+        operation=operation,
+        changed_fields=",".join(delta),
+        delta=compress_delta(delta),
+    )
+    session.add(revision)
+    return revision
+
+
+# Revisions younger than this may still have lower-id siblings about to commit
+REVISION_SETTLE_SECONDS = 5
+# Revisions looked at (newest first) when finding the settled version
+REVISION_SETTLE_SCAN = 100
+
+
+async def get_catalog_version(session: AsyncSession, settle_seconds: Optional[float] = None) -> int:
+    """
+    Current catalog version: the id of the latest lesson revision that no
+    earlier revision can still commit behind.
+
+    PostgreSQL hands out ids when rows are inserted, not when they commit, so
+    a slow transaction can commit id 7 after id 8 was served. The version
+    stops below the first revision younger than REVISION_SETTLE_SECONDS.
+    SQLite runs one write transaction at a time, so its ids commit in order.
+    """
+    if settle_seconds is None:
+        settle_seconds = 0 if session.bind.dialect.name == "sqlite" else REVISION_SETTLE_SECONDS
+    latest = select(func.max(LessonRevision.id)).scalar_subquery()
+    result = await session.execute(
+        select(LessonRevision.id, LessonRevision.created_at)
+        .where(LessonRevision.id > latest - REVISION_SETTLE_SCAN)
+        .order_by(LessonRevision.id.desc())
+    )
+    rows = result.all()
+    if not rows:
+        return 0
+    settled = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    version = rows[0].id
+    for revision_id, created_at in rows:
+        if created_at > settled:
+            version = revision_id - 1
+    return version
+
+
+async def get_content_version(session: AsyncSession) -> str:
+    """
+    Opaque token that changes whenever published lesson content may have changed.
+    Comes from the trigger-maintained contentversion row (cached per worker), so
+    writes made outside the API produce a new token too.
+    """
+    version = await content_version.current(session)
+    if version is not None:
+        return version
+    # Database without the contentversion row: derive a token from the lesson table
+    from sqlalchemy import func
+    result = await session.execute(
+        select(func.count(Lesson.id), func.max(Lesson.id), func.max(Lesson.updated_at))
+    )
+    count, max_id, last_updated = result.one()
+    stamp = last_updated.strftime("%Y%m%d%H%M%S%f") if last_updated else "0"
+    return f"{await get_catalog_version(session)}.{count}.{max_id or 0}.{stamp}"
+
+
+async def get_lesson_changes(
+    session: AsyncSession,
+    since: int,
+    include_deltas: bool = False,
+    limit: int = 500
+) -> dict:
+    """Get lesson revisions recorded after the given catalog version, up to the current one."""
+    current = await get_catalog_version(session)
+    statement = (
+        select(LessonRevision)
+        .where(LessonRevision.id > since, LessonRevision.id <= current)
+        .order_by(LessonRevision.id)
+        .limit(limit + 1)
+    )
+    result = await session.execute(statement)
+    revisions = result.scalars().all()
+    has_more = len(revisions) > limit
+    revisions = revisions[:limit]
+
+    changes = []
+    for revision in revisions:
+        change = {
+            "version": revision.id,
+            "lesson_id": revision.lesson_id,
+            "operation": revision.operation,
+            "changed_fields": revision.changed_fields.split(",") if revision.changed_fields else [],
+        }
+        if include_deltas:
+            change["delta"] = decompress_delta(revision.delta)
+        changes.append(change)
+
+    version = revisions[-1].id if revisions else current
+    return {
+        "version": version,
+        "has_more": has_more,
+        # A client ahead of the server (e.g. after a database restore) must resync
+        "full_resync": since > version,
+        "lesson_ids": sorted({change["lesson_id"] for change in changes}),
+        "changes": changes,
+    }
+
+
+# Compiled content CRUD
+async def store_compiled_sections(session: AsyncSession, lesson: Lesson) -> dict:
+    """
+    Compile a lesson's markdown sections and stage any that are not stored yet.
+    Sections are content-addressed, so unchanged text is never recompiled.
+    The caller is responsible for committing.
+    """
+    hashes = lesson_section_hashes(lesson)
+    result = await session.execute(
+        select(CompiledSection.content_hash).where(
+            CompiledSection.content_hash.in_(set(hashes.values()))
+        )
+    )
+    stored = set(result.scalars().all())
+
+    sections = {}
+    for field in SECTION_FIELDS:
+        key = hashes[field]
+        compiled = compiled_cache.get(key)
+        if compiled is None:
+            compiled = compile_section(getattr(lesson, field) or "")
+            compiled_cache.put(key, compiled)
+        if key not in stored:
+            session.add(CompiledSection(
+                content_hash=key,
+                html=compiled["html"],
+                blocks=json.dumps(compiled["blocks"]),
+            ))
+            stored.add(key)
+        sections[field] = compiled
+    return sections
+
+
+async def get_compiled_lesson(session: AsyncSession, lesson: Lesson) -> dict:
+    """
+    Get the compiled sections of a lesson.
+    Served from the in-process cache, then the compiled table; content written
+    out-of-band (deploy scripts) is compiled on first read and stored.
+    """
+    hashes = lesson_section_hashes(lesson)
+    sections = {field: compiled_cache.get(key) for field, key in hashes.items()}
+    missing = {key for field, key in hashes.items() if sections[field] is None}
+
+    if missing:
+        result = await session.execute(
+            select(CompiledSection).where(CompiledSection.content_hash.in_(missing))
+        )
+        for row in result.scalars().all():
+            compiled = {
+                "content_hash": row.content_hash,
+                "html": row.html,
+                "blocks": json.loads(row.blocks),
+            }
+            compiled_cache.put(row.content_hash, compiled)
+        sections = {field: compiled_cache.get(key) for field, key in hashes.items()}
+
+        if any(compiled is None for compiled in sections.values()):
+            sections = await store_compiled_sections(session, lesson)
+            try:
+                await session.commit()
+            except IntegrityError:
+                # Another request stored the same content concurrently
+                await session.rollback()
+
+    return {
+        "id": lesson.id,
+        "content_hash": lesson_content_hash(hashes),
+        "sections": sections,
+    }
+
+
+async def compile_all_lessons(session: AsyncSession) -> int:
+    """Compile and store every lesson's sections. Returns the lesson count."""
+    result = await session.execute(select(Lesson))
+    lessons = result.scalars().all()
+    for lesson in lessons:
+        await store_compiled_sections(session, lesson)
+    await session.commit()
+    return len(lessons)
+
+
 # Lesson Completion CRUD
 async def create_lesson_completion(
     session: AsyncSession, 
@@ -123,6 +541,16 @@ async def create_lesson_completion(
     if existing:
         return existing  # Already completed
     
+    archived = await session.get(ArchivedProgress, (user_id, lesson_id))
+    if archived:
+        # Completed before archival; report the original completion
+        return LessonCompletion(
+            id=archived.completion_id,
+            user_id=user_id,
+            lesson_id=lesson_id,
+            completed_at=archived.completed_at
+        )
+    
     # Verify lesson exists
     lesson = await get_lesson(session, lesson_id)
     if not lesson:
@@ -130,11 +558,34 @@ async def create_lesson_completion(
     
     db_completion = LessonCompletion(user_id=user_id, lesson_id=lesson_id)
     session.add(db_completion)
+    await announce_counters(session, total_completions=1)
     await session.commit()
     await session.refresh(db_completion)
     return db_completion
 
 
+def completed_lesson_ids_query(user_id: int):
+    """Distinct lesson ids a user has completed, including archived completions."""
+    return union(
+        select(LessonCompletion.lesson_id).where(LessonCompletion.user_id == user_id),
+        select(ArchivedProgress.lesson_id).where(ArchivedProgress.user_id == user_id),
+    )
+
+
+async def get_completed_lesson_ids(session: AsyncSession, user_id: int) -> List[int]:
+    """Lesson ids a user has completed, live or archived."""
+    result = await session.execute(completed_lesson_ids_query(user_id))
+    return [row[0] for row in result.all()]
+
+
+async def count_user_completions(session: AsyncSession, user_id: int) -> int:
+    """Number of distinct lessons a user has completed, live or archived."""
+    result = await session.execute(
+        select(func.count()).select_from(completed_lesson_ids_query(user_id).subquery())
+    )
+    return result.scalar() or 0
+
+
 async def get_user_completions(session: AsyncSession, user_id: int) -> List[LessonCompletion]:
     """Get all lesson completions for a user."""
     statement = select(LessonCompletion).where(LessonCompletion.user_id == user_id)
@@ -149,14 +600,11 @@ async def get_lesson_completion_stats(session: AsyncSession, user_id: int) -> di
     total_result = await session.execute(total_statement)
     total_lessons = len(total_result.scalars().all())
     
-    # Get completed lessons
-    completed_statement = select(LessonCompletion).where(LessonCompletion.user_id == user_id)
-    completed_result = await session.execute(completed_statement)
-    completed_lessons = completed_result.scalars().all()
-    completed_count = len(completed_lessons)
+    # Get completed lessons (live and archived)
+    completed_lesson_ids = await get_completed_lesson_ids(session, user_id)
+    completed_count = len(completed_lesson_ids)
     
     completion_percentage = (completed_count / total_lessons * 100) if total_lessons > 0 else 0
-    completed_lesson_ids = [completion.lesson_id for completion in completed_lessons]
     
     return {
         "total_lessons": total_lessons,
@@ -182,10 +630,9 @@ async def get_users_with_progress(session: AsyncSession, skip: int = 0, limit: i
     total_lessons_result = await session.execute(select(func.count(Lesson.id)))
     total_lessons = total_lessons_result.scalar() or 0
     
-    # Get users with their completion counts and last activity
+    # Get users with their last activity
     statement = select(
         User,
-        func.count(LessonCompletion.id).label('completed_lessons_count'),
         func.max(LessonCompletion.completed_at).label('last_activity')
     ).outerjoin(
         LessonCompletion, User.id == LessonCompletion.user_id
@@ -194,21 +641,29 @@ async def get_users_with_progress(session: AsyncSession, skip: int = 0, limit: i
     result = await session.execute(statement)
     rows = result.all()
     
+    # Last archived activity for this page of users
+    archived_result = await session.execute(
+        select(
+            ArchivedProgress.user_id,
+            func.max(ArchivedProgress.completed_at)
+        ).where(
+            ArchivedProgress.user_id.in_([row.User.id for row in rows])
+        ).group_by(ArchivedProgress.user_id)
+    )
+    archived_activity = dict(archived_result.all())
+    
     users_with_progress = []
     for row in rows:
         user = row.User
-        completed_count = row.completed_lessons_count or 0
-        last_activity = row.last_activity
-        
-        # Calculate progress percentage
-        progress_percentage = (completed_count / total_lessons * 100) if total_lessons > 0 else 0.0
+        last_activity = row.last_activity or archived_activity.get(user.id)
         
         # Get current lesson (next incomplete lesson)
         current_lesson = None
-        completed_lesson_ids_result = await session.execute(
-            select(LessonCompletion.lesson_id).where(LessonCompletion.user_id == user.id)
-        )
-        completed_lesson_ids = [row[0] for row in completed_lesson_ids_result.all()]
+        completed_lesson_ids = await get_completed_lesson_ids(session, user.id)
+        completed_count = len(completed_lesson_ids)
+        
+        # Calculate progress percentage
+        progress_percentage = (completed_count / total_lessons * 100) if total_lessons > 0 else 0.0
         
         if completed_count < total_lessons:
             next_lesson_result = await session.execute(
@@ -275,7 +730,8 @@ async def get_total_lesson_completions(session: AsyncSession) -> int:
     from sqlalchemy import func
     statement = select(func.count(LessonCompletion.id))
     result = await session.execute(statement)
-    return result.scalar() or 0
+    archived_result = await session.execute(select(func.count()).select_from(ArchivedProgress))
+    return (result.scalar() or 0) + (archived_result.scalar() or 0)
 
 
 # Module progression functions
@@ -292,15 +748,13 @@ async def get_user_module_progress(session: AsyncSession, user_id: int) -> dict:
     )
     modules_data = modules_result.all()
     
-    # Get user's completed lessons per module
+    # Get user's completed lessons per module (live and archived)
     completions_result = await session.execute(
         select(
             Lesson.module_number,
-            func.count(LessonCompletion.id).label('completed_lessons')
-        ).join(
-            LessonCompletion, Lesson.id == LessonCompletion.lesson_id
+            func.count(Lesson.id).label('completed_lessons')
         ).where(
-            LessonCompletion.user_id == user_id
+            Lesson.id.in_(completed_lesson_ids_query(user_id))
         ).group_by(Lesson.module_number)
     )
     completions_data = {row.module_number: row.completed_lessons for row in completions_result.all()}
@@ -368,10 +822,7 @@ async def get_lessons_with_unlock_status(session: AsyncSession, user_id: int) ->
     module_progress = await get_user_module_progress(session, user_id)
     
     # Get user's completed lessons
-    completed_result = await session.execute(
-        select(LessonCompletion.lesson_id).where(LessonCompletion.user_id == user_id)
-    )
-    completed_lesson_ids = {row[0] for row in completed_result.all()}
+    completed_lesson_ids = set(await get_completed_lesson_ids(session, user_id))
     
     # Add unlock status to each lesson
     lessons_with_status = []
@@ -1,35 +1,85 @@
 """
 Dependency injection for database connections and authentication.
 """
+import asyncio
+import functools
+import hashlib
+import hmac
+import logging
+import math
 import os
+import secrets
+import time
 from datetime import datetime, timedelta
-from typing import Optional, AsyncGenerator
-from fastapi import Depends, HTTPException, status
+from typing import Optional, AsyncGenerator, Set
+from fastapi import Depends, Header, HTTPException, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlmodel import SQLModel, select
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
+from app.metrics import metrics
 from app.models import User
 from app.schemas import TokenData
+from app.sqlite_profile import SerializedWriteSession, configure_sqlite_engine, profile_enabled
+from app.token_cache import token_cache
 
-# Database configuration
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./resilient_mastery.db")
+logger = logging.getLogger(__name__)
+
+
+def _async_database_url(url: str) -> str:
+    """Convert postgresql:// to postgresql+asyncpg:// (Render provides the former)."""
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
 
-# Fix for Render: Convert postgresql:// to postgresql+asyncpg://
-if DATABASE_URL.startswith("postgresql://"):
-    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+# Database configuration
+DATABASE_URL = _async_database_url(os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./resilient_mastery.db"))
+# Optional read replica for read-only routes
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+if DATABASE_READ_URL:
+    DATABASE_READ_URL = _async_database_url(DATABASE_READ_URL)
+# Seconds a user's reads stay on the primary after they write (read-your-writes)
+READ_AFTER_WRITE_SECONDS = float(os.getenv("READ_AFTER_WRITE_SECONDS", "5"))
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+# bcrypt cost factor; pick one for the host with `python -m app.calibrate_bcrypt`
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
 # Create async engine
 engine = create_async_engine(DATABASE_URL, echo=True)
+# Replica engine; falls back to the primary when no replica is configured
+read_engine = create_async_engine(DATABASE_READ_URL, echo=True) if DATABASE_READ_URL else engine
+
+# SQLite: tuned PRAGMAs on connect, and write transactions queued on one writer lock
+session_class = AsyncSession
+if profile_enabled(engine):
+    configure_sqlite_engine(engine)
+    session_class = SerializedWriteSession
+if read_engine is not engine and profile_enabled(read_engine):
+    configure_sqlite_engine(read_engine)
+
+
+class InvalidTokenError(Exception):
+    """An access token failed verification or has expired."""
+
+
+@functools.lru_cache(maxsize=None)
+def password_context():
+    """
+    Password hashing context, built on first use.
+    passlib (and jose, below) are imported lazily to keep them off the cold-start path.
+    Hashes with a different cost are reported by needs_update and rehashed on login.
+    """
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Background rehash tasks, referenced so they are not garbage collected mid-run
+_rehash_tasks: Set[asyncio.Task] = set()
 
 # HTTP Bearer for JWT tokens
 security = HTTPBearer()
@@ -44,18 +94,79 @@ async def create_db_and_tables():
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Get database session."""
-    async with AsyncSession(engine) as session:
+    async with session_class(engine) as session:
+        yield session
+
+
+class RecentWriters:
+    """
+    Read-your-writes pins, held by the client rather than by any one worker.
+    A write response carries a signed "<until>.<signature>" pin in the
+    READ_PIN_HEADER header; the client sends it back with its reads, and
+    whichever worker serves them routes them to the primary until it expires.
+    """
+
+    def __init__(self, window: float = READ_AFTER_WRITE_SECONDS, secret: str = SECRET_KEY, clock=time.time):
+        self.window = window
+        self._secret = secret.encode()
+        self._clock = clock
+
+    def _signature(self, username: str, until: int) -> str:
+        message = f"{username}:{until}".encode()
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()[:32]
+
+    def pin(self, username: str) -> str:
+        """A pin keeping the user's reads on the primary for the window."""
+        until = math.ceil(self._clock() + self.window)
+        return f"{until}.{self._signature(username, until)}"
+
+    def is_recent(self, username: str, pin: Optional[str]) -> bool:
+        """Whether pin was issued to username and has not expired."""
+        until, _, signature = (pin or "").partition(".")
+        if not until.isdigit() or int(until) <= self._clock():
+            return False
+        return hmac.compare_digest(signature, self._signature(username, int(until)))
+
+
+READ_PIN_HEADER = "X-Read-Primary-Until"
+recent_writers = RecentWriters()
+
+
+def mark_recent_write(user: User, response: Response) -> None:
+    """Call before a write so the user's next reads (sending the pin back) go to the primary."""
+    response.headers[READ_PIN_HEADER] = recent_writers.pin(user.username)
+
+
+async def get_read_session(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    read_pin: Optional[str] = Header(None, alias=READ_PIN_HEADER)
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Get a database session for read-only routes.
+    Uses the replica unless the caller sends a valid read-your-writes pin,
+    checked against the (cached) token claims so routing costs no query.
+    """
+    target = read_engine
+    if target is not engine and credentials and read_pin:
+        try:
+            username = decode_access_token(credentials.credentials).get("sub")
+        except InvalidTokenError:
+            username = None
+        if username and recent_writers.is_recent(username, read_pin):
+            target = engine
+    metrics.inc("db_read_sessions_total", target="primary" if target is engine else "replica")
+    async with session_class(target) as session:
         yield session
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plaintext password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password."""
-    return pwd_context.hash(password)
+    return password_context().hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -66,10 +177,71 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def decode_access_token(token: str) -> dict:
+    """
+    Verify a JWT and return its claims, consulting the verified-token cache first.
+    Raises InvalidTokenError if the token is invalid or expired.
+    """
+    claims = token_cache.get(token)
+    if claims is None:
+        from jose import JWTError, jwt
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError as exc:
+            raise InvalidTokenError(str(exc)) from exc
+        token_cache.put(token, claims)
+    return claims
+
+
+def generate_refresh_token() -> str:
+    """Create a new opaque refresh token."""
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Digest a refresh token for storage and lookup.
+    Tokens are 256-bit random values, so a fast hash is sufficient (unlike passwords).
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def rehash_password(user_id: int, old_hash: str, password: str) -> None:
+    """Replace a hash made with outdated settings, unless it changed meanwhile."""
+    new_hash = await asyncio.to_thread(get_password_hash, password)
+    async with session_class(engine) as session:
+        user = await session.get(User, user_id)
+        if user is None or user.hashed_password != old_hash:
+            return
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
+
+
+def schedule_rehash(user: User, password: str) -> None:
+    """Rehash a password in the background so login latency is unaffected."""
+    task = asyncio.create_task(rehash_password(user.id, user.hashed_password, password))
+    _rehash_tasks.add(task)
+
+    def _done(finished: asyncio.Task) -> None:
+        _rehash_tasks.discard(finished)
+        if not finished.cancelled() and finished.exception():
+            logger.warning("Password rehash failed", exc_info=finished.exception())
+
+    task.add_done_callback(_done)
+
+
+async def wait_for_rehashes() -> None:
+    """Wait for pending background rehashes (used at shutdown and in tests)."""
+    if _rehash_tasks:
+        await asyncio.gather(*list(_rehash_tasks), return_exceptions=True)
+
+
 async def authenticate_user(session: AsyncSession, username: str, password: str) -> Optional[User]:
     """Authenticate a user."""
     # Import here to avoid circular imports
@@ -77,6 +249,8 @@ async def authenticate_user(session: AsyncSession, username: str, password: str)
     user = await get_user_by_username(session, username)
     if not user or not verify_password(password, user.hashed_password):
         return None
+    if password_context().needs_update(user.hashed_password):
+        schedule_rehash(user, password)
     return user
 
 
@@ -85,19 +259,26 @@ async def get_current_user(
     session: AsyncSession = Depends(get_session)
 ) -> User:
     """Get the current authenticated user."""
+    return await get_user_from_token(session, credentials.credentials)
+
+
+async def get_user_from_token(session: AsyncSession, token: Optional[str]) -> User:
+    """The user an access token belongs to; raises 401 if it is missing or invalid."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not token:
+        raise credentials_exception
     
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
         token_data = TokenData(username=username)
-    except JWTError:
+    except InvalidTokenError:
         raise credentials_exception
     
     # Import here to avoid circular imports
@@ -126,11 +307,11 @@ async def get_current_user_optional(
         return None
     
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(credentials.credentials)
         username: str = payload.get("sub")
         if username is None:
             return None
-    except JWTError:
+    except InvalidTokenError:
         return None
     
     # Import here to avoid circular imports
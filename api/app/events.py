@@ -0,0 +1,181 @@
+"""
+Batched writer for the learning event log.
+
+POST /api/events validates a batch and hands it to the writer; the response
+never waits for the database. The writer buffers events and writes them every
+EVENT_FLUSH_MS milliseconds, or as soon as EVENT_FLUSH_SIZE are waiting, with
+one statement per chunk: COPY on PostgreSQL (asyncpg), a multi-row INSERT
+elsewhere (through the SQLite writer lock).
+
+Memory is bounded: at most EVENT_BUFFER_SIZE events are held, counting the
+chunk being written. Batches that do not fit are refused, and the client
+retries them later. A chunk the database refuses for its data is split in
+halves until the offending rows are found; those are dropped and counted, the
+rest written. Any other failed write (e.g. a lost connection) goes back to the
+front of the buffer and is retried on the next flush. Shutdown stops the timer
+and flushes what is left; events are lost only if the process is killed.
+"""
+import asyncio
+import logging
+import os
+import sys
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.metrics import metrics
+from app.models import LearningEvent
+
+logger = logging.getLogger(__name__)
+
+EVENT_FLUSH_MS = int(os.getenv("EVENT_FLUSH_MS", "250"))
+EVENT_FLUSH_SIZE = int(os.getenv("EVENT_FLUSH_SIZE", "500"))
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "20000"))
+# Serialized `data` larger than this is refused
+MAX_EVENT_DATA_BYTES = 2048
+# Accepted range of occurred_at around the time an event is received
+MAX_EVENT_AGE = timedelta(days=7)
+MAX_EVENT_CLOCK_SKEW = timedelta(hours=1)
+
+COLUMNS = ("user_id", "event_type", "lesson_id", "data", "occurred_at", "received_at")
+EventRow = Tuple  # Values in COLUMNS order
+
+
+async def write_events(engine: AsyncEngine, rows: List[EventRow]) -> None:
+    """Append rows to learning_event in one statement."""
+    if engine.dialect.driver == "asyncpg":
+        async with engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            # Outside a transaction block asyncpg commits the COPY on its own
+            await raw.driver_connection.copy_records_to_table(
+                LearningEvent.__tablename__, records=rows, columns=COLUMNS
+            )
+        return
+
+    # Import here to avoid circular imports
+    from app.deps import session_class
+
+    async with session_class(engine) as session:
+        await session.execute(insert(LearningEvent).values([dict(zip(COLUMNS, row)) for row in rows]))
+        await session.commit()
+
+
+def refused_for_data(error: Exception) -> bool:
+    """Whether a write failed because of the rows themselves, so retrying them cannot help."""
+    if isinstance(error, (DataError, IntegrityError, OverflowError, ValueError, TypeError)):
+        return True
+    asyncpg = sys.modules.get("asyncpg")
+    return asyncpg is not None and isinstance(error, (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError))
+
+
+class EventWriter:
+    """In-process buffer of learning events, flushed in chunks on a timer or by size."""
+
+    def __init__(
+        self,
+        flush_interval: float = EVENT_FLUSH_MS / 1000,
+        flush_size: int = EVENT_FLUSH_SIZE,
+        max_buffered: int = EVENT_BUFFER_SIZE
+    ):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_buffered = max_buffered
+        self._buffer: List[EventRow] = []
+        self._in_flight = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def __len__(self) -> int:
+        return len(self._buffer) + self._in_flight
+
+    def submit(self, rows: List[EventRow]) -> bool:
+        """Queue rows for writing; False (nothing queued) when they do not fit."""
+        if len(self) + len(rows) > self.max_buffered:
+            metrics.inc("learning_events_rejected_total", len(rows))
+            return False
+        self._buffer.extend(rows)
+        metrics.inc("learning_events_accepted_total", len(rows))
+        if len(self._buffer) >= self.flush_size and self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    async def flush(self, engine: AsyncEngine) -> int:
+        """Write everything buffered, chunk by chunk; returns the number of rows written."""
+        written = 0
+        while self._buffer:
+            chunk = self._buffer[:self.flush_size]
+            del self._buffer[:self.flush_size]
+            self._in_flight = len(chunk)
+            try:
+                chunk_written, unwritten = await self._write_chunk(engine, chunk)
+            finally:
+                self._in_flight = 0
+            written += chunk_written
+            metrics.inc("learning_events_written_total", chunk_written)
+            if unwritten:
+                self._buffer[:0] = unwritten
+                break
+        return written
+
+    async def _write_chunk(self, engine: AsyncEngine, chunk: List[EventRow]) -> Tuple[int, List[EventRow]]:
+        """
+        Write a chunk, bisecting around rows the database refuses.
+        Returns the number of rows written and the rows to retry later.
+        """
+        written = 0
+        parts = [chunk]  # Stack of parts still to write, next one last
+        while parts:
+            part = parts.pop()
+            try:
+                await write_events(engine, part)
+            except Exception as error:
+                if not refused_for_data(error):
+                    logger.warning("Writing %d learning events failed; will retry", len(chunk) - written, exc_info=True)
+                    metrics.inc("learning_event_flush_failures_total")
+                    return written, [row for rows in [part] + parts[::-1] for row in rows]
+                if len(part) == 1:
+                    logger.warning("Dropping a learning event the database refused: %r", part[0], exc_info=True)
+                    metrics.inc("learning_events_dropped_total", reason="invalid")
+                else:
+                    middle = len(part) // 2
+                    parts += [part[middle:], part[:middle]]
+                continue
+            written += len(part)
+        return written, []
+
+    def start(self, engine: AsyncEngine) -> None:
+        """Start flushing in the background (call from the running event loop)."""
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(engine))
+
+    async def stop(self, engine: AsyncEngine) -> None:
+        """Stop the timer without interrupting a write, then flush the rest."""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._wakeup = None
+        await self.flush(engine)
+        if self._buffer:
+            logger.error("Dropping %d learning events that could not be written at shutdown", len(self._buffer))
+            metrics.inc("learning_events_dropped_total", len(self._buffer), reason="shutdown")
+            self._buffer.clear()
+
+    async def _run(self, engine: AsyncEngine) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self._stopping:
+                await self.flush(engine)
+
+
+event_writer = EventWriter()
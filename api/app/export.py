@@ -0,0 +1,175 @@
+"""
+Static export of published lesson content.
+
+Lesson reads are identical for every caller, so they can be served without
+Python at all. This command renders every published lesson, its compiled
+sections, the guest lesson list, the module packs and the content manifest
+into immutable, content-hashed JSON files with precompressed .gz (and .br when
+the optional `brotli` package is installed) variants. It also writes a routing
+map (routes.json) and an nginx map include that point API paths at the files.
+
+Usage:
+    python -m app.export ./static-export [--clean]
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict
+
+from sqlmodel import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import get_compiled_lesson, get_content_version, guest_lesson_list
+from app.deps import engine
+from app.models import Lesson
+from app.packs import PackInfo, build_manifest, build_pack_body
+from app.response_cache import api_json
+from app.schemas import CompiledLessonResponse, LessonDetail, LessonList
+
+try:
+    import brotli
+except ImportError:  # Optional: only .gz variants are written without it
+    brotli = None
+
+HASH_LENGTH = 16
+
+
+class StaticExporter:
+    """Writes content-hashed files and records the API route each one serves."""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.routes: Dict[str, str] = {}
+        self.guest_routes: Dict[str, str] = {}
+        self.files_written = 0
+
+    def write(self, route: str, name: str, body: bytes, guest_only: bool = False) -> str:
+        """Write body as <name>.<hash>.json plus compressed variants; returns its URL path."""
+        digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+        relative = f"{name}.{digest}.json"
+        path = os.path.join(self.output_dir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Content-hashed names are immutable, so existing files are left alone
+        if not os.path.exists(path):
+            with open(path, "wb") as out:
+                out.write(body)
+            with open(path + ".gz", "wb") as out:
+                out.write(gzip.compress(body, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(path + ".br", "wb") as out:
+                    out.write(brotli.compress(body, quality=11))
+            self.files_written += 1
+
+        url_path = "/" + relative
+        (self.guest_routes if guest_only else self.routes)[route] = url_path
+        return url_path
+
+    def write_routing(self, version: str) -> None:
+        """Write routes.json and an nginx map include for the exported files."""
+        routing = {
+            "version": version,
+            "routes": dict(sorted(self.routes.items())),
+            # Only valid for requests without an Authorization header
+            "guest_routes": dict(sorted(self.guest_routes.items())),
+        }
+        with open(os.path.join(self.output_dir, "routes.json"), "w") as out:
+            json.dump(routing, out, indent=2)
+
+        lines = [
+            f"# Generated by `python -m app.export` for content version {version}",
+            "# Include in the http {} block, then in the API location:",
+            "#   set $lesson_static $lesson_static_public;",
+            '#   if ($lesson_static = "") { set $lesson_static $lesson_static_guest; }',
+            '#   if ($lesson_static != "") { rewrite ^ /_static$lesson_static last; }',
+            "# and serve /_static/ as an internal alias of the export directory",
+            "# with gzip_static (and brotli_static) enabled.",
+            "map $request_uri $lesson_static_public {",
+            '    default "";',
+        ]
+        lines += [f'    "{route}" "{path}";' for route, path in sorted(self.routes.items())]
+        lines += ["}", "", 'map "$request_uri:$http_authorization" $lesson_static_guest {', '    default "";']
+        lines += [f'    "{route}:" "{path}";' for route, path in sorted(self.guest_routes.items())]
+        lines += ["}", ""]
+        with open(os.path.join(self.output_dir, "nginx-routes.conf"), "w") as out:
+            out.write("\n".join(lines))
+
+
+async def export_content(output_dir: str) -> dict:
+    """Export all published content to output_dir. Returns a short summary."""
+    exporter = StaticExporter(output_dir)
+
+    async with AsyncSession(engine) as session:
+        version = await get_content_version(session)
+        result = await session.execute(
+            select(Lesson).where(Lesson.is_published == True).order_by(Lesson.order)
+        )
+        lessons = result.scalars().all()
+
+        for lesson in lessons:
+            detail = LessonDetail.model_validate(lesson).model_dump(mode="json")
+            exporter.write(f"/api/lessons/{lesson.id}", f"lessons/{lesson.id}", api_json(detail))
+
+            compiled = CompiledLessonResponse.model_validate(
+                await get_compiled_lesson(session, lesson)
+            ).model_dump(mode="json")
+            exporter.write(
+                f"/api/lessons/{lesson.id}/compiled", f"compiled/{lesson.id}", api_json(compiled)
+            )
+
+        guest_list = [LessonList(**item).model_dump(mode="json") for item in guest_lesson_list(lessons)]
+        exporter.write("/api/lessons", "lessons/index", api_json(guest_list), guest_only=True)
+
+        packs = {}
+        for module_number in sorted({lesson.module_number for lesson in lessons}):
+            module_lessons = [lesson for lesson in lessons if lesson.module_number == module_number]
+            body = build_pack_body(module_number, version, module_lessons)
+            url_path = exporter.write(
+                f"/api/modules/{module_number}/pack", f"modules/{module_number}", body
+            )
+            packs[module_number] = PackInfo(
+                module_number=module_number,
+                path=os.path.join(output_dir, url_path.lstrip("/")),
+                sha256=hashlib.sha256(body).hexdigest(),
+                size=len(body),
+                compressed_size=len(gzip.compress(body, compresslevel=9, mtime=0)),
+            )
+
+        manifest = build_manifest(version, lessons, packs)
+        exporter.write("/api/content/manifest", "manifest", api_json(manifest))
+
+    exporter.write_routing(version)
+    return {
+        "version": version,
+        "lessons": len(lessons),
+        "modules": len(packs),
+        "files_written": exporter.files_written,
+        "brotli": brotli is not None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export published lesson content as static files.")
+    parser.add_argument("output_dir", help="Directory to write the export into")
+    parser.add_argument("--clean", action="store_true", help="Remove the directory before exporting")
+    args = parser.parse_args()
+
+    if args.clean and os.path.isdir(args.output_dir):
+        shutil.rmtree(args.output_dir)
+
+    summary = asyncio.run(export_content(args.output_dir))
+    print(
+        f"Exported {summary['lessons']} lessons and {summary['modules']} module packs "
+        f"(content version {summary['version']}, {summary['files_written']} new files) "
+        f"to {args.output_dir}"
+    )
+    if not summary["brotli"]:
+        print("brotli is not installed; only .gz variants were written")
+
+
+if __name__ == "__main__":
+    main()
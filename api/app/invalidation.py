@@ -0,0 +1,202 @@
+"""
+Cross-worker cache invalidation.
+
+Each worker process keeps its own in-memory state (the lesson search index,
+the guest lesson list, the content version), so a write handled by one worker
+must reach the others. Writers stage a message such as "lesson:12" in the
+same transaction as the write:
+
+- PostgreSQL: `pg_notify('cache_invalidate', '<kind>:<id>')`, delivered on
+  commit to every worker's dedicated asyncpg LISTEN connection.
+- Other databases (SQLite): a row in `cacheinvalidation`, which every worker
+  polls by id every CACHE_INVALIDATION_POLL_SECONDS.
+
+Messages are applied by the handlers subscribed for their kind. When a
+listener reconnects it may have missed messages, so everything is reset
+("*"). Handlers must be idempotent: the writing worker receives its own
+messages too.
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.metrics import metrics
+from app.models import CacheInvalidation
+
+logger = logging.getLogger(__name__)
+
+CACHE_INVALIDATION = os.getenv("CACHE_INVALIDATION", "on")  # on or off (single process)
+CHANNEL = "cache_invalidate"
+POLL_SECONDS = float(os.getenv("CACHE_INVALIDATION_POLL_SECONDS", "0.5"))
+# Polled rows are kept this long, then pruned
+RETENTION = timedelta(hours=1)
+# A silent LISTEN connection is pinged this often to detect a dead socket
+LISTENER_PING_SECONDS = 30.0
+RECONNECT_DELAY_SECONDS = 1.0
+
+Handler = Callable[[str], Awaitable[None]]
+
+
+async def publish_invalidation(session: AsyncSession, kind: str, key) -> None:
+    """Stage an invalidation message; it is delivered when the session commits."""
+    message = f"{kind}:{key}"
+    if session.bind.dialect.name == "postgresql":
+        await session.execute(text("SELECT pg_notify(:channel, :message)"), {"channel": CHANNEL, "message": message})
+    else:
+        await session.execute(insert(CacheInvalidation).values(key=message, created_at=datetime.utcnow()))
+    metrics.inc("cache_invalidations_published_total", kind=kind)
+
+
+class InvalidationBus:
+    """Routes invalidation messages to the handlers subscribed for their kind."""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+
+    def subscribe(self, kind: str, handler: Handler) -> None:
+        """Call handler(key) for "<kind>:<key>" messages; kind "*" means reset everything."""
+        self._handlers[kind].append(handler)
+
+    async def dispatch(self, message: str) -> None:
+        kind, _, key = message.partition(":")
+        for handler in self._handlers.get(kind, []):
+            try:
+                await handler(key)
+            except Exception:
+                logger.warning("Cache invalidation handler failed for %s", message, exc_info=True)
+        metrics.inc("cache_invalidations_received_total", kind=kind)
+
+    async def listen(self, engine: AsyncEngine) -> None:
+        """Receive messages for the lifetime of the process."""
+        if engine.dialect.name == "postgresql":
+            await self._listen_postgres(engine)
+        else:
+            await self._poll(engine)
+
+    async def _listen_postgres(self, engine: AsyncEngine) -> None:
+        import asyncpg
+
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        connected_before = False
+        while True:
+            try:
+                conn = await asyncpg.connect(dsn)
+            except (OSError, asyncpg.PostgresError):
+                logger.warning("Cache invalidation listener could not connect", exc_info=True)
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+                continue
+
+            queue: asyncio.Queue = asyncio.Queue()
+            try:
+                await conn.add_listener(CHANNEL, lambda _conn, _pid, _channel, payload: queue.put_nowait(payload))
+                conn.add_termination_listener(lambda _conn: queue.put_nowait(None))
+                if connected_before:
+                    # Messages sent while disconnected are lost
+                    await self.dispatch("*")
+                connected_before = True
+                while True:
+                    try:
+                        message = await asyncio.wait_for(queue.get(), LISTENER_PING_SECONDS)
+                    except asyncio.TimeoutError:
+                        await conn.execute("SELECT 1")
+                        continue
+                    if message is None:
+                        break
+                    await self.dispatch(message)
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                logger.warning("Cache invalidation listener disconnected", exc_info=True)
+            finally:
+                if not conn.is_closed():
+                    conn.terminate()
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    async def _poll(self, engine: AsyncEngine, interval: float = POLL_SECONDS) -> None:
+        last_id = None
+        last_pruned = datetime.utcnow()
+        while True:
+            try:
+                async with engine.connect() as conn:
+                    if last_id is None:
+                        # Start from the newest message; startup state is already fresh
+                        result = await conn.execute(select(CacheInvalidation.id).order_by(CacheInvalidation.id.desc()).limit(1))
+                        last_id = result.scalar() or 0
+                    result = await conn.execute(
+                        select(CacheInvalidation.id, CacheInvalidation.key)
+                        .where(CacheInvalidation.id > last_id)
+                        .order_by(CacheInvalidation.id)
+                        .limit(1000)
+                    )
+                    rows = result.all()
+                for row in rows:
+                    await self.dispatch(row.key)
+                    last_id = row.id
+                if datetime.utcnow() - last_pruned > RETENTION:
+                    last_pruned = datetime.utcnow()
+                    async with engine.begin() as conn:
+                        await conn.execute(delete(CacheInvalidation).where(CacheInvalidation.created_at < last_pruned - RETENTION))
+            except Exception:
+                logger.warning("Cache invalidation poll failed", exc_info=True)
+            await asyncio.sleep(interval)
+
+
+invalidation_bus = InvalidationBus()
+
+
+async def _refresh_lesson(key: str) -> None:
+    """
+    Re-index one lesson (or drop it if deleted) and rebuild the guest list.
+    The key may carry the content version the write produced ("12@<version>").
+    """
+    # Import here to avoid circular imports
+    from app.content_version import content_version
+    from app.crud import get_lesson
+    from app.deps import engine
+    from app.response_cache import guest_lessons_cache
+    from app.search import search_index
+
+    lesson_key, _, version = key.partition("@")
+    # Recorded first, so a version check meanwhile does not rebuild everything
+    content_version.set(version or None)
+    lesson_id = int(lesson_key)
+    async with AsyncSession(engine) as session:
+        lesson = await get_lesson(session, lesson_id)
+    if lesson is None:
+        search_index.remove(lesson_id)
+    else:
+        search_index.add(lesson)
+    guest_lessons_cache.clear()
+
+
+async def _content_changed(key: str) -> None:
+    """Lessons were written outside the API: re-read the content version now."""
+    from app.content_version import content_version
+    from app.deps import engine
+
+    content_version.expire()
+    async with AsyncSession(engine) as session:
+        await content_version.current(session)
+
+
+async def _reset_all(key: str) -> None:
+    """Rebuild every per-worker cache after missed messages."""
+    from app.content_version import content_version
+    from app.crud import get_lessons
+    from app.deps import engine
+    from app.response_cache import guest_lessons_cache
+    from app.search import search_index
+
+    async with AsyncSession(engine) as session:
+        search_index.build(await get_lessons(session, limit=None))
+    guest_lessons_cache.clear()
+    content_version.reset()
+
+
+invalidation_bus.subscribe("lesson", _refresh_lesson)
+invalidation_bus.subscribe("content", _content_changed)
+invalidation_bus.subscribe("*", _reset_all)
@@ -0,0 +1,154 @@
+"""
+Live admin dashboard counters.
+
+Write paths call announce_counters() before committing, e.g. a registration
+announces total_users=+1 and active_users=+1. Once the transaction commits,
+the deltas reach every subscribed dashboard stream without any query:
+
+- With CACHE_INVALIDATION on, as a "counters:<name>=<delta>,..." message on
+  the invalidation bus, so streams on every worker see writes from all of
+  them (the writing worker receives its own message too).
+- Otherwise (one process), straight from the session's after_commit event.
+
+Each subscription merges deltas into a small dict until its stream sends
+them, so a slow client costs a few integers rather than a growing queue. When
+the bus may have missed messages, subscribers are told to resync (reload the
+snapshot).
+"""
+import asyncio
+from typing import Dict, Set
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.invalidation import CACHE_INVALIDATION, invalidation_bus, publish_invalidation
+from app.metrics import metrics
+
+# Field names match AdminDashboardStats, so clients add deltas to the snapshot
+COUNTERS = ("total_users", "active_users", "total_lessons", "total_completions")
+HEARTBEAT_SECONDS = 15.0
+
+
+class CounterSubscription:
+    """Deltas waiting to be sent to one stream."""
+
+    def __init__(self, hub: "LiveCounters"):
+        self._hub = hub
+        self._pending: Dict[str, int] = {}
+        self._resync = False
+        self._ready = asyncio.Event()
+
+    def add(self, deltas: Dict[str, int]) -> None:
+        for name, delta in deltas.items():
+            self._pending[name] = self._pending.get(name, 0) + delta
+        self._ready.set()
+
+    def resync(self) -> None:
+        self._pending.clear()
+        self._resync = True
+        self._ready.set()
+
+    async def next(self, timeout: float = HEARTBEAT_SECONDS) -> Dict:
+        """
+        Wait for changes: {"deltas": {...}} or {"resync": True}.
+        Returns an empty dict after timeout seconds without any.
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self._ready.clear()
+        if self._resync:
+            self._resync = False
+            return {"resync": True}
+        deltas = {name: delta for name, delta in self._pending.items() if delta}
+        self._pending.clear()
+        return {"deltas": deltas} if deltas else {}
+
+    def close(self) -> None:
+        self._hub._subscribers.discard(self)
+
+
+class LiveCounters:
+    """In-process pub/sub of dashboard counter deltas."""
+
+    def __init__(self):
+        self._subscribers: Set[CounterSubscription] = set()
+
+    def subscribe(self) -> CounterSubscription:
+        """Start receiving deltas (call from the event loop that will read them)."""
+        subscription = CounterSubscription(self)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def publish(self, deltas: Dict[str, int]) -> None:
+        for subscription in list(self._subscribers):
+            subscription.add(deltas)
+        metrics.inc("live_counter_publishes_total")
+
+    def resync(self) -> None:
+        for subscription in list(self._subscribers):
+            subscription.resync()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+
+live_counters = LiveCounters()
+metrics.register_gauge("live_counter_subscribers", lambda: len(live_counters))
+
+
+def encode_deltas(deltas: Dict[str, int]) -> str:
+    return ",".join(f"{name}={delta}" for name, delta in deltas.items())
+
+
+def decode_deltas(key: str) -> Dict[str, int]:
+    deltas = {}
+    for item in key.split(","):
+        name, _, delta = item.partition("=")
+        if name in COUNTERS:
+            deltas[name] = int(delta)
+    return deltas
+
+
+def _publish_committed(sync_session) -> None:
+    pending = sync_session.info.get("counter_deltas", [])
+    for deltas in pending:
+        live_counters.publish(deltas)
+    pending.clear()
+
+
+def _discard_pending(sync_session, previous_transaction) -> None:
+    sync_session.info.get("counter_deltas", []).clear()
+
+
+async def announce_counters(session: AsyncSession, **deltas: int) -> None:
+    """
+    Stage counter changes made by the session's current transaction (call after
+    its writes); subscribers see them when it commits.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    if CACHE_INVALIDATION != "off":
+        await publish_invalidation(session, "counters", encode_deltas(deltas))
+        return
+
+    pending = session.info.get("counter_deltas")
+    if pending is None:
+        pending = session.info["counter_deltas"] = []
+        event.listen(session.sync_session, "after_commit", _publish_committed)
+        event.listen(session.sync_session, "after_soft_rollback", _discard_pending)
+    pending.append(deltas)
+
+
+async def _publish_counters(key: str) -> None:
+    live_counters.publish(decode_deltas(key))
+
+
+async def _resync_counters(key: str) -> None:
+    live_counters.resync()
+
+
+invalidation_bus.subscribe("counters", _publish_counters)
+invalidation_bus.subscribe("*", _resync_counters)
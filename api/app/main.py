@@ -1,23 +1,54 @@
 """
 Main FastAPI application for Resilient Mastery platform.
 """
+import asyncio
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import os
 
-from app.deps import create_db_and_tables
-from app.routers import lessons, auth, admin
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import get_lessons
+from app.content_version import content_version
+from app.deps import engine, wait_for_rehashes
+from app.events import event_writer
+from app.invalidation import CACHE_INVALIDATION, invalidation_bus
+from app.migrations import ensure_schema
+from app.metrics import metrics
+from app.partitions import partition_maintenance
+from app.routers import lessons, auth, admin, content, events
+from app.search import search_index
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
-    # Startup
-    await create_db_and_tables()
+    # Startup: one revision check, or a migration under a cross-worker lock
+    await ensure_schema(engine)
+    async with AsyncSession(engine) as session:
+        search_index.build(await get_lessons(session, limit=None))
+    # Create upcoming lessoncompletion partitions (no-op unless partitioned)
+    partition_task = None
+    if engine.dialect.name == "postgresql":
+        partition_task = asyncio.create_task(partition_maintenance(engine))
+    # Apply cache invalidations published by other workers
+    # and notice lesson writes made outside the API
+    background_tasks = []
+    if CACHE_INVALIDATION != "off":
+        background_tasks.append(asyncio.create_task(invalidation_bus.listen(engine)))
+        background_tasks.append(asyncio.create_task(content_version.watch(engine)))
+    # Batched learning event writes
+    event_writer.start(engine)
     yield
     # Shutdown
-    pass
+    if partition_task:
+        partition_task.cancel()
+    for task in background_tasks:
+        task.cancel()
+    await event_writer.stop(engine)
+    await wait_for_rehashes()
 
 
 # Create FastAPI instance
@@ -58,6 +89,8 @@ app.add_middleware(
 app.include_router(lessons.router, prefix="/api")
 app.include_router(auth.router, prefix="/api")
 app.include_router(admin.router, prefix="/api")
+app.include_router(content.router, prefix="/api")
+app.include_router(events.router, prefix="/api")
 
 
 @app.get("/")
@@ -75,4 +108,10 @@ async def health_check():
 @app.get("/api/health")
 async def api_health_check():
     """API Health check endpoint."""
-    return {"status": "healthy", "api": "operational"} 
\ No newline at end of file
+    return {"status": "healthy", "api": "operational"} 
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Process metrics in the Prometheus text format."""
+    return metrics.render()
@@ -0,0 +1,76 @@
+"""
+Process-local metrics registry.
+
+Counters and gauges are kept in memory and exposed in the Prometheus text
+format at /metrics. Gauges can also be registered as callbacks so values such
+as cache sizes are read at scrape time instead of being pushed on every change.
+"""
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in key)
+    return "{" + pairs + "}"
+
+
+class Metrics:
+    """Thread-safe counters and gauges."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._gauges: Dict[str, Dict[LabelKey, float]] = defaultdict(dict)
+        self._callbacks: Dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, amount: float = 1.0, **labels) -> None:
+        """Increment a counter."""
+        with self._lock:
+            self._counters[name][_label_key(labels)] += amount
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """Set a gauge."""
+        with self._lock:
+            self._gauges[name][_label_key(labels)] = value
+
+    def register_gauge(self, name: str, callback: Callable[[], float]) -> None:
+        """Register a gauge whose value is computed at read time."""
+        self._callbacks[name] = callback
+
+    def get(self, name: str, **labels) -> float:
+        """Current value of a counter or gauge (0 if never recorded)."""
+        key = _label_key(labels)
+        if name in self._callbacks and not labels:
+            return float(self._callbacks[name]())
+        with self._lock:
+            if name in self._gauges and key in self._gauges[name]:
+                return self._gauges[name][key]
+            return self._counters.get(name, {}).get(key, 0.0)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = {name: dict(values) for name, values in self._counters.items()}
+            gauges = {name: dict(values) for name, values in self._gauges.items()}
+        for name, values in sorted(counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(f"{name}{_format_labels(key)} {value:g}" for key, value in sorted(values.items()))
+        for name, callback in sorted(self._callbacks.items()):
+            gauges.setdefault(name, {})[()] = float(callback())
+        for name, values in sorted(gauges.items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{_format_labels(key)} {value:g}" for key, value in sorted(values.items()))
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,218 @@
+"""
+Migration-gated startup.
+
+Instead of running `SQLModel.metadata.create_all` (a reflection round trip per
+table) on every worker boot, startup reads the Alembic revision stamped in the
+database and compares it with the head of alembic/versions. When they match,
+which is every boot after a deploy, that single query is the whole cost.
+
+When they differ, one process takes a lock (a PostgreSQL advisory lock, or a
+file lock next to a SQLite database), re-checks, and either migrates or fails
+fast, depending on SCHEMA_STARTUP:
+- upgrade (default): run `alembic upgrade head` once; other workers wait on the
+  lock and then find the schema current
+- check: refuse to start until the schema has been migrated
+- off: skip the check entirely
+
+Several migrations use PostgreSQL-only SQL, so an unversioned SQLite database
+is brought to head without them and then stamped: an empty one is bootstrapped
+with create_all; one created by the old create_all startup also gets the
+indexes that later migrations added to its existing tables, which create_all
+skips along with the tables.
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+import zlib
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import SQLModel
+
+try:
+    import fcntl
+except ImportError:  # Windows: development only, single process
+    fcntl = None
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_STARTUP = os.getenv("SCHEMA_STARTUP", "upgrade")  # upgrade, check or off
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic")
+VERSIONS_DIR = os.path.join(ALEMBIC_DIR, "versions")
+# Shared by every worker and host migrating the same database
+ADVISORY_LOCK_KEY = zlib.crc32(b"resilient_mastery:migrations")
+
+_head_revision: Optional[str] = None
+
+
+class SchemaOutOfDateError(RuntimeError):
+    """The database is not at the Alembic head and startup may not migrate it."""
+
+
+def alembic_config(database_url: str):
+    """Alembic config without alembic.ini, so its logging setup is not applied."""
+    from alembic.config import Config
+    config = Config()
+    config.set_main_option("script_location", ALEMBIC_DIR)
+    config.attributes["database_url"] = database_url
+    return config
+
+
+_REVISION_RE = re.compile(r"^revision\s*=\s*['\"](\w+)['\"]", re.MULTILINE)
+_DOWN_REVISION_RE = re.compile(r"^down_revision\s*=\s*['\"](\w+)['\"]", re.MULTILINE)
+
+
+def _scan_head() -> Optional[str]:
+    """
+    Find the head by reading the revision headers of the version files.
+    Importing alembic and every migration module costs more than the check
+    itself, so a linear history is resolved from the files' text.
+    """
+    revisions, parents = set(), set()
+    for name in os.listdir(VERSIONS_DIR):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(VERSIONS_DIR, name), encoding="utf-8") as version_file:
+            source = version_file.read()
+        revision = _REVISION_RE.search(source)
+        if revision:
+            revisions.add(revision.group(1))
+        down_revision = _DOWN_REVISION_RE.search(source)
+        if down_revision:
+            parents.add(down_revision.group(1))
+    heads = revisions - parents
+    return heads.pop() if len(heads) == 1 else None
+
+
+def head_revision() -> str:
+    """Head revision of alembic/versions (resolved once per process)."""
+    global _head_revision
+    if _head_revision is None:
+        _head_revision = _scan_head()
+    if _head_revision is None:
+        # Branches or merges: let alembic resolve the history
+        from alembic.script import ScriptDirectory
+        _head_revision = ScriptDirectory.from_config(alembic_config("")).get_current_head()
+    return _head_revision
+
+
+async def current_revision(conn) -> Optional[str]:
+    """Revision stamped in the database, or None when it is unversioned."""
+    try:
+        result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+    except DBAPIError:
+        await conn.rollback()
+        return None
+    return result.scalar()
+
+
+def _lock_path(engine: AsyncEngine) -> Optional[str]:
+    database = engine.url.database
+    if not database or database == ":memory:" or database.startswith("file:"):
+        return None
+    return os.path.abspath(database) + ".migrate.lock"
+
+
+@asynccontextmanager
+async def migration_lock(engine: AsyncEngine):
+    """Hold the cross-process migration lock for the engine's database."""
+    if engine.dialect.name == "postgresql":
+        # Autocommit, so the idle lock holder never blocks CREATE INDEX CONCURRENTLY
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            try:
+                yield
+            finally:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        return
+
+    path = _lock_path(engine)
+    if path is None or fcntl is None:
+        yield
+        return
+    lock_file = open(path, "a")
+    try:
+        await asyncio.to_thread(fcntl.flock, lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+    finally:
+        lock_file.close()
+
+
+def _has_tables(sync_conn) -> bool:
+    return any(name != "alembic_version" for name in inspect(sync_conn).get_table_names())
+
+
+def _create_missing_indexes(sync_conn) -> None:
+    # IF NOT EXISTS rather than checkfirst: SQLite does not reflect expression indexes
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            sync_conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+async def _bootstrap_sqlite(engine: AsyncEngine, config) -> str:
+    """
+    Build an unversioned SQLite database up to head and stamp it.
+    Returns bootstrapped for an empty database, upgraded for a legacy one.
+    """
+    from alembic import command
+    async with engine.begin() as conn:
+        legacy = await conn.run_sync(_has_tables)
+        await conn.run_sync(SQLModel.metadata.create_all)
+        if legacy:
+            # Fails (and startup with it) if existing rows break a new unique index
+            await conn.run_sync(_create_missing_indexes)
+    await asyncio.to_thread(command.stamp, config, "head")
+    return "upgraded" if legacy else "bootstrapped"
+
+
+async def ensure_schema(engine: AsyncEngine, mode: str = SCHEMA_STARTUP) -> str:
+    """
+    Make sure the database is at the Alembic head before serving.
+    Returns what happened: current, upgraded, bootstrapped or skipped.
+    """
+    if mode == "off":
+        return "skipped"
+
+    started = time.perf_counter()
+    head = head_revision()
+    async with engine.connect() as conn:
+        current = await current_revision(conn)
+    if current == head:
+        metrics.set("schema_check_seconds", time.perf_counter() - started)
+        return "current"
+    if mode == "check":
+        raise SchemaOutOfDateError(
+            f"Database is at revision {current or 'none'}, expected {head}; run `alembic upgrade head`"
+        )
+
+    async with migration_lock(engine):
+        # Another worker may have migrated while this one waited
+        async with engine.connect() as conn:
+            current = await current_revision(conn)
+        if current == head:
+            outcome = "current"
+        else:
+            from alembic import command
+            config = alembic_config(engine.url.render_as_string(hide_password=False))
+            if engine.dialect.name == "sqlite" and current is None:
+                logger.info("Bringing unversioned SQLite schema to %s", head)
+                outcome = await _bootstrap_sqlite(engine, config)
+            else:
+                logger.info("Upgrading database schema from %s to %s", current or "empty", head)
+                await asyncio.to_thread(command.upgrade, config, "head")
+                outcome = "upgraded"
+
+    metrics.set("schema_check_seconds", time.perf_counter() - started)
+    return outcome
@@ -4,8 +4,11 @@ Database models for Resilient Mastery platform.
 from datetime import datetime
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer, event, inspect, text
 from enum import Enum
 
+from app.content_version import install_content_version_triggers
+
 
 class UserRole(str, Enum):
     """User role enumeration."""
@@ -15,6 +18,12 @@ class UserRole(str, Enum):
 
 class User(SQLModel, table=True):
     """User model for authentication and progress tracking."""
+    __table_args__ = (
+        # Case-insensitive uniqueness; lookups compare lower(column) to hit these
+        Index("ix_user_email_lower", text("lower(email)"), unique=True),
+        Index("ix_user_username_lower", text("lower(username)"), unique=True),
+    )
+    
     id: Optional[int] = Field(default=None, primary_key=True)
     email: str = Field(unique=True, index=True)
     username: str = Field(unique=True, index=True)
@@ -29,6 +38,13 @@ class User(SQLModel, table=True):
 
 class Lesson(SQLModel, table=True):
     """Lesson model containing emotional intelligence content."""
+    __table_args__ = (
+        # Published lessons in display order, and per-module lookups
+        Index("ix_lesson_is_published_order", "is_published", "order"),
+        Index("ix_lesson_module_number_order", "module_number", "order"),
+        Index("ix_lesson_order", "order"),
+    )
+    
     id: Optional[int] = Field(default=None, primary_key=True)
     slug: str = Field(unique=True, index=True)
     title: str
@@ -48,6 +64,13 @@ class Lesson(SQLModel, table=True):
 
 class LessonCompletion(SQLModel, table=True):
     """Track user progress through lessons."""
+    __table_args__ = (
+        # Per-user progress (also serves user_id alone), per-lesson joins, recent activity
+        Index("ix_lessoncompletion_user_id_lesson_id", "user_id", "lesson_id"),
+        Index("ix_lessoncompletion_lesson_id", "lesson_id"),
+        Index("ix_lessoncompletion_completed_at", "completed_at"),
+    )
+    
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     lesson_id: int = Field(foreign_key="lesson.id")
@@ -58,6 +81,129 @@ class LessonCompletion(SQLModel, table=True):
     lesson: Lesson = Relationship(back_populates="completions")
 
 
+class ArchivedProgress(SQLModel, table=True):
+    """
+    First completion of a lesson by a user whose completion rows were archived.
+    Progress queries union this with lessoncompletion so archiving never loses progress.
+    """
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    lesson_id: int = Field(foreign_key="lesson.id", primary_key=True)
+    completion_id: int  # id of the archived lessoncompletion row
+    completed_at: datetime
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class RefreshToken(SQLModel, table=True):
+    """Rotating refresh token, stored as a SHA-256 digest of the raw token."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Deleting a user deletes their tokens
+    user_id: int = Field(
+        sa_column=Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
+    )
+    token_hash: str = Field(unique=True, index=True, max_length=64)
+    family_id: str = Field(index=True, max_length=32)  # Shared by every rotation of one login
+    expires_at: datetime
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    used_at: Optional[datetime] = None  # Set when rotated; presenting it again is reuse
+    revoked_at: Optional[datetime] = None
+
+
+class StreamTicket(SQLModel, table=True):
+    """Single-use, short-lived ticket for opening an event stream, stored as a SHA-256 digest."""
+    token_hash: str = Field(primary_key=True, max_length=64)
+    user_id: int  # Not a foreign key: tickets live for seconds and must not block deleting a user
+    expires_at: datetime = Field(index=True)
+
+
+class LessonRevision(SQLModel, table=True):
+    """A recorded lesson write; the id doubles as the catalog version."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    lesson_id: int = Field(index=True)  # Not a foreign key: deletions are recorded too
+    operation: str  # "create", "update" or "delete"
+    changed_fields: str  # Comma-separated field names
+    delta: bytes  # zlib-compressed JSON delta, see app/revisions.py
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class CompiledSection(SQLModel, table=True):
+    """Compiled lesson markdown, addressed by the hash of its source text."""
+    content_hash: str = Field(primary_key=True, max_length=64)
+    html: str
+    blocks: str  # Block AST as JSON
+    compiled_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class CacheInvalidation(SQLModel, table=True):
+    """
+    Cache invalidation message, e.g. "lesson:12".
+    Polled by workers on databases without LISTEN/NOTIFY (SQLite).
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    key: str = Field(max_length=128)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class LearningEvent(SQLModel, table=True):
+    """Client-reported learning activity (views, section switches, quiz attempts). Append-only."""
+    __tablename__ = "learning_event"
+    __table_args__ = (
+        # Per-user timelines; kept to one index so batched inserts stay cheap
+        Index("ix_learning_event_user_id_occurred_at", "user_id", "occurred_at"),
+    )
+    
+    id: Optional[int] = Field(
+        default=None,
+        sa_column=Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+    )
+    # Not foreign keys: the log outlives deleted users and lessons
+    user_id: int
+    event_type: str = Field(max_length=32)  # See schemas.LearningEventType
+    lesson_id: Optional[int] = None
+    data: str = Field(default="{}")  # JSON object with event-specific details
+    occurred_at: datetime  # Client clock
+    received_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class LessonFunnelRollup(SQLModel, table=True):
+    """Per-lesson completion totals, folded in incrementally by app/analytics.py."""
+    lesson_id: int = Field(primary_key=True)  # Not a foreign key: history outlives lessons
+    completions: int = Field(default=0)  # Users who completed the lesson (first completion only)
+    gap_count: int = Field(default=0)  # Completions that followed an earlier one by the same user
+    gap_histogram: str = Field(default="[]")  # JSON counts per analytics.GAP_BUCKETS bucket
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ModuleCompletion(SQLModel, table=True):
+    """When a user first had every published lesson of a module completed."""
+    user_id: int = Field(primary_key=True)  # Not a foreign key, like the other rollups
+    module_number: int = Field(primary_key=True)
+    completed_at: datetime
+
+
+class RollupCursor(SQLModel, table=True):
+    """Highest source row id already folded into a rollup."""
+    name: str = Field(primary_key=True, max_length=64)
+    last_id: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ContentVersion(SQLModel, table=True):
+    """
+    Single row (id 1) bumped by a database trigger on every lesson write,
+    including writes made outside the API. See app/content_version.py.
+    """
+    id: int = Field(default=1, primary_key=True)
+    epoch: str = Field(max_length=16)  # Random per database, so versions never repeat
+    version: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def _install_content_version_triggers(target, connection, **kw):
+    if {"contentversion", "lesson"} <= set(inspect(connection).get_table_names()):
+        install_content_version_triggers(connection)
+
+
 # Reflection model temporarily disabled for login fix
 # class Reflection(SQLModel, table=True):
 #     """Store user reflections for lessons."""
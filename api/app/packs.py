@@ -0,0 +1,208 @@
+"""
+Offline module packs and the content manifest.
+
+A module pack is a single gzip-compressed JSON document holding every
+published lesson of a module. Packs are built once per content version and
+cached on disk, so repeat downloads are a file send. The manifest lists each
+lesson's content hash and size plus each pack's hash, which lets a service
+worker prefetch packs and verify what it already holds.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlmodel import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import get_content_version
+from app.models import Lesson
+
+PACK_CACHE_DIR = os.getenv(
+    "PACK_CACHE_DIR", os.path.join(tempfile.gettempdir(), "resilient-mastery-packs")
+)
+PACK_FORMAT_VERSION = 1
+# Packs of other versions are kept this long after they were written, since
+# workers still on that version may be serving them
+PACK_PRUNE_GRACE_SECONDS = float(os.getenv("PACK_PRUNE_GRACE_SECONDS", "300"))
+
+
+def canonical_json(value) -> bytes:
+    """Stable JSON encoding used for hashing and pack contents."""
+    return json.dumps(
+        value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    ).encode("utf-8")
+
+
+def lesson_payload(lesson: Lesson) -> dict:
+    """Lesson fields shipped in packs (same shape as the lesson detail endpoint)."""
+    return {
+        "id": lesson.id,
+        "slug": lesson.slug,
+        "title": lesson.title,
+        "story": lesson.story,
+        "reflection": lesson.reflection,
+        "challenge": lesson.challenge,
+        "quiz": lesson.quiz,
+        "order": lesson.order,
+        "module_number": lesson.module_number,
+        "created_at": lesson.created_at.isoformat(),
+        "updated_at": lesson.updated_at.isoformat(),
+    }
+
+
+def lesson_content_entry(lesson: Lesson) -> dict:
+    """Manifest entry: SHA-256 and byte size of the lesson's canonical JSON."""
+    body = canonical_json(lesson_payload(lesson))
+    return {
+        "id": lesson.id,
+        "module_number": lesson.module_number,
+        "content_hash": hashlib.sha256(body).hexdigest(),
+        "size": len(body),
+    }
+
+
+def build_pack_body(module_number: int, version: str, lessons: List[Lesson]) -> bytes:
+    """Uncompressed JSON body of a module pack."""
+    return canonical_json({
+        "format": PACK_FORMAT_VERSION,
+        "module_number": module_number,
+        "version": version,
+        "lessons": [lesson_payload(lesson) for lesson in lessons],
+    })
+
+
+def build_manifest(version: str, lessons: List[Lesson], packs: Dict[int, "PackInfo"]) -> dict:
+    """Assemble the content manifest from lessons and their built packs."""
+    return {
+        "version": version,
+        "lessons": [lesson_content_entry(lesson) for lesson in lessons],
+        "modules": [
+            {
+                "module_number": module_number,
+                "url": f"/api/modules/{module_number}/pack",
+                "lesson_ids": [lesson.id for lesson in lessons if lesson.module_number == module_number],
+                "sha256": info.sha256,
+                "size": info.size,
+                "compressed_size": info.compressed_size,
+            }
+            for module_number, info in sorted(packs.items())
+        ],
+    }
+
+
+@dataclass
+class PackInfo:
+    """A built module pack on disk."""
+    module_number: int
+    path: str
+    sha256: str  # Hash of the uncompressed JSON
+    size: int  # Uncompressed size in bytes
+    compressed_size: int
+
+
+class PackStore:
+    """Builds module packs and the manifest, cached per content version."""
+
+    def __init__(self, directory: str = PACK_CACHE_DIR, prune_grace: float = PACK_PRUNE_GRACE_SECONDS):
+        self.directory = directory
+        self.prune_grace = prune_grace
+        self._packs: Dict[tuple, PackInfo] = {}
+        self._manifests: Dict[str, dict] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+
+    def _pack_path(self, module_number: int, version: str) -> str:
+        return os.path.join(
+            self.directory, f"module-{module_number}-v{PACK_FORMAT_VERSION}-{version}.json.gz"
+        )
+
+    async def _load_lessons(self, session: AsyncSession, module_number: Optional[int] = None) -> List[Lesson]:
+        statement = select(Lesson).where(Lesson.is_published == True).order_by(Lesson.order)
+        if module_number is not None:
+            statement = statement.where(Lesson.module_number == module_number)
+        result = await session.execute(statement)
+        return result.scalars().all()
+
+    def _write_pack(self, path: str, body: bytes) -> int:
+        """Atomically write a compressed pack and return its compressed size."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(gzip.compress(body, compresslevel=9, mtime=0))
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def _prune(self, module_number: int, keep: str) -> None:
+        """Remove a module's packs of other content versions written more than prune_grace seconds ago."""
+        prefix = f"module-{module_number}-"
+        keep_name = os.path.basename(keep)
+        cutoff = time.time() - self.prune_grace
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name != keep_name and name.endswith(".json.gz"):
+                path = os.path.join(self.directory, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    async def get_pack(self, session: AsyncSession, module_number: int, version: Optional[str] = None) -> Optional[PackInfo]:
+        """Get the pack for a module, building it if this version has none yet."""
+        version = version or await get_content_version(session)
+        key = (module_number, version)
+        if key in self._packs and os.path.exists(self._packs[key].path):
+            return self._packs[key]
+
+        lock = self._locks.setdefault(module_number, asyncio.Lock())
+        async with lock:
+            if key in self._packs and os.path.exists(self._packs[key].path):
+                return self._packs[key]
+
+            lessons = await self._load_lessons(session, module_number)
+            if not lessons:
+                return None
+
+            body = build_pack_body(module_number, version, lessons)
+            path = self._pack_path(module_number, version)
+            if os.path.exists(path):
+                # Another worker already built this version
+                compressed_size = os.path.getsize(path)
+            else:
+                compressed_size = await asyncio.to_thread(self._write_pack, path, body)
+                await asyncio.to_thread(self._prune, module_number, path)
+
+            # Drop in-memory entries for older versions of this module
+            for stale in [k for k in self._packs if k[0] == module_number]:
+                del self._packs[stale]
+            info = PackInfo(
+                module_number=module_number,
+                path=path,
+                sha256=hashlib.sha256(body).hexdigest(),
+                size=len(body),
+                compressed_size=compressed_size,
+            )
+            self._packs[key] = info
+            return info
+
+    async def get_manifest(self, session: AsyncSession) -> dict:
+        """Content manifest for the current version."""
+        version = await get_content_version(session)
+        if version in self._manifests:
+            return self._manifests[version]
+
+        lessons = await self._load_lessons(session)
+        packs = {}
+        for module_number in sorted({lesson.module_number for lesson in lessons}):
+            packs[module_number] = await self.get_pack(session, module_number, version)
+
+        manifest = build_manifest(version, lessons, packs)
+        self._manifests = {version: manifest}
+        return manifest
+
+
+pack_store = PackStore()
@@ -0,0 +1,117 @@
+"""
+Monthly range partitions for lesson completions (PostgreSQL only).
+
+When the `lessoncompletion` table has been converted to a partitioned table
+(see the add_archived_progress migration and COMPLETION_PARTITIONING), each
+calendar month of `completed_at` lives in its own partition, plus a DEFAULT
+partition so inserts never fail. Partitions for the coming months are created
+at startup and then daily, so the DEFAULT partition stays empty in practice.
+Cold months can then be archived by detaching and dropping a whole partition.
+"""
+import asyncio
+import logging
+import os
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+COMPLETION_TABLE = "lessoncompletion"
+PARTITION_MONTHS_AHEAD = int(os.getenv("COMPLETION_PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_CHECK_SECONDS = 24 * 60 * 60
+
+
+def month_start(value) -> date:
+    """First day of the month containing value."""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    """Shift a month start by count months."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the partition holding a month, e.g. lessoncompletion_p202610."""
+    return f"{COMPLETION_TABLE}_p{month.year}{month.month:02d}"
+
+
+def partition_bounds(month: date) -> Tuple[str, str]:
+    """Inclusive lower and exclusive upper bound of a month partition."""
+    return month.isoformat(), add_months(month, 1).isoformat()
+
+
+def create_partition_sql(month: date) -> str:
+    lower, upper = partition_bounds(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {COMPLETION_TABLE} "
+        f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    )
+
+
+async def is_partitioned(conn) -> bool:
+    """Whether lessoncompletion is a natively partitioned table."""
+    if conn.dialect.name != "postgresql":
+        return False
+    result = await conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :table"
+    ), {"table": COMPLETION_TABLE})
+    return result.first() is not None
+
+
+async def existing_partitions(conn) -> List[str]:
+    """Names of the current partitions of lessoncompletion."""
+    result = await conn.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table ORDER BY child.relname"
+    ), {"table": COMPLETION_TABLE})
+    return list(result.scalars().all())
+
+
+async def ensure_partitions(conn, now: Optional[datetime] = None, months_ahead: int = PARTITION_MONTHS_AHEAD) -> List[str]:
+    """
+    Create partitions for the current month and the next months_ahead months.
+    Returns the names of partitions that were missing. No-op when not partitioned.
+    """
+    if not await is_partitioned(conn):
+        return []
+
+    existing = set(await existing_partitions(conn))
+    first = month_start(now or datetime.utcnow())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(first, offset)
+        if partition_name(month) in existing:
+            continue
+        try:
+            # One savepoint per partition: on PostgreSQL a failed CREATE aborts the
+            # transaction, which would also undo the partitions created before it
+            async with conn.begin_nested():
+                await conn.execute(text(create_partition_sql(month)))
+        except DBAPIError:
+            # Another worker created it first, or the DEFAULT partition already
+            # holds rows for this month; either way inserts keep working
+            logger.warning("Could not create partition %s", partition_name(month), exc_info=True)
+            continue
+        created.append(partition_name(month))
+    return created
+
+
+async def partition_maintenance(engine, interval: float = PARTITION_CHECK_SECONDS) -> None:
+    """Keep future partitions in place for the lifetime of the process."""
+    while True:
+        try:
+            async with engine.begin() as conn:
+                created = await ensure_partitions(conn)
+            if created:
+                logger.info("Created completion partitions: %s", ", ".join(created))
+        except Exception:
+            logger.warning("Completion partition maintenance failed", exc_info=True)
+        await asyncio.sleep(interval)
@@ -0,0 +1,268 @@
+"""
+Token-bucket rate limiting for login attempts.
+
+Every login attempt costs a full bcrypt verify, so attempts are throttled per
+client IP and per username *before* any hashing happens. Buckets live in a
+pluggable backend: an in-memory backend with sharded locks (per process), or a
+Redis backend that shares buckets across workers and hosts. The Redis backend
+speaks RESP directly over asyncio streams, so no client library is required.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BACKEND = os.getenv("LOGIN_RATE_LIMIT_BACKEND", "memory")  # memory, redis or off
+RATE_LIMIT_REDIS_URL = os.getenv("LOGIN_RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+
+# Burst size and sustained rate (attempts per minute) for each scope
+USERNAME_BURST = int(os.getenv("LOGIN_RATE_LIMIT_USERNAME_BURST", "5"))
+USERNAME_PER_MINUTE = float(os.getenv("LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE", "5"))
+IP_BURST = int(os.getenv("LOGIN_RATE_LIMIT_IP_BURST", "20"))
+IP_PER_MINUTE = float(os.getenv("LOGIN_RATE_LIMIT_IP_PER_MINUTE", "30"))
+
+
+@dataclass
+class BucketPolicy:
+    """Bucket capacity and refill rate in tokens per second."""
+    capacity: float
+    refill_per_second: float
+
+
+class InMemoryBackend:
+    """
+    Token buckets held in process memory.
+    Keys are spread over independently locked shards so concurrent threads
+    rarely contend, and each shard is a bounded LRU so spraying random
+    usernames cannot grow memory without limit.
+    """
+
+    def __init__(self, shards: int = 32, max_keys_per_shard: int = 4096, clock=time.monotonic):
+        self._clock = clock
+        self._max_keys = max_keys_per_shard
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(shards)]
+
+    def _shard(self, key: str):
+        return self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+
+    async def consume(self, key: str, policy: BucketPolicy, cost: float = 1.0) -> Tuple[bool, float]:
+        """Take tokens from a bucket. Returns (allowed, retry_after_seconds)."""
+        lock, buckets = self._shard(key)
+        now = self._clock()
+        with lock:
+            tokens, updated = buckets.get(key, (policy.capacity, now))
+            tokens = min(policy.capacity, tokens + (now - updated) * policy.refill_per_second)
+            if tokens >= cost:
+                buckets[key] = (tokens - cost, now)
+                retry_after = 0.0
+                allowed = True
+            else:
+                buckets[key] = (tokens, now)
+                retry_after = (cost - tokens) / policy.refill_per_second
+                allowed = False
+            buckets.move_to_end(key)
+            while len(buckets) > self._max_keys:
+                buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def clear(self) -> None:
+        for lock, buckets in self._shards:
+            with lock:
+                buckets.clear()
+
+
+# Atomic token bucket: KEYS[1]; ARGV = capacity, refill/s, now, cost
+_TOKEN_BUCKET_LUA = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry)}
+"""
+
+
+class RespError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class RespConnection:
+    """Minimal RESP2 client: one connection, one command at a time."""
+
+    def __init__(self, url: str, timeout: float = 0.5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def encode(*args) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b"".join(parts)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RespError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RespError(f"Unexpected reply type {kind!r}")
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._send("AUTH", self.password)
+        if self.db:
+            await self._send("SELECT", self.db)
+
+    async def _send(self, *args):
+        self._writer.write(self.encode(*args))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def execute(self, *args):
+        """Send a command and return its reply, reconnecting once if needed."""
+        async with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._writer is None:
+                        await asyncio.wait_for(self._connect(), self.timeout)
+                    return await asyncio.wait_for(self._send(*args), self.timeout)
+                except (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    await self.close()
+                    if attempt:
+                        raise
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._reader = None
+
+
+class RedisBackend:
+    """Token buckets shared through a Redis-compatible server."""
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, prefix: str = "ratelimit:", clock=time.time):
+        self.connection = RespConnection(url)
+        self.prefix = prefix
+        self._clock = clock
+        self._script_sha: Optional[str] = None
+
+    async def consume(self, key: str, policy: BucketPolicy, cost: float = 1.0) -> Tuple[bool, float]:
+        args = [1, self.prefix + key, policy.capacity, policy.refill_per_second, self._clock(), cost]
+        if self._script_sha is None:
+            sha = await self.connection.execute("SCRIPT", "LOAD", _TOKEN_BUCKET_LUA)
+            self._script_sha = sha.decode() if isinstance(sha, bytes) else sha
+        try:
+            reply = await self.connection.execute("EVALSHA", self._script_sha, *args)
+        except RespError as exc:
+            if "NOSCRIPT" not in str(exc):
+                raise
+            reply = await self.connection.execute("EVAL", _TOKEN_BUCKET_LUA, *args)
+        allowed, retry_after = reply
+        return bool(int(allowed)), float(retry_after)
+
+    def clear(self) -> None:
+        """Buckets expire on their own in Redis."""
+
+
+class LoginRateLimiter:
+    """Per-IP and per-username throttling of login attempts."""
+
+    def __init__(self, backend, username_policy: BucketPolicy, ip_policy: BucketPolicy):
+        self.backend = backend
+        self.username_policy = username_policy
+        self.ip_policy = ip_policy
+
+    async def check(self, ip: Optional[str], username: str) -> Optional[float]:
+        """
+        Record a login attempt.
+        Returns None when allowed, or the seconds to wait when throttled.
+        """
+        if self.backend is None:
+            return None
+
+        checks: List[Tuple[str, str, BucketPolicy]] = []
+        if ip:
+            checks.append(("ip", f"login:ip:{ip}", self.ip_policy))
+        checks.append(("username", f"login:user:{username.strip().lower()}", self.username_policy))
+
+        for scope, key, policy in checks:
+            try:
+                allowed, retry_after = await self.backend.consume(key, policy)
+            except Exception:
+                # Fail open: a limiter outage must not lock every user out
+                logger.warning("Login rate limiter backend unavailable", exc_info=True)
+                metrics.inc("login_rate_limiter_errors_total")
+                return None
+            if not allowed:
+                metrics.inc("login_throttled_total", scope=scope)
+                return retry_after
+        return None
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+
+
+def _build_backend():
+    if RATE_LIMIT_BACKEND == "off":
+        return None
+    if RATE_LIMIT_BACKEND == "redis":
+        return RedisBackend(RATE_LIMIT_REDIS_URL)
+    return InMemoryBackend()
+
+
+login_rate_limiter = LoginRateLimiter(
+    _build_backend(),
+    username_policy=BucketPolicy(USERNAME_BURST, USERNAME_PER_MINUTE / 60),
+    ip_policy=BucketPolicy(IP_BURST, IP_PER_MINUTE / 60),
+)
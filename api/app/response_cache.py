@@ -0,0 +1,111 @@
+"""
+Cache of fully serialized API responses.
+
+Some responses are identical for every caller who may receive them, such as the
+lesson list shown to visitors who are not signed in. These are stored as
+ready-to-send JSON bytes plus a gzip variant, keyed by content version, so a
+request costs a dict lookup instead of a query and Pydantic serialization.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional
+
+
+def api_json(value) -> bytes:
+    """Encode like the API's JSONResponse so cached and dynamic bodies match."""
+    return json.dumps(
+        value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip; "gzip;q=0" refuses it, "*" covers it."""
+    qualities = {}
+    for item in (accept_encoding or "").split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+@dataclass
+class CachedBody:
+    """A serialized response body and its gzip variant."""
+    body: bytes
+    gzip_body: bytes
+    etag: str
+
+    @classmethod
+    def from_value(cls, value) -> "CachedBody":
+        body = api_json(value)
+        return cls(
+            body=body,
+            gzip_body=gzip.compress(body, compresslevel=9, mtime=0),
+            # Weak: the gzip and identity encodings are the same representation
+            etag=f'W/"{hashlib.sha256(body).hexdigest()[:32]}"',
+        )
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header covers this body (weak comparison)."""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag.removeprefix("W/") in tags
+
+
+class ResponseCache:
+    """Bounded LRU of serialized bodies; keys should include the content version."""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, value) -> CachedBody:
+        """Serialize value and store it under key."""
+        entry = CachedBody.from_value(value)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    async def get_or_build(self, key: Hashable, build: Callable) -> CachedBody:
+        """Return the cached body for key, awaiting build() to produce the value on a miss."""
+        entry = self.get(key)
+        if entry is None:
+            entry = self.put(key, await build())
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+guest_lessons_cache = ResponseCache()
@@ -0,0 +1,86 @@
+"""
+Lesson revision deltas.
+
+Every lesson write is recorded as a revision holding a compressed delta
+against the previous version. Long text fields are stored as line-level edit
+scripts, so a typo fix in a 30 KB story costs a few bytes instead of a copy.
+"""
+import json
+import zlib
+from difflib import SequenceMatcher
+from typing import Dict, List
+
+# Lesson fields tracked by revision history
+REVISION_FIELDS = (
+    "slug",
+    "title",
+    "story",
+    "reflection",
+    "challenge",
+    "quiz",
+    "order",
+    "module_number",
+    "is_published",
+)
+
+# Markdown fields that are diffed line by line instead of stored whole
+TEXT_FIELDS = ("story", "reflection", "challenge", "quiz")
+
+
+def lesson_snapshot(lesson) -> Dict[str, object]:
+    """Capture the tracked fields of a lesson."""
+    return {field: getattr(lesson, field) for field in REVISION_FIELDS}
+
+
+def _line_edits(old: str, new: str) -> List[list]:
+    """Edit script turning old into new, as [start, end, replacement_lines]."""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [
+        [i1, i2, new_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def make_delta(old: Dict[str, object], new: Dict[str, object]) -> Dict[str, dict]:
+    """
+    Describe the changes between two snapshots.
+    Text fields become {"edits": [...]}, everything else {"value": ...}.
+    """
+    delta = {}
+    for field in REVISION_FIELDS:
+        before, after = old.get(field), new.get(field)
+        if before == after:
+            continue
+        if field in TEXT_FIELDS and isinstance(before, str) and isinstance(after, str):
+            delta[field] = {"edits": _line_edits(before, after)}
+        else:
+            delta[field] = {"value": after}
+    return delta
+
+
+def apply_delta(old: Dict[str, object], delta: Dict[str, dict]) -> Dict[str, object]:
+    """Rebuild the newer snapshot from an older one and its delta."""
+    new = dict(old)
+    for field, change in delta.items():
+        if "value" in change:
+            new[field] = change["value"]
+            continue
+        lines = (old.get(field) or "").splitlines(keepends=True)
+        # Apply from the end so earlier line offsets stay valid
+        for start, end, replacement in reversed(change["edits"]):
+            lines[start:end] = replacement
+        new[field] = "".join(lines)
+    return new
+
+
+def compress_delta(delta: Dict[str, dict]) -> bytes:
+    """Serialize and compress a delta for storage."""
+    return zlib.compress(json.dumps(delta, separators=(",", ":")).encode("utf-8"), 9)
+
+
+def decompress_delta(data: bytes) -> Dict[str, dict]:
+    """Inverse of compress_delta."""
+    return json.loads(zlib.decompress(data).decode("utf-8"))
@@ -1,25 +1,63 @@
 """
 Admin API router for Resilient Mastery platform.
 """
+import json
+from datetime import timedelta
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
-from app.deps import get_session, get_current_active_user
-from app.models import User, Lesson, LessonCompletion, UserRole
+from app.analytics import (
+    build_cohort_matrix,
+    cohort_cache,
+    get_lesson_funnel,
+    refresh_lesson_funnel,
+    refresh_module_completions,
+)
+from app.deps import (
+    engine,
+    get_session,
+    get_read_session,
+    get_current_active_user,
+    get_user_from_token,
+    mark_recent_write,
+    optional_security,
+    session_class,
+)
+from app.live import announce_counters, live_counters
+from app.models import User, Lesson, UserRole
 from app.schemas import (
     AdminUserResponse, 
     AdminDashboardStats, 
+    CohortMatrix,
+    LessonFunnelStats,
+    StreamTicketResponse,
     UserUpdate,
     LessonCreate,
     LessonUpdate,
     LessonDetail
 )
-from app.crud import get_lessons, get_users_with_progress
+from app.crud import (
+    get_lessons,
+    get_users_with_progress,
+    update_lesson,
+    delete_lesson,
+    count_user_completions,
+    get_total_lesson_completions,
+    issue_stream_ticket,
+    redeem_stream_ticket,
+)
 
 router = APIRouter()
 
+# Rollup batches folded in per analytics request
+ANALYTICS_REFRESH_BATCHES = 1
+# Lifetime of a dashboard stream ticket
+STREAM_TICKET_SECONDS = 30
+
 
 def require_admin(current_user: User = Depends(get_current_active_user)):
     """Dependency to require admin role."""
@@ -31,12 +69,8 @@ def require_admin(current_user: User = Depends(get_current_active_user)):
     return current_user
 
 
-@router.get("/admin/dashboard", response_model=AdminDashboardStats)
-async def get_admin_dashboard(
-    session: AsyncSession = Depends(get_session),
-    admin_user: User = Depends(require_admin)
-):
-    """Get dashboard statistics for admin."""
+async def get_dashboard_stats(session: AsyncSession) -> AdminDashboardStats:
+    """Compute the dashboard counters from the tables."""
     
     # Get total users
     total_users_result = await session.execute(select(func.count(User.id)))
@@ -52,9 +86,8 @@ async def get_admin_dashboard(
     total_lessons_result = await session.execute(select(func.count(Lesson.id)))
     total_lessons = total_lessons_result.scalar()
     
-    # Get total completions
-    total_completions_result = await session.execute(select(func.count(LessonCompletion.id)))
-    total_completions = total_completions_result.scalar()
+    # Get total completions (including archived)
+    total_completions = await get_total_lesson_completions(session)
     
     # Calculate completion rate
     completion_rate = 0.0
@@ -70,9 +103,117 @@ async def get_admin_dashboard(
     )
 
 
+@router.get("/admin/dashboard", response_model=AdminDashboardStats)
+async def get_admin_dashboard(
+    session: AsyncSession = Depends(get_read_session),
+    admin_user: User = Depends(require_admin)
+):
+    """Get dashboard statistics for admin."""
+    return await get_dashboard_stats(session)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _counter_events(subscription, snapshot: AdminDashboardStats):
+    try:
+        yield _sse("snapshot", snapshot.model_dump())
+        while True:
+            change = await subscription.next()
+            if "deltas" in change:
+                yield _sse("delta", change["deltas"])
+            elif change.get("resync"):
+                yield _sse("resync", {})
+            else:
+                yield ": keep-alive\n\n"
+    finally:
+        subscription.close()
+
+
+@router.post("/admin/stream/ticket", response_model=StreamTicketResponse)
+async def create_stream_ticket(
+    session: AsyncSession = Depends(get_session),
+    admin_user: User = Depends(require_admin)
+):
+    """
+    Single-use ticket for opening the dashboard stream, valid for a few seconds.
+    EventSource cannot send headers; a ticket in the URL keeps the access token
+    out of access and proxy logs.
+    """
+    ticket = await issue_stream_ticket(session, admin_user.id, timedelta(seconds=STREAM_TICKET_SECONDS))
+    return StreamTicketResponse(ticket=ticket, expires_in=STREAM_TICKET_SECONDS)
+
+
+@router.get("/admin/stream")
+async def stream_admin_dashboard(
+    ticket: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """
+    Live dashboard counters as Server-Sent Events: a "snapshot" event with the
+    dashboard statistics, then "delta" events as users register, complete lessons
+    or change, and "resync" when the snapshot should be reloaded.
+    Authenticated by a bearer token or, for EventSource, a ?ticket= from
+    POST /admin/stream/ticket. A ticket opens one stream, so reconnecting needs a new one.
+    """
+    
+    # Subscribe first so no change made after the snapshot is missed
+    subscription = live_counters.subscribe()
+    try:
+        # A short-lived session (on the primary, which redeems the ticket): the stream holds no connection
+        async with session_class(engine) as session:
+            if credentials:
+                user = await get_user_from_token(session, credentials.credentials)
+            else:
+                user = await redeem_stream_ticket(session, ticket) if ticket else None
+                if user is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_401_UNAUTHORIZED,
+                        detail="Invalid or expired stream ticket"
+                    )
+            require_admin(await get_current_active_user(user))
+            snapshot = await get_dashboard_stats(session)
+    except BaseException:
+        subscription.close()
+        raise
+    
+    return StreamingResponse(
+        _counter_events(subscription, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/admin/analytics/lessons", response_model=List[LessonFunnelStats])
+async def get_lesson_funnel_admin(
+    session: AsyncSession = Depends(get_session),
+    admin_user: User = Depends(require_admin)
+):
+    """Per-lesson reach, completions and drop-off, from the incremental rollup."""
+    
+    # Fold in at most one batch of new completions; the CLI handles backfills
+    await refresh_lesson_funnel(session, max_batches=ANALYTICS_REFRESH_BATCHES)
+    return [LessonFunnelStats(**row) for row in await get_lesson_funnel(session)]
+
+
+@router.get("/admin/analytics/cohorts", response_model=CohortMatrix)
+async def get_cohort_matrix_admin(
+    session: AsyncSession = Depends(get_session),
+    admin_user: User = Depends(require_admin)
+):
+    """Module completion by signup-week cohort, rebuilt at most every few minutes."""
+    
+    async def build():
+        await refresh_module_completions(session, max_batches=ANALYTICS_REFRESH_BATCHES)
+        return await build_cohort_matrix(session)
+    
+    return CohortMatrix(**await cohort_cache.get_or_build(build))
+
+
 @router.get("/admin/users", response_model=List[AdminUserResponse])
 async def get_all_users(
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     admin_user: User = Depends(require_admin),
     skip: int = 0,
     limit: int = 100
@@ -94,29 +235,22 @@ async def get_all_users(
 @router.get("/admin/users/{user_id}", response_model=AdminUserResponse)
 async def get_user_by_id_admin(
     user_id: int,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     admin_user: User = Depends(require_admin)
 ):
     """Get specific user details."""
     
     # Get user with completion count
-    query = select(
-        User,
-        func.count(LessonCompletion.id).label('completed_lessons_count')
-    ).outerjoin(
-        LessonCompletion, User.id == LessonCompletion.user_id
-    ).where(User.id == user_id).group_by(User.id)
-    
-    result = await session.execute(query)
-    user_data = result.first()
+    result = await session.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
     
-    if not user_data:
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    user, completion_count = user_data
+    completion_count = await count_user_completions(session, user.id)
     
     return AdminUserResponse(
         id=user.id,
@@ -133,6 +267,7 @@ async def get_user_by_id_admin(
 async def update_user_admin(
     user_id: int,
     user_update: UserUpdate,
+    response: Response,
     session: AsyncSession = Depends(get_session),
     admin_user: User = Depends(require_admin)
 ):
@@ -149,19 +284,19 @@ async def update_user_admin(
         )
     
     # Update user fields
+    was_active = user.is_active
     update_data = user_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(user, field, value)
     
+    mark_recent_write(admin_user, response)
     session.add(user)
+    await announce_counters(session, active_users=int(user.is_active) - int(was_active))
     await session.commit()
     await session.refresh(user)
     
     # Get completion count
-    completion_result = await session.execute(
-        select(func.count(LessonCompletion.id)).where(LessonCompletion.user_id == user.id)
-    )
-    completion_count = completion_result.scalar()
+    completion_count = await count_user_completions(session, user.id)
     
     return AdminUserResponse(
         id=user.id,
@@ -177,6 +312,7 @@ async def update_user_admin(
 @router.delete("/admin/users/{user_id}")
 async def delete_user_admin(
     user_id: int,
+    response: Response,
     session: AsyncSession = Depends(get_session),
     admin_user: User = Depends(require_admin)
 ):
@@ -199,6 +335,8 @@ async def delete_user_admin(
             detail="User not found"
         )
     
+    mark_recent_write(admin_user, response)
+    await announce_counters(session, total_users=-1, active_users=-int(user.is_active))
     await session.delete(user)
     await session.commit()
     
@@ -207,7 +345,7 @@ async def delete_user_admin(
 
 @router.get("/admin/lessons", response_model=List[LessonDetail])
 async def get_all_lessons_admin(
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     admin_user: User = Depends(require_admin)
 ):
     """Get all lessons for admin management."""
@@ -217,6 +355,7 @@ async def get_all_lessons_admin(
 @router.post("/admin/lessons", response_model=LessonDetail)
 async def create_lesson_admin(
     lesson_create: LessonCreate,
+    response: Response,
     session: AsyncSession = Depends(get_session),
     admin_user: User = Depends(require_admin)
 ):
@@ -224,6 +363,7 @@ async def create_lesson_admin(
     
     from app.crud import create_lesson
     
+    mark_recent_write(admin_user, response)
     lesson = await create_lesson(session, lesson_create)
     return lesson
 
@@ -232,14 +372,15 @@ async def create_lesson_admin(
 async def update_lesson_admin(
     lesson_id: int,
     lesson_update: LessonUpdate,
+    response: Response,
     session: AsyncSession = Depends(get_session),
     admin_user: User = Depends(require_admin)
 ):
     """Update lesson (admin only)."""
     
-    # Get the lesson
-    result = await session.execute(select(Lesson).where(Lesson.id == lesson_id))
-    lesson = result.scalar_one_or_none()
+    # crud.update_lesson bumps updated_at and records a revision
+    mark_recent_write(admin_user, response)
+    lesson = await update_lesson(session, lesson_id, lesson_update)
     
     if not lesson:
         raise HTTPException(
@@ -247,37 +388,25 @@ async def update_lesson_admin(
             detail="Lesson not found"
         )
     
-    # Update lesson fields
-    update_data = lesson_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(lesson, field, value)
-    
-    session.add(lesson)
-    await session.commit()
-    await session.refresh(lesson)
-    
     return lesson
 
 
 @router.delete("/admin/lessons/{lesson_id}")
 async def delete_lesson_admin(
     lesson_id: int,
+    response: Response,
     session: AsyncSession = Depends(get_session),
     admin_user: User = Depends(require_admin)
 ):
     """Delete lesson (admin only)."""
     
-    # Get the lesson
-    result = await session.execute(select(Lesson).where(Lesson.id == lesson_id))
-    lesson = result.scalar_one_or_none()
+    mark_recent_write(admin_user, response)
+    deleted = await delete_lesson(session, lesson_id)
     
-    if not lesson:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Lesson not found"
         )
     
-    await session.delete(lesson)
-    await session.commit()
-    
     return {"message": "Lesson deleted successfully"}
@@ -1,20 +1,30 @@
 """
 Authentication API router for Resilient Mastery platform.
 """
+import asyncio
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.deps import (
     get_session, 
     authenticate_user, 
     create_access_token,
+    get_password_hash,
     get_current_active_user,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from app.models import User
-from app.schemas import Token, UserLogin, UserCreate, UserResponse
-from app.crud import create_user, get_user_by_email, get_user_by_username
+from app.schemas import Token, UserLogin, UserCreate, UserResponse, RefreshRequest
+from app.crud import (
+    DuplicateUserError,
+    create_user,
+    issue_refresh_token,
+    rotate_refresh_token,
+    revoke_refresh_token,
+)
+from app.metrics import metrics
+from app.ratelimit import login_rate_limiter
 
 router = APIRouter()
 
@@ -26,40 +36,46 @@ async def register(
 ):
     """
     Register a new user account.
-    Checks for existing email/username before creating.
+    Relies on the unique constraints to reject an existing email/username.
     """
-    # Check if user already exists
-    existing_user = await get_user_by_email(session, user_create.email)
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
+    # Hash before touching the database so no connection is held meanwhile
+    hashed_password = await asyncio.to_thread(get_password_hash, user_create.password)
     
-    # Check username
-    existing_username = await get_user_by_username(session, user_create.username)
-    if existing_username:
+    try:
+        user = await create_user(session, user_create, hashed_password)
+    except DuplicateUserError as error:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already taken"
+            detail="Email already registered" if error.field == "email" else "Username already taken"
         )
-    
-    # Create user
-    user = await create_user(session, user_create)
     return user
 
 
 @router.post("/auth/login", response_model=Token)
 async def login(
     user_login: UserLogin,
+    request: Request,
     session: AsyncSession = Depends(get_session)
 ):
     """
     Login with username and password.
     Returns JWT access token for authenticated requests.
+    Attempts are throttled per IP and username before any password hashing.
     """
+    metrics.inc("login_attempts_total")
+    # Behind a trusted proxy (FORWARDED_ALLOW_IPS) uvicorn has already set this from X-Forwarded-For
+    client_ip = request.client.host if request.client else None
+    retry_after = await login_rate_limiter.check(client_ip, user_login.username)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts. Please try again later.",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+        )
+    
     user = await authenticate_user(session, user_login.username, user_login.password)
     if not user:
+        metrics.inc("login_failures_total")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -70,7 +86,44 @@ async def login(
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    refresh_token = await issue_refresh_token(session, user.id)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/auth/refresh", response_model=Token)
+async def refresh(
+    refresh_request: RefreshRequest,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Exchange a refresh token for a new access token and refresh token.
+    Each refresh token is single-use; reusing one revokes the whole login.
+    """
+    rotated = await rotate_refresh_token(session, refresh_request.refresh_token)
+    if not rotated:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user, refresh_token = rotated
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.username}, expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/auth/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    refresh_request: RefreshRequest,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Revoke a refresh token and every token rotated from the same login.
+    """
+    await revoke_refresh_token(session, refresh_request.refresh_token)
 
 
 @router.get("/auth/me", response_model=UserResponse)
@@ -0,0 +1,59 @@
+"""
+Offline content API router for Resilient Mastery platform.
+"""
+import gzip
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.deps import get_session
+from app.packs import pack_store
+from app.schemas import ContentManifest
+
+router = APIRouter()
+
+
+@router.get("/modules/{module_number}/pack")
+async def get_module_pack(
+    module_number: int,
+    request: Request,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Download every published lesson of a module as one gzip-compressed JSON pack.
+    Packs are built once per content version; clients revalidate with the ETag.
+    """
+    pack = await pack_store.get_pack(session, module_number)
+    if not pack:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Module not found"
+        )
+    
+    headers = {
+        "ETag": f'"{pack.sha256}"',
+        "Cache-Control": "public, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return FileResponse(pack.path, media_type="application/json", headers=headers)
+    
+    # Rare clients without gzip support get the pack decompressed
+    with open(pack.path, "rb") as pack_file:
+        body = gzip.decompress(pack_file.read())
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/content/manifest", response_model=ContentManifest)
+async def get_content_manifest(
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    List each published lesson's content hash and size, and each module pack.
+    Service workers use it to prefetch packs and skip unchanged content.
+    """
+    return await pack_store.get_manifest(session)
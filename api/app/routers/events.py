@@ -0,0 +1,52 @@
+"""
+Learning event API router for Resilient Mastery platform.
+"""
+import json
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.deps import get_current_active_user
+from app.events import MAX_EVENT_AGE, MAX_EVENT_CLOCK_SKEW, MAX_EVENT_DATA_BYTES, event_writer
+from app.models import User
+from app.schemas import LearningEventBatch, LearningEventsAccepted
+
+router = APIRouter()
+
+
+@router.post("/events", response_model=LearningEventsAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def record_events(
+    batch: LearningEventBatch,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Queue a batch of lesson views, section switches and quiz attempts.
+    Events are written in the background, usually within a fraction of a second.
+    """
+    received_at = datetime.utcnow()
+    rows = []
+    for event in batch.events:
+        data = json.dumps(event.data, separators=(",", ":"))
+        if len(data.encode("utf-8")) > MAX_EVENT_DATA_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Event data must be at most {MAX_EVENT_DATA_BYTES} bytes"
+            )
+        occurred_at = event.occurred_at or received_at
+        if occurred_at.tzinfo is not None:
+            # Stored as naive UTC, like every other timestamp
+            occurred_at = occurred_at.astimezone(timezone.utc).replace(tzinfo=None)
+        if not received_at - MAX_EVENT_AGE <= occurred_at <= received_at + MAX_EVENT_CLOCK_SKEW:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Event occurred_at must be within the last {MAX_EVENT_AGE.days} days"
+            )
+        rows.append((current_user.id, event.event_type.value, event.lesson_id, data, occurred_at, received_at))
+    
+    if not event_writer.submit(rows):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many events waiting to be written, retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    return LearningEventsAccepted(accepted=len(rows))
@@ -2,21 +2,34 @@
 Lessons API router for Resilient Mastery platform.
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.deps import get_session, get_current_active_user, get_current_user_optional
+from app.deps import (
+    get_session,
+    get_read_session,
+    get_current_active_user,
+    get_current_user_optional,
+    mark_recent_write,
+)
 from app.models import User
 from app.schemas import (
     LessonList, 
     LessonDetail, 
+    CompiledLessonResponse,
+    LessonSearchResult,
+    LessonChangesResponse,
     LessonCompletionResponse, 
     ProgressResponse
     # ReflectionCreate, ReflectionUpdate, ReflectionResponse - temporarily disabled
 )
 from app.crud import (
     get_lessons, 
+    guest_lesson_list,
     get_lesson, 
+    get_compiled_lesson,
+    get_lesson_changes,
+    get_content_version,
     create_lesson_completion,
     get_lesson_completion_stats,
     get_lessons_with_unlock_status,
@@ -24,20 +37,26 @@ from app.crud import (
     get_user_module_progress
     # Reflection functions will be available after container restart
 )
+from app.response_cache import accepts_gzip, guest_lessons_cache
+from app.search import search_index, search_postgres, use_postgres_search
 
 router = APIRouter()
 
+LESSON_PAGE_SIZE = 100
+
 
 @router.get("/lessons", response_model=List[LessonList])
 async def list_lessons(
+    request: Request,
     skip: int = 0,
-    limit: int = 100,
-    session: AsyncSession = Depends(get_session),
+    limit: int = LESSON_PAGE_SIZE,
+    session: AsyncSession = Depends(get_read_session),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """
     Get list of all published lessons with unlock status.
     Returns minimal lesson info for sidebar navigation.
+    The default guest page is cached per content version and publicly cacheable.
     """
     if current_user:
         # Return lessons with unlock status for authenticated users
@@ -55,26 +74,68 @@ async def list_lessons(
             for lesson in lessons_with_status
         ]
     else:
-        # Return basic lesson info for unauthenticated users
-        lessons = await get_lessons(session, skip=skip, limit=limit)
-        return [
-            LessonList(
-                id=lesson.id,
-                title=lesson.title,
-                slug=lesson.slug,
-                order=lesson.order,
-                module_number=getattr(lesson, 'module_number', 1),
-                is_unlocked=lesson.order <= 2,  # Only first module unlocked for guests
-                is_completed=False
-            )
-            for lesson in lessons
-        ]
+        # Guests all get the same list, served pre-serialized per content version
+        async def build_guest_list():
+            lessons = await get_lessons(session, skip=skip, limit=limit)
+            return [
+                LessonList(**lesson).model_dump(mode="json")
+                for lesson in guest_lesson_list(lessons)
+            ]
+        
+        # Only the default page is cached, so other skip/limit values cannot evict it
+        if skip != 0 or limit != LESSON_PAGE_SIZE:
+            return await build_guest_list()
+        
+        version = await get_content_version(session)
+        cached = await guest_lessons_cache.get_or_build(version, build_guest_list)
+        headers = {
+            "ETag": cached.etag,
+            "Cache-Control": "public, max-age=60",
+            # Signed-in users get a personalised list from the same URL
+            "Vary": "Accept-Encoding, Authorization",
+        }
+        if cached.matches(request.headers.get("if-none-match")):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        if accepts_gzip(request.headers.get("accept-encoding")):
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=cached.gzip_body, media_type="application/json", headers=headers)
+        return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+@router.get("/lessons/search", response_model=List[LessonSearchResult])
+async def search_lessons(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=50),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Full-text search over lesson title, story, reflection and challenge.
+    Results are BM25-ranked with highlighted snippets.
+    """
+    if use_postgres_search(session):
+        return await search_postgres(session, q, limit)
+    return search_index.search(q, limit)
+
+
+@router.get("/lessons/changes", response_model=LessonChangesResponse)
+async def list_lesson_changes(
+    since: int = Query(0, ge=0),
+    include_deltas: bool = False,
+    limit: int = Query(500, ge=1, le=1000),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Get lesson changes after a catalog version.
+    Clients pass the last version they saw and refetch only changed lessons,
+    or apply the returned deltas when include_deltas is set.
+    """
+    return await get_lesson_changes(session, since, include_deltas=include_deltas, limit=limit)
 
 
 @router.get("/lessons/{lesson_id}", response_model=LessonDetail)
 async def get_lesson_detail(
     lesson_id: int,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Get full lesson content by ID.
@@ -89,9 +150,28 @@ async def get_lesson_detail(
     return lesson
 
 
+@router.get("/lessons/{lesson_id}/compiled", response_model=CompiledLessonResponse)
+async def get_lesson_compiled(
+    lesson_id: int,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Get lesson sections pre-compiled to sanitized HTML and a block AST.
+    Clients can render interactive blocks without parsing markdown.
+    """
+    lesson = await get_lesson(session, lesson_id)
+    if not lesson:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Lesson not found"
+        )
+    return await get_compiled_lesson(session, lesson)
+
+
 @router.post("/lessons/{lesson_id}/complete", response_model=LessonCompletionResponse)
 async def complete_lesson(
     lesson_id: int,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     session: AsyncSession = Depends(get_session)
 ):
@@ -99,6 +179,8 @@ async def complete_lesson(
     Mark a lesson as completed for the current user.
     Auth required - creates a completion record.
     """
+    # The user's next progress reads must include this completion
+    mark_recent_write(current_user, response)
     completion = await create_lesson_completion(session, current_user.id, lesson_id)
     if not completion:
         raise HTTPException(
@@ -111,7 +193,7 @@ async def complete_lesson(
 @router.get("/progress", response_model=ProgressResponse)
 async def get_user_progress(
     current_user: User = Depends(get_current_active_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Get progress statistics for the current user.
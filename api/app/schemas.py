@@ -1,9 +1,10 @@
 """
 Pydantic schemas for API request/response models.
 """
-from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel, EmailStr
+from datetime import date, datetime
+from typing import Optional, List, Dict, Any
+from enum import Enum
+from pydantic import BaseModel, EmailStr, Field
 from app.models import UserRole
 
 
@@ -36,6 +37,11 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -95,6 +101,74 @@ class LessonDetail(LessonBase):
         from_attributes = True
 
 
+class LessonSearchResult(BaseModel):
+    """A ranked search hit with a highlighted excerpt."""
+    id: int
+    title: str
+    slug: str
+    order: int
+    module_number: int
+    score: float
+    snippet: str
+
+
+class LessonChange(BaseModel):
+    """One recorded lesson write."""
+    version: int
+    lesson_id: int
+    operation: str
+    changed_fields: List[str]
+    delta: Optional[Dict[str, Any]] = None
+
+
+class LessonChangesResponse(BaseModel):
+    """Lesson writes since a catalog version, for incremental sync."""
+    version: int
+    has_more: bool
+    full_resync: bool
+    lesson_ids: List[int]
+    changes: List[LessonChange]
+
+
+class ManifestLesson(BaseModel):
+    """Content hash and size of one lesson's canonical JSON."""
+    id: int
+    module_number: int
+    content_hash: str
+    size: int
+
+
+class ManifestModulePack(BaseModel):
+    """Location and integrity data of one module pack."""
+    module_number: int
+    url: str
+    lesson_ids: List[int]
+    sha256: str
+    size: int
+    compressed_size: int
+
+
+class ContentManifest(BaseModel):
+    """Everything a client needs to prefetch and verify offline content."""
+    version: str
+    lessons: List[ManifestLesson]
+    modules: List[ManifestModulePack]
+
+
+class CompiledSectionResponse(BaseModel):
+    """Pre-rendered HTML and block AST for one lesson section."""
+    content_hash: str
+    html: str
+    blocks: List[Dict[str, Any]]
+
+
+class CompiledLessonResponse(BaseModel):
+    """Compiled story, reflection and challenge sections of a lesson."""
+    id: int
+    content_hash: str
+    sections: Dict[str, CompiledSectionResponse]
+
+
 # Lesson completion schemas
 class LessonCompletionCreate(BaseModel):
     lesson_id: int
@@ -137,6 +211,46 @@ class AdminDashboardStats(BaseModel):
     completion_rate: float
     
     
+class StreamTicketResponse(BaseModel):
+    """Single-use ticket for opening an event stream (?ticket=)."""
+    ticket: str
+    expires_in: int  # Seconds
+    
+    
+class LessonFunnelStats(BaseModel):
+    """One lesson's step in the completion funnel."""
+    lesson_id: int
+    title: str
+    order: int
+    module_number: int
+    reach: int  # Users who completed the previous lesson (all users for the first)
+    completions: int
+    drop_off: int
+    drop_off_rate: float
+    median_seconds_since_previous: Optional[float] = None  # Since the user's previous completion
+    
+    
+class CohortModuleProgress(BaseModel):
+    """Cumulative completions of one module by a cohort, per week since signup."""
+    module_number: int
+    completed: List[Optional[int]]  # None for weeks the cohort has not reached yet
+    completion_rates: List[Optional[float]]
+    
+    
+class CohortRow(BaseModel):
+    """Users who signed up in one week (starting Monday)."""
+    cohort_week: date
+    users: int
+    modules: List[CohortModuleProgress]
+    
+    
+class CohortMatrix(BaseModel):
+    """Module completion by signup-week cohort."""
+    weeks: int
+    generated_at: datetime
+    cohorts: List[CohortRow]
+    
+    
 class UserUpdate(BaseModel):
     """Admin user update schema."""
     email: Optional[EmailStr] = None
@@ -162,4 +276,29 @@ class UserUpdate(BaseModel):
 #     updated_at: datetime
 #     
 #     class Config:
-#         from_attributes = True 
\ No newline at end of file
+#         from_attributes = True 
+
+
+class LearningEventType(str, Enum):
+    """Kinds of client-reported learning activity."""
+    LESSON_VIEW = "lesson_view"
+    SECTION_SWITCH = "section_switch"
+    QUIZ_ATTEMPT = "quiz_attempt"
+
+
+class LearningEventCreate(BaseModel):
+    """One learning event reported by the client."""
+    event_type: LearningEventType
+    lesson_id: Optional[int] = Field(default=None, ge=1, le=2**31 - 1)  # Fits the INTEGER column
+    data: Dict[str, Any] = {}  # e.g. {"section": "story"} or {"score": 3, "total": 5}
+    occurred_at: Optional[datetime] = None  # Defaults to the time the server received it
+
+
+class LearningEventBatch(BaseModel):
+    """Events buffered by the client and sent together."""
+    events: List[LearningEventCreate] = Field(min_length=1, max_length=100)
+
+
+class LearningEventsAccepted(BaseModel):
+    """Events queued for writing."""
+    accepted: int
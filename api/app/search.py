@@ -0,0 +1,252 @@
+"""
+Full-text lesson search.
+
+An in-process inverted index over lesson title, story, reflection and
+challenge, ranked with BM25. The catalog is small and read-mostly, so the
+whole index lives in memory: it is built once at startup and updated in place
+when admins edit lessons. Deployments on Postgres can instead opt into the
+`tsvector` + GIN path with SEARCH_BACKEND=postgres.
+"""
+import html
+import math
+import os
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "memory")
+
+# Title matches count more than matches in body text
+FIELD_WEIGHTS = {"title": 3.0, "story": 1.0, "reflection": 1.0, "challenge": 1.0}
+SNIPPET_FIELDS = ("story", "reflection", "challenge")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_EXPANSIONS = 20
+SNIPPET_RADIUS = 80
+
+_TOKEN_RE = re.compile(r"\w+(?:[-']\w+)*")
+_MARKDOWN_RE = re.compile(r"[#*_>`|]+|\[(?:text|textarea|slider):[^\]]*\]")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i if in into is it "
+    "its me my not of on or our she so that the their them then there these they "
+    "this to was we were what when which who will with you your".split()
+)
+
+
+def tokenize(value: str) -> List[str]:
+    """Split text into lowercase index terms, keeping hyphenated compounds."""
+    terms = []
+    for match in _TOKEN_RE.finditer(value.lower()):
+        token = match.group(0)
+        if token in _STOPWORDS:
+            continue
+        terms.append(token)
+        # "self-awareness" is also findable as "self" and "awareness"
+        if "-" in token:
+            terms.extend(part for part in token.split("-") if part and part not in _STOPWORDS)
+    return terms
+
+
+def _query_terms(query: str) -> List[str]:
+    """Terms of a search query; compounds are matched whole."""
+    return [
+        match.group(0)
+        for match in _TOKEN_RE.finditer(query.lower())
+        if match.group(0) not in _STOPWORDS
+    ]
+
+
+class LessonSearchIndex:
+    """In-memory BM25 inverted index over published lessons."""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._docs: Dict[int, dict] = {}
+        self._total_length = 0.0
+        self._vocabulary: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def build(self, lessons) -> None:
+        """Replace the index contents with the given lessons."""
+        self.__init__()
+        for lesson in lessons:
+            self.add(lesson)
+
+    def add(self, lesson) -> None:
+        """Index a lesson, replacing any previous version of it."""
+        self.remove(lesson.id)
+        if not lesson.is_published:
+            return
+
+        weighted: Dict[str, float] = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(getattr(lesson, field) or ""):
+                weighted[term] += weight
+
+        for term, frequency in weighted.items():
+            self._postings[term][lesson.id] = frequency
+        length = sum(weighted.values())
+        self._doc_terms[lesson.id] = dict(weighted)
+        self._doc_lengths[lesson.id] = length
+        self._total_length += length
+        self._docs[lesson.id] = {
+            "id": lesson.id,
+            "title": lesson.title,
+            "slug": lesson.slug,
+            "order": lesson.order,
+            "module_number": lesson.module_number,
+            "text": {field: _MARKDOWN_RE.sub("", getattr(lesson, field) or "") for field in SNIPPET_FIELDS},
+        }
+        self._vocabulary = None
+
+    def remove(self, lesson_id: int) -> None:
+        """Drop a lesson from the index if present."""
+        terms = self._doc_terms.pop(lesson_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(lesson_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(lesson_id)
+        del self._docs[lesson_id]
+        self._vocabulary = None
+
+    def _expand(self, term: str) -> List[str]:
+        """Resolve a query term, falling back to prefix matches for partial words."""
+        if term in self._postings:
+            return [term]
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        start = bisect_left(self._vocabulary, term)
+        matches = []
+        for candidate in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not candidate.startswith(term):
+                break
+            matches.append(candidate)
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Return the best matching lessons with highlighted snippets."""
+        terms = _query_terms(query)
+        if not terms or not self._docs:
+            return []
+
+        doc_count = len(self._docs)
+        average_length = self._total_length / doc_count
+        scores: Dict[int, float] = defaultdict(float)
+        matched_terms = set()
+
+        for term in terms:
+            for expanded in self._expand(term):
+                postings = self._postings[expanded]
+                matched_terms.add(expanded)
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for lesson_id, frequency in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[lesson_id] / average_length)
+                    scores[lesson_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self._docs[item[0]]["order"]))
+        results = []
+        for lesson_id, score in ranked[:limit]:
+            doc = self._docs[lesson_id]
+            results.append({
+                "id": doc["id"],
+                "title": doc["title"],
+                "slug": doc["slug"],
+                "order": doc["order"],
+                "module_number": doc["module_number"],
+                "score": round(score, 4),
+                "snippet": make_snippet(doc["text"], matched_terms),
+            })
+        return results
+
+
+def _highlight(fragment: str, terms) -> str:
+    """Escape a text fragment and wrap matched terms in <mark>."""
+    pattern = re.compile(
+        r"(?<!\w)(" + "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)) + r")(?![\w-])",
+        re.IGNORECASE,
+    )
+    parts = []
+    position = 0
+    for match in pattern.finditer(fragment):
+        parts.append(html.escape(fragment[position:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group(0))}</mark>")
+        position = match.end()
+    parts.append(html.escape(fragment[position:]))
+    return "".join(parts)
+
+
+def make_snippet(texts: Dict[str, str], terms) -> str:
+    """Build a short highlighted excerpt around the first matching term."""
+    if not terms:
+        return ""
+    pattern = re.compile(
+        r"(?<!\w)(" + "|".join(re.escape(term) for term in terms) + r")(?![\w-])",
+        re.IGNORECASE,
+    )
+    for field in SNIPPET_FIELDS:
+        body = texts.get(field) or ""
+        match = pattern.search(body)
+        if not match:
+            continue
+        start = max(0, match.start() - SNIPPET_RADIUS)
+        end = min(len(body), match.end() + SNIPPET_RADIUS)
+        fragment = " ".join(body[start:end].split())
+        prefix = "…" if start > 0 else ""
+        suffix = "…" if end < len(body) else ""
+        return prefix + _highlight(fragment, terms) + suffix
+    return ""
+
+
+search_index = LessonSearchIndex()
+
+
+# Postgres full-text search, backed by the lesson.search_vector GIN index
+_PG_SEARCH_SQL = text("""
+    SELECT id, title, slug, "order", module_number,
+           ts_rank_cd(search_vector, query) AS score,
+           ts_headline(
+               'english', story || ' ' || reflection || ' ' || challenge, query,
+               'StartSel=' || chr(2) || ', StopSel=' || chr(3) || ', MaxFragments=1, MaxWords=30, MinWords=10'
+           ) AS snippet
+    FROM lesson, websearch_to_tsquery('english', :query) AS query
+    WHERE is_published AND search_vector @@ query
+    ORDER BY score DESC, "order"
+    LIMIT :limit
+""")
+
+
+async def search_postgres(session: AsyncSession, query: str, limit: int = 10) -> List[dict]:
+    """Search lessons with Postgres full-text search."""
+    result = await session.execute(_PG_SEARCH_SQL, {"query": query, "limit": limit})
+    results = []
+    for row in result.mappings().all():
+        snippet = html.escape(row["snippet"] or "").replace("\x02", "<mark>").replace("\x03", "</mark>")
+        results.append({
+            "id": row["id"],
+            "title": row["title"],
+            "slug": row["slug"],
+            "order": row["order"],
+            "module_number": row["module_number"],
+            "score": round(float(row["score"]), 4),
+            "snippet": snippet,
+        })
+    return results
+
+
+def use_postgres_search(session: AsyncSession) -> bool:
+    """Whether queries should go to Postgres instead of the in-memory index."""
+    return SEARCH_BACKEND == "postgres" and session.bind.dialect.name == "postgresql"
@@ -0,0 +1,134 @@
+"""
+Production entry point: several uvicorn worker processes.
+
+With gunicorn installed, the app is imported once in the master (preload)
+and forked into UvicornWorker processes. Code, schemas and the lazily
+imported password and JWT modules are then shared copy-on-write pages.
+Workers are recycled after MAX_REQUESTS requests (with jitter so they do not
+all restart together) and given GRACEFUL_TIMEOUT seconds to finish in-flight
+requests. Without gunicorn, uvicorn's own process manager is used; it
+re-imports the app in each worker and cannot replace exited workers, so
+recycling is left off in that mode.
+
+Workers share nothing in memory: each keeps its own token cache, response
+caches and rate-limit buckets, and each runs the lifespan (schema check,
+search index) on boot.
+
+Usage:
+    python -m app.serve
+
+Configuration (environment):
+    PORT / HOST             bind address (default 0.0.0.0:8000)
+    WEB_CONCURRENCY         worker count (default: available CPUs)
+    MAX_REQUESTS            requests before a worker is recycled (gunicorn; 0 disables)
+    MAX_REQUESTS_JITTER     random extra requests per worker
+    GRACEFUL_TIMEOUT        seconds to drain a worker on restart or shutdown
+    FORWARDED_ALLOW_IPS     comma-separated proxy addresses whose X-Forwarded-For
+                            is trusted for the client IP (default 127.0.0.1; "*" trusts any)
+"""
+import gc
+import math
+import os
+
+APP = "app.main:app"
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "10000"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring affinity and a cgroup v2 CPU quota."""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS or Windows
+        count = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            count = min(count, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+def worker_count() -> int:
+    """WEB_CONCURRENCY if set, otherwise one async worker per available CPU."""
+    configured = os.getenv("WEB_CONCURRENCY")
+    if configured:
+        return max(1, int(configured))
+    return available_cpus()
+
+
+def preload():
+    """Import the app and the modules it defers, then freeze them out of GC scans."""
+    from app.deps import password_context
+    from app.main import app
+    import jose.jwt  # noqa: F401  (imported on first token otherwise)
+
+    password_context()
+    # Objects that exist before the fork are never collected; freezing keeps the
+    # collector from touching (and so copying) their pages in every worker
+    gc.freeze()
+    return app
+
+
+def gunicorn_options(workers: int) -> dict:
+    return {
+        "bind": f"{HOST}:{PORT}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS_JITTER,
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+        "timeout": GRACEFUL_TIMEOUT + 30,
+        "keepalive": 5,
+        # UvicornWorker passes this on as uvicorn's forwarded_allow_ips
+        "forwarded_allow_ips": FORWARDED_ALLOW_IPS,
+    }
+
+
+def run_gunicorn(workers: int) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in gunicorn_options(workers).items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return preload()
+
+    Server().run()
+
+
+def run_uvicorn(workers: int) -> None:
+    import uvicorn
+
+    uvicorn.run(
+        APP,
+        host=HOST,
+        port=PORT,
+        workers=workers,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+    )
+
+
+def main():
+    workers = worker_count()
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        run_uvicorn(workers)
+    else:
+        run_gunicorn(workers)
+
+
+if __name__ == "__main__":
+    main()
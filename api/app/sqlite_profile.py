@@ -0,0 +1,141 @@
+"""
+Production profile for SQLite deployments.
+
+Applied to every new connection when the database is SQLite:
+- WAL journal, so readers never block the writer and vice versa
+- synchronous=NORMAL, which is durable across application crashes in WAL mode
+- a memory-mapped file and a larger page cache for read-heavy traffic
+- busy_timeout, so a connection waits for the write lock instead of failing
+
+SQLite allows one writer at a time. Rather than letting concurrent write
+transactions spin in SQLite's busy handler (each holding a pooled connection
+and a thread), SerializedWriteSession queues them on an asyncio lock: a session
+takes the lock at its first write and releases it at commit, rollback or close.
+Reads are not serialized.
+"""
+import asyncio
+import os
+import time
+import weakref
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.metrics import metrics
+
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production")  # production or off
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(16 * 1024)))
+
+
+def profile_enabled(engine: AsyncEngine) -> bool:
+    """Whether the production profile applies to this engine."""
+    return engine.dialect.name == "sqlite" and SQLITE_PROFILE != "off"
+
+
+def pragma_statements(database: Optional[str]) -> list:
+    """PRAGMAs for a new connection (WAL needs a file, not :memory:)."""
+    statements = [
+        f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}",
+        "PRAGMA synchronous = NORMAL",
+        f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+    if database and database != ":memory:" and not database.startswith("file::memory:"):
+        statements.insert(0, "PRAGMA journal_mode = WAL")
+    return statements
+
+
+def configure_sqlite_engine(engine: AsyncEngine) -> None:
+    """Apply the production PRAGMAs to every connection the engine opens."""
+    statements = pragma_statements(engine.url.database)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+
+
+# One writer lock per event loop (asyncio locks cannot be shared across loops)
+_writer_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+
+def writer_lock() -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    lock = _writer_locks.get(loop)
+    if lock is None:
+        lock = _writer_locks[loop] = asyncio.Lock()
+    return lock
+
+
+class SerializedWriteSession(AsyncSession):
+    """AsyncSession that holds the process-wide writer lock during write transactions."""
+
+    _holds_writer_lock = False
+
+    def _has_pending_writes(self) -> bool:
+        # Pending ORM changes are flushed by autoflush on the next query
+        return bool(self.sync_session.new or self.sync_session.dirty or self.sync_session.deleted)
+
+    async def _acquire_writer(self) -> None:
+        if self._holds_writer_lock:
+            return
+        lock = writer_lock()
+        if lock.locked():
+            metrics.inc("sqlite_writer_waits_total")
+            started = time.perf_counter()
+            await lock.acquire()
+            metrics.inc("sqlite_writer_wait_seconds_total", time.perf_counter() - started)
+        else:
+            await lock.acquire()
+        self._holds_writer_lock = True
+
+    def _release_writer(self) -> None:
+        if self._holds_writer_lock:
+            self._holds_writer_lock = False
+            writer_lock().release()
+
+    async def execute(self, statement, *args, **kwargs):
+        if getattr(statement, "is_dml", False) or self._has_pending_writes():
+            await self._acquire_writer()
+        return await super().execute(statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        if getattr(statement, "is_dml", False) or self._has_pending_writes():
+            await self._acquire_writer()
+        return await super().scalar(statement, *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        if self._has_pending_writes():
+            await self._acquire_writer()
+        return await super().get(*args, **kwargs)
+
+    async def flush(self, objects=None):
+        if self._has_pending_writes():
+            await self._acquire_writer()
+        await super().flush(objects)
+
+    async def commit(self):
+        if self._has_pending_writes():
+            await self._acquire_writer()
+        try:
+            await super().commit()
+        finally:
+            self._release_writer()
+
+    async def rollback(self):
+        try:
+            await super().rollback()
+        finally:
+            self._release_writer()
+
+    async def close(self):
+        try:
+            await super().close()
+        finally:
+            self._release_writer()
@@ -0,0 +1,121 @@
+"""
+Cold-start profiling.
+
+Instances scale to zero, so every first request after idle pays for Python
+imports and the application lifespan. This command imports the app in a fresh
+interpreter with `-X importtime` and reports where the time goes, then starts
+uvicorn and measures the wall time until the first request is served.
+
+Usage:
+    python -m app.startup_profile [--module app.main] [--top 20] [--no-serve]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from typing import Dict, List
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class ImportTiming:
+    """One line of `-X importtime` output (times in microseconds)."""
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportTiming]:
+    """Parse the `import time: self | cumulative | module` lines written to stderr."""
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        timings.append(ImportTiming(module, int(self_us), int(cumulative_us), depth))
+    return timings
+
+
+def profile_imports(module: str = "app.main") -> List[ImportTiming]:
+    """Import a module in a fresh interpreter and return its import timings."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=API_DIR, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def by_package(timings: List[ImportTiming]) -> Dict[str, int]:
+    """Self time summed per top-level package, in microseconds."""
+    totals: Dict[str, int] = {}
+    for timing in timings:
+        package = timing.module.split(".")[0]
+        totals[package] = totals.get(package, 0) + timing.self_us
+    return totals
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(app: str = "app.main:app", path: str = "/health", timeout: float = 60.0) -> float:
+    """Seconds from launching uvicorn to the first successful response."""
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        cwd=API_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise TimeoutError(f"No response from {path} within {timeout} seconds")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time and time to first request.")
+    parser.add_argument("--module", default="app.main", help="Module to import")
+    parser.add_argument("--top", type=int, default=20, help="Rows to show in each table")
+    parser.add_argument("--no-serve", action="store_true", help="Skip the time-to-first-request measurement")
+    args = parser.parse_args()
+
+    timings = profile_imports(args.module)
+    total = next(t.cumulative_us for t in timings if t.module == args.module)
+    print(f"import {args.module}: {total / 1000:.1f} ms\n")
+
+    print("Slowest imports (cumulative):")
+    for timing in sorted(timings, key=lambda t: t.cumulative_us, reverse=True)[:args.top]:
+        print(f"  {timing.cumulative_us / 1000:8.1f} ms  {'  ' * timing.depth}{timing.module}")
+
+    print("\nSelf time by package:")
+    packages = sorted(by_package(timings).items(), key=lambda item: item[1], reverse=True)
+    for package, self_us in packages[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    if not args.no_serve:
+        print(f"\nFirst request served after {time_to_first_request() * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
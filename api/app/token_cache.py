@@ -0,0 +1,79 @@
+"""
+Verified-token cache.
+
+Decoding a JWT means a pure-Python HMAC check plus JSON parsing, and clients
+present the same access token on every request of a session. Verified claims
+are kept in a bounded LRU keyed by a digest of the token (the token itself is
+never stored) until the token's own `exp`, so the hot path is a dict lookup.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.metrics import metrics
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+class VerifiedTokenCache:
+    """LRU of token digest -> decoded claims, valid until the claims expire."""
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE, clock=time.time):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, Tuple[Dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token: str) -> Optional[Dict]:
+        """Cached claims for a token, or None if unknown or expired."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, claims: Dict) -> None:
+        """Remember verified claims; tokens without an exp are not cached."""
+        expires_at = claims.get("exp")
+        if not isinstance(expires_at, (int, float)) or expires_at <= self._clock():
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, float(expires_at))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+token_cache = VerifiedTokenCache()
+metrics.register_gauge("token_cache_size", lambda: len(token_cache))
+metrics.register_gauge("token_cache_hit_ratio", lambda: token_cache.hit_ratio)
@@ -0,0 +1,56 @@
+"""
+Latency benchmark for the in-memory lesson search index.
+
+Builds an index over a synthetic catalog (each lesson with a long story and
+reflection) and reports per-query latency percentiles for a few query shapes:
+exact terms, a prefix expansion and a miss.
+
+Usage (from api/):
+    python -m benchmarks.search_latency [--lessons 50] [--words 3000] [--queries 200]
+"""
+import argparse
+import statistics
+import time
+from types import SimpleNamespace
+
+from app.search import LessonSearchIndex
+
+QUERIES = ["resilience breath word42", "emot", "nothing-matches-this"]
+
+
+def build_index(lessons: int, words: int) -> LessonSearchIndex:
+    body = " ".join(f"word{i % 500} resilience breath emotion" for i in range(words))
+    index = LessonSearchIndex()
+    index.build(
+        SimpleNamespace(
+            id=i, title=f"Lesson {i}", slug=f"lesson-{i}", order=i, module_number=1,
+            story=body, reflection=body, challenge="", is_published=True,
+        )
+        for i in range(1, lessons + 1)
+    )
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure in-memory search latency.")
+    parser.add_argument("--lessons", type=int, default=50, help="Lessons in the catalog")
+    parser.add_argument("--words", type=int, default=3000, help="Repetitions of the filler phrase per field")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per query shape")
+    args = parser.parse_args()
+
+    index = build_index(args.lessons, args.words)
+    for query in QUERIES:
+        samples = []
+        for _ in range(args.queries):
+            started = time.perf_counter()
+            index.search(query)
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+        print(
+            f"{query!r:32} p50 {statistics.median(samples) * 1000:6.2f} ms  "
+            f"p99 {samples[int(len(samples) * 0.99) - 1] * 1000:6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
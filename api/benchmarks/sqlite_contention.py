@@ -0,0 +1,134 @@
+"""
+Write-contention benchmark for the SQLite production profile.
+
+Runs concurrent lesson completions (read-then-insert transactions, the same
+shape as POST /api/lessons/{id}/complete) alongside progress-style readers
+against a scratch SQLite file, once with a default engine and once with the
+production profile (WAL, busy_timeout and the single-writer queue), and
+reports throughput, latency and "database is locked" errors for each.
+
+Usage (from api/):
+    python -m benchmarks.sqlite_contention [--writers 32] [--readers 8] [--seconds 5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.crud import create_lesson_completion
+from app.models import Lesson, LessonCompletion, User
+from app.sqlite_profile import SerializedWriteSession, configure_sqlite_engine
+
+LESSONS = 40
+
+
+async def _seed(engine, users: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        session.add_all([
+            Lesson(slug=f"lesson-{i}", title=f"Lesson {i}", story="", reflection="", challenge="", quiz="[]", order=i)
+            for i in range(1, LESSONS + 1)
+        ])
+        session.add_all([
+            User(email=f"bench{i}@example.com", username=f"bench{i}", hashed_password="x")
+            for i in range(users)
+        ])
+        await session.commit()
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def _run(profile: bool, writers: int, readers: int, seconds: float) -> Dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}")
+        session_class = AsyncSession
+        if profile:
+            configure_sqlite_engine(engine)
+            session_class = SerializedWriteSession
+        await _seed(engine, writers)
+
+        write_latencies: List[float] = []
+        read_latencies: List[float] = []
+        errors = {"locked": 0}
+        deadline = time.perf_counter() + seconds
+
+        async def writer(user_id: int):
+            lesson_id = 1
+            while time.perf_counter() < deadline and lesson_id <= LESSONS:
+                started = time.perf_counter()
+                try:
+                    async with session_class(engine) as session:
+                        await create_lesson_completion(session, user_id, lesson_id)
+                except OperationalError as exc:
+                    if "locked" not in str(exc):
+                        raise
+                    errors["locked"] += 1
+                else:
+                    write_latencies.append(time.perf_counter() - started)
+                    lesson_id += 1
+
+        async def reader(user_id: int):
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    async with session_class(engine) as session:
+                        await session.scalar(
+                            select(func.count()).select_from(LessonCompletion).where(LessonCompletion.user_id == user_id)
+                        )
+                except OperationalError as exc:
+                    if "locked" not in str(exc):
+                        raise
+                    errors["locked"] += 1
+                else:
+                    read_latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *[writer(user_id) for user_id in range(1, writers + 1)],
+            *[reader(user_id % writers + 1) for user_id in range(readers)],
+        )
+        elapsed = time.perf_counter() - started
+        await engine.dispose()
+
+    return {
+        "writes_per_second": len(write_latencies) / elapsed,
+        "reads_per_second": len(read_latencies) / elapsed,
+        "write_p50_ms": statistics.median(write_latencies) * 1000 if write_latencies else 0.0,
+        "write_p99_ms": _percentile(write_latencies, 0.99) * 1000,
+        "read_p99_ms": _percentile(read_latencies, 0.99) * 1000,
+        "locked_errors": errors["locked"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SQLite write contention with and without the production profile.")
+    parser.add_argument("--writers", type=int, default=32, help="Concurrent users completing lessons")
+    parser.add_argument("--readers", type=int, default=8, help="Concurrent progress readers")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run")
+    args = parser.parse_args()
+
+    for label, profile in (("default", False), ("production", True)):
+        result = asyncio.run(_run(profile, args.writers, args.readers, args.seconds))
+        print(
+            f"{label:>10}: {result['writes_per_second']:8.1f} writes/s  {result['reads_per_second']:8.1f} reads/s  "
+            f"write p50 {result['write_p50_ms']:7.1f} ms  p99 {result['write_p99_ms']:7.1f} ms  "
+            f"read p99 {result['read_p99_ms']:7.1f} ms  locked errors {result['locked_errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
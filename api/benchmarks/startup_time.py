@@ -0,0 +1,75 @@
+"""
+Startup-time benchmark: create_all versus the migration-gated schema check.
+
+Each sample is a fresh Python process, as on a cold boot or a scale-to-zero
+restart, that runs the schema step of the application lifespan against an
+already migrated database: either `create_db_and_tables()` (the old startup)
+or `ensure_schema()` (one revision query). Reports the schema step and the
+whole process time, median and p95.
+
+Usage (from api/):
+    python -m benchmarks.startup_time [--samples 10] [--database-url URL]
+
+Without --database-url a scratch SQLite file is used; a PostgreSQL URL must
+already be at the Alembic head.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_SAMPLE = """
+import asyncio, sys, time
+from app.deps import create_db_and_tables, engine
+from app.migrations import ensure_schema
+
+async def run():
+    started = time.perf_counter()
+    if sys.argv[1] == "create_all":
+        await create_db_and_tables()
+    else:
+        await ensure_schema(engine)
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return elapsed
+
+print(asyncio.run(run()))
+"""
+
+
+def _sample(mode: str, database_url: str) -> tuple:
+    env = dict(os.environ, DATABASE_URL=database_url)
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", _SAMPLE, mode], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.split()[-1]) * 1000, (time.perf_counter() - started) * 1000
+
+
+def _p95(values):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare worker startup with create_all and with the Alembic head check.")
+    parser.add_argument("--samples", type=int, default=10, help="Processes started per mode")
+    parser.add_argument("--database-url", help="Database to start against (default: scratch SQLite file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(directory, 'startup.db')}"
+        _sample("ensure_schema", database_url)  # Bring a scratch database to head first
+        for mode in ("create_all", "ensure_schema"):
+            steps, totals = zip(*[_sample(mode, database_url) for _ in range(args.samples)])
+            print(
+                f"{mode:>13}: schema step median {statistics.median(steps):7.1f} ms  p95 {_p95(steps):7.1f} ms  "
+                f"process median {statistics.median(totals):7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
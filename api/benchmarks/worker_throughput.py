@@ -0,0 +1,139 @@
+"""
+Throughput benchmark for `python -m app.serve` at different worker counts.
+
+Seeds a scratch SQLite database with lessons, starts the production entry
+point with WEB_CONCURRENCY set to each worker count in turn, and drives it
+from several load-generator processes (so the client is not the bottleneck)
+for a fixed time. Reports requests per second and latency percentiles.
+
+Usage (from api/):
+    python -m benchmarks.worker_throughput [--workers 1 2 4 8] [--seconds 10]
+        [--path /api/lessons] [--clients 4] [--connections 32]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.crud import create_lesson
+from app.migrations import ensure_schema
+from app.schemas import LessonCreate
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LESSONS = 40
+
+
+async def _seed(database_url: str) -> None:
+    engine = create_async_engine(database_url)
+    await ensure_schema(engine, mode="upgrade")
+    async with AsyncSession(engine) as session:
+        for number in range(1, LESSONS + 1):
+            await create_lesson(session, LessonCreate(
+                slug=f"lesson-{number}", title=f"Lesson {number}", story="Story " * 200,
+                reflection="Reflect", challenge="Challenge", quiz="[]", order=number,
+            ))
+    await engine.dispose()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(url: str, timeout: float = 60.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise TimeoutError(f"Server at {url} did not start")
+
+
+async def _drive(url: str, connections: int, seconds: float) -> List[float]:
+    latencies: List[float] = []
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        async def loop():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(url)
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*[loop() for _ in range(connections)])
+    return latencies
+
+
+def _client_process(args) -> List[float]:
+    url, connections, seconds = args
+    return asyncio.run(_drive(url, connections, seconds))
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def run(workers: int, database_url: str, path: str, clients: int, connections: int, seconds: float) -> dict:
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, PORT=str(port), HOST="127.0.0.1", WEB_CONCURRENCY=str(workers))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve"], cwd=API_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        _wait_until_up(f"{base}/health")
+        _client_process((base + path, connections, 1.0))  # Warm every worker's caches
+        with multiprocessing.Pool(clients) as pool:
+            results = pool.map(_client_process, [(base + path, connections, seconds)] * clients)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+    latencies = [latency for result in results for latency in result]
+    return {
+        "requests_per_second": len(latencies) / seconds,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app.serve throughput at several worker counts.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts to try")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Load duration per worker count")
+    parser.add_argument("--path", default="/api/lessons", help="Endpoint to request")
+    parser.add_argument("--clients", type=int, default=4, help="Load-generator processes")
+    parser.add_argument("--connections", type=int, default=32, help="Concurrent connections per client")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        asyncio.run(_seed(database_url))
+        print(f"{os.cpu_count()} CPUs, GET {args.path}, {args.clients}x{args.connections} connections")
+        for workers in args.workers:
+            result = run(workers, database_url, args.path, args.clients, args.connections, args.seconds)
+            print(
+                f"{workers:>2} workers: {result['requests_per_second']:8.1f} req/s  "
+                f"p50 {result['p50_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.deps import engine
 from app.models import Lesson
+from app.crud import compile_all_lessons
 
 async def add_module3_lessons():
     """Add all Module 3: Cognitive Flexibility lessons"""
@@ -421,6 +422,11 @@ async def seed_all_lessons():
     # Add Module 3 lessons
     added = await add_module3_lessons()
     
+    # Pre-compile lesson markdown so the API never parses it on read
+    async with AsyncSession(engine) as session:
+        compiled = await compile_all_lessons(session)
+        print(f"✅ Compiled content for {compiled} lessons")
+    
     # Verify final structure
     async with AsyncSession(engine) as session:
         result = await session.execute(text("SELECT COUNT(*) FROM lesson"))
@@ -10,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from app.deps import engine
 from app.models import Lesson
+from app.crud import compile_all_lessons
 
 # Load environment variables
 load_dotenv()
@@ -300,6 +301,10 @@ async def seed_lessons():
         
         await session.commit()
         print(f"Successfully seeded {len(SAMPLE_LESSONS)} lessons.")
+        
+        # Pre-compile lesson markdown so the API never parses it on read
+        compiled = await compile_all_lessons(session)
+        print(f"Compiled content for {compiled} lessons.")
 
 
 if __name__ == "__main__":
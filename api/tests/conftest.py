@@ -0,0 +1,82 @@
+"""
+Shared test fixtures.
+
+Points the app at a throwaway SQLite database before it is imported, so tests
+never touch the development database.
+"""
+import asyncio
+import os
+import tempfile
+
+_TEST_DB_DIR = tempfile.mkdtemp(prefix="resilient-mastery-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_TEST_DB_DIR}/test.db")
+# Minimum bcrypt cost keeps password hashing from dominating test time
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# One process; the bus is exercised directly in test_invalidation.py
+os.environ.setdefault("CACHE_INVALIDATION", "off")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import SQLModel
+
+from app.analytics import cohort_cache
+from app.content_version import content_version
+from app.deps import engine
+from app.main import app
+from app.models import User, UserRole
+from app.ratelimit import login_rate_limiter
+from app.response_cache import guest_lessons_cache
+from app.token_cache import token_cache
+
+
+async def _reset_database():
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+
+@pytest.fixture
+def client():
+    """Test client backed by a freshly created database."""
+    asyncio.run(_reset_database())
+    login_rate_limiter.clear()
+    token_cache.clear()
+    guest_lessons_cache.clear()
+    content_version.reset()
+    cohort_cache.clear()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+class FakeClock:
+    """A clock callable that only moves when a test sets or advances `now`."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def admin_token(client):
+    """Access token of a registered user "admin" (password "secret123") with the admin role."""
+    client.post(
+        "/api/auth/register",
+        json={"email": "admin@example.com", "username": "admin", "password": "secret123"},
+    )
+
+    async def _promote():
+        async with AsyncSession(engine) as session:
+            await session.execute(update(User).where(User.username == "admin").values(role=UserRole.ADMIN))
+            await session.commit()
+
+    asyncio.run(_promote())
+    return client.post("/api/auth/login", json={"username": "admin", "password": "secret123"}).json()["access_token"]
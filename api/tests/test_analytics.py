@@ -0,0 +1,166 @@
+"""
+Tests for the incremental lesson funnel rollup.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.analytics import GAP_BUCKETS, _cursor_position, get_lesson_funnel, histogram_median, refresh_lesson_funnel
+from app.deps import engine
+from app.models import Lesson, LessonCompletion, RollupCursor, User, UserRole
+
+START = datetime.utcnow() - timedelta(days=2)
+
+
+def _register(client, username):
+    client.post(
+        "/api/auth/register",
+        json={"email": f"{username}@example.com", "username": username, "password": "secret123"},
+    )
+
+
+async def _seed_lessons():
+    async with AsyncSession(engine) as session:
+        for order in (1, 2, 3):
+            session.add(Lesson(
+                slug=f"lesson-{order}", title=f"Lesson {order}", story="", reflection="",
+                challenge="", quiz="[]", order=order, module_number=1, is_published=True,
+            ))
+        await session.commit()
+        result = await session.execute(select(Lesson.id).order_by(Lesson.order))
+        return result.scalars().all()
+
+
+async def _complete(username, lesson_id, at):
+    async with AsyncSession(engine) as session:
+        user_id = (await session.execute(select(User.id).where(User.username == username))).scalar_one()
+        session.add(LessonCompletion(user_id=user_id, lesson_id=lesson_id, completed_at=at))
+        await session.commit()
+
+
+async def _refresh(**kwargs):
+    async with AsyncSession(engine) as session:
+        return await refresh_lesson_funnel(session, **kwargs)
+
+
+def test_histogram_median_interpolates_within_the_bucket():
+    histogram = [0] * (len(GAP_BUCKETS) + 1)
+    assert histogram_median(histogram) is None
+    histogram[1] = 2  # Two gaps between one and five minutes
+    assert histogram_median(histogram) == 180
+    histogram[-1] = 10  # Mostly beyond the last bound: report the bound
+    assert histogram_median(histogram) == GAP_BUCKETS[-1]
+
+
+def test_funnel_reports_reach_drop_off_and_median_gap(client, admin_token):
+    for username in ("ana", "ben", "cy"):
+        _register(client, username)
+
+    async def _setup():
+        first, second, third = await _seed_lessons()
+        for username, lessons in (("ana", [first, second, third]), ("ben", [first, second]), ("cy", [first])):
+            for step, lesson_id in enumerate(lessons):
+                await _complete(username, lesson_id, START + timedelta(hours=2 * step))
+
+    asyncio.run(_setup())
+    response = client.get("/api/admin/analytics/lessons", headers={"Authorization": f"Bearer {admin_token}"})
+
+    assert response.status_code == 200
+    funnel = response.json()
+    assert [(row["reach"], row["completions"], row["drop_off"]) for row in funnel] == [(4, 3, 1), (3, 2, 1), (2, 1, 1)]
+    assert funnel[0]["median_seconds_since_previous"] is None
+    # Two hours between completions falls in the one-to-three-hour bucket
+    assert 3600 <= funnel[1]["median_seconds_since_previous"] <= 3 * 3600
+
+    learner = client.post("/api/auth/login", json={"username": "ana", "password": "secret123"}).json()["access_token"]
+    assert client.get("/api/admin/analytics/lessons", headers={"Authorization": f"Bearer {learner}"}).status_code == 403
+
+
+def test_refresh_is_incremental_and_counts_each_completion_once(client):
+    for username in ("ana", "ben"):
+        _register(client, username)
+
+    async def _run():
+        first, second, _ = await _seed_lessons()
+        await _complete("ana", first, START)
+        await _complete("ben", first, START)
+        # Small batches: ana's second completion needs her first from an earlier batch for its gap
+        assert await _refresh(batch_size=1) == 2
+
+        await _complete("ana", second, START + timedelta(minutes=10))
+        await _complete("ana", second, START + timedelta(minutes=20))  # Repeat: not a new completion
+        await _complete("ben", second, datetime.utcnow())  # Not settled yet
+        position = await _refresh(batch_size=1)
+        assert await _refresh() == position
+
+        async with AsyncSession(engine) as session:
+            cursor = await session.get(RollupCursor, "lesson_funnel")
+            return cursor.last_id, await get_lesson_funnel(session)
+
+    last_id, funnel = asyncio.run(_run())
+    assert last_id == 4
+    assert [row["completions"] for row in funnel] == [2, 1, 0]
+    assert 5 * 60 <= funnel[1]["median_seconds_since_previous"] <= 15 * 60
+
+
+def test_cursor_created_by_a_concurrent_refresh_is_read_back(client):
+    class RacingSession(AsyncSession):
+        """Another refresh creates the cursor right after this session looked for it."""
+        raced = False
+
+        async def execute(self, statement, *args, **kwargs):
+            result = await super().execute(statement, *args, **kwargs)
+            if not self.raced:
+                self.raced = True
+                async with AsyncSession(engine) as other:
+                    other.add(RollupCursor(name="lesson_funnel", last_id=7))
+                    await other.commit()
+            return result
+
+    async def _run():
+        async with RacingSession(engine) as session:
+            return await _cursor_position(session, "lesson_funnel")
+
+    assert asyncio.run(_run()) == 7
+
+
+SIGNUP = datetime.utcnow() - timedelta(days=20)
+
+
+def test_cohort_matrix_counts_module_completions_by_signup_week(client, admin_token):
+    for username in ("ana", "ben"):
+        _register(client, username)
+
+    async def _setup():
+        lesson_ids = await _seed_lessons()  # Module 1 has three lessons
+        signup = SIGNUP
+        async with AsyncSession(engine) as session:
+            await session.execute(update(User).values(created_at=signup))
+            await session.commit()
+        for step, lesson_id in enumerate(lesson_ids):
+            await _complete("ana", lesson_id, signup + timedelta(days=8 + step))
+        await _complete("ben", lesson_ids[0], signup + timedelta(days=1))
+
+    asyncio.run(_setup())
+    response = client.get("/api/admin/analytics/cohorts", headers={"Authorization": f"Bearer {admin_token}"})
+
+    assert response.status_code == 200
+    matrix = response.json()
+    assert len(matrix["cohorts"]) == 1
+    cohort = matrix["cohorts"][0]
+    assert cohort["cohort_week"] == (SIGNUP.date() - timedelta(days=SIGNUP.weekday())).isoformat()
+    assert cohort["users"] == 3
+    module_one = cohort["modules"][0]
+    # Ana finished module 1 ten days after signing up: counted from week 1 on
+    assert module_one["completed"][:3] == [0, 1, 1]
+    assert module_one["completion_rates"][1] == 1 / 3
+    # Nobody finished other modules, and the cohort has not reached its last weeks
+    assert all(module["completed"][0] == 0 for module in cohort["modules"][1:])
+    assert module_one["completed"][-1] is None
+
+    # Served from the cache until it expires
+    asyncio.run(_complete("ben", 2, datetime.utcnow() - timedelta(minutes=1)))
+    again = client.get("/api/admin/analytics/cohorts", headers={"Authorization": f"Bearer {admin_token}"}).json()
+    assert again["generated_at"] == matrix["generated_at"]
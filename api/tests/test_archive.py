@@ -0,0 +1,122 @@
+"""
+Tests for completion partition helpers and archival.
+"""
+import asyncio
+import os
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import func, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import select
+
+from app.archive_completions import archive_completions, read_archive
+from app.crud import create_lesson, get_total_lesson_completions
+from app.deps import engine
+from app.models import ArchivedProgress, LessonCompletion
+from app.partitions import add_months, create_partition_sql, ensure_partitions, existing_partitions, partition_name
+from app.schemas import LessonCreate
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+def test_partition_naming_and_bounds():
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partition_name(date(2026, 3, 1)) == "lessoncompletion_p202603"
+    assert create_partition_sql(date(2026, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS lessoncompletion_p202612 PARTITION OF lessoncompletion "
+        "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+    )
+
+
+@pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+def test_ensure_partitions_keeps_going_after_a_conflicting_month():
+    now = datetime(2026, 10, 19, 12, 0)
+
+    async def _run():
+        pg_engine = create_async_engine(TEST_POSTGRES_URL)
+        try:
+            async with pg_engine.begin() as conn:
+                await conn.execute(text("DROP TABLE IF EXISTS lessoncompletion CASCADE"))
+                await conn.execute(text(
+                    "CREATE TABLE lessoncompletion (id INTEGER NOT NULL, completed_at TIMESTAMP NOT NULL) "
+                    "PARTITION BY RANGE (completed_at)"
+                ))
+                await conn.execute(text("CREATE TABLE lessoncompletion_default PARTITION OF lessoncompletion DEFAULT"))
+                # A row for this month in DEFAULT makes creating this month's partition fail
+                await conn.execute(text("INSERT INTO lessoncompletion VALUES (1, :now)"), {"now": now})
+            async with pg_engine.begin() as conn:
+                created = await ensure_partitions(conn, now=now, months_ahead=2)
+            async with pg_engine.connect() as conn:
+                return created, await existing_partitions(conn)
+        finally:
+            async with pg_engine.begin() as conn:
+                await conn.execute(text("DROP TABLE IF EXISTS lessoncompletion CASCADE"))
+            await pg_engine.dispose()
+
+    created, partitions = asyncio.run(_run())
+    assert created == ["lessoncompletion_p202611", "lessoncompletion_p202612"]
+    assert partitions == ["lessoncompletion_default", "lessoncompletion_p202611", "lessoncompletion_p202612"]
+
+
+def _setup(client):
+    client.post(
+        "/api/auth/register",
+        json={"email": "archive@example.com", "username": "archive", "password": "secret123"},
+    )
+    token = client.post(
+        "/api/auth/login", json={"username": "archive", "password": "secret123"}
+    ).json()["access_token"]
+
+    async def _seed():
+        async with AsyncSession(engine) as session:
+            lesson_ids = []
+            for order in range(1, 4):
+                lesson = await create_lesson(session, LessonCreate(
+                    slug=f"lesson-{order}", title=f"Lesson {order}", story="", reflection="",
+                    challenge="", quiz="[]", order=order,
+                ))
+                lesson_ids.append(lesson.id)
+            await session.execute(insert(LessonCompletion), [
+                {"user_id": 1, "lesson_id": lesson_ids[0], "completed_at": datetime(2024, 1, 5, 9, 30)},
+                {"user_id": 1, "lesson_id": lesson_ids[1], "completed_at": datetime(2024, 2, 20, 18, 0)},
+                {"user_id": 1, "lesson_id": lesson_ids[2], "completed_at": datetime(2026, 9, 1, 12, 0)},
+            ])
+            await session.commit()
+            return lesson_ids
+
+    return {"Authorization": f"Bearer {token}"}, asyncio.run(_seed())
+
+
+async def _counts():
+    async with AsyncSession(engine) as session:
+        live = (await session.execute(select(func.count(LessonCompletion.id)))).scalar()
+        archived = (await session.execute(select(func.count()).select_from(ArchivedProgress))).scalar()
+        total = await get_total_lesson_completions(session)
+        return live, archived, total
+
+
+def test_archival_moves_rows_and_keeps_progress(client, tmp_path):
+    headers, lesson_ids = _setup(client)
+    progress_before = client.get("/api/progress", headers=headers).json()
+    lessons_before = client.get("/api/lessons", headers=headers).json()
+
+    archived = asyncio.run(archive_completions(str(tmp_path), datetime(2025, 1, 1), engine))
+
+    assert [(item.month, item.rows) for item in archived] == [(date(2024, 1, 1), 1), (date(2024, 2, 1), 1)]
+    rows = read_archive(archived[0].path)
+    assert rows == [{"id": 1, "user_id": 1, "lesson_id": lesson_ids[0], "completed_at": "2024-01-05T09:30:00"}]
+    assert asyncio.run(_counts()) == (1, 2, 3)
+
+    # Progress, unlock state and completion flags are unchanged
+    assert client.get("/api/progress", headers=headers).json() == progress_before
+    assert client.get("/api/lessons", headers=headers).json() == lessons_before
+
+    # Completing an archived lesson again reports the original completion
+    again = client.post(f"/api/lessons/{lesson_ids[0]}/complete", headers=headers).json()
+    assert again["id"] == 1 and again["completed_at"].startswith("2024-01-05")
+    assert asyncio.run(_counts()) == (1, 2, 3)
+
+    # Nothing left to archive on a second run
+    assert asyncio.run(archive_completions(str(tmp_path), datetime(2025, 1, 1), engine)) == []
@@ -0,0 +1,83 @@
+"""
+Tests for write-time lesson content compilation.
+"""
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.content import compile_section, content_hash, render_inline
+from app.crud import create_lesson
+from app.deps import engine
+from app.schemas import LessonCreate
+
+LESSON_MARKDOWN = """# The Red Line Meeting
+
+Some **bold** intro <script>alert(1)</script>.
+
+Body sensation: [text: Be specific]
+
+☐ I commit to one 4-4-4 breath next time
+□ Tight chest □ Clenched jaw
+
+<ei-compass></ei-compass>
+
+1. First
+2. Second
+"""
+
+
+def test_compile_section_builds_block_ast():
+    """Interactive markers become structured blocks."""
+    blocks = compile_section(LESSON_MARKDOWN)["blocks"]
+    types = [block["type"] for block in blocks]
+    assert types == ["heading", "paragraph", "fields", "checklist", "component", "list"]
+
+    fields = blocks[2]["parts"]
+    assert fields[0] == {"text": "Body sensation: "}
+    assert fields[1] == {"field": "text", "placeholder": "Be specific"}
+
+    labels = [item["label"] for item in blocks[3]["items"]]
+    assert labels == ["I commit to one 4-4-4 breath next time", "Tight chest", "Clenched jaw"]
+    assert blocks[4]["name"] == "ei-compass"
+
+
+def test_compile_section_sanitizes_html():
+    """Raw HTML and unsafe links never reach the compiled output."""
+    html = compile_section(LESSON_MARKDOWN + "\n[click](javascript:alert(1))")["html"]
+    assert "<script>" not in html
+    assert "&lt;script&gt;" in html
+    assert 'href="javascript' not in html
+    assert "<strong>bold</strong>" in html
+
+
+def test_emphasis_is_not_applied_inside_links():
+    html = render_inline("[guide](https://example.com/_x_/page) and _this_ [**now**](/next)")
+    assert 'href="https://example.com/_x_/page"' in html
+    assert "<em>this</em>" in html
+    assert '<a href="/next" rel="noopener noreferrer"><strong>now</strong></a>' in html
+
+
+def test_stray_and_forged_stash_markers_are_dropped():
+    assert render_inline("a \x00 b") == "a  b"
+    assert render_inline("a \x005\x00 b") == "a 5 b"
+    assert render_inline("\x000\x00[`x`](/y)") == '0<a href="/y" rel="noopener noreferrer"><code>x</code></a>'
+
+
+def test_compiled_endpoint_serves_stored_sections(client):
+    """Lessons are compiled at write time and served by content hash."""
+    async def _create():
+        async with AsyncSession(engine) as session:
+            lesson = await create_lesson(session, LessonCreate(
+                slug="red-line", title="The Red Line Meeting", story=LESSON_MARKDOWN,
+                reflection="Reflect: [textarea: Describe it]", challenge="", quiz="[]",
+            ))
+            return lesson.id
+
+    lesson_id = asyncio.run(_create())
+    response = client.get(f"/api/lessons/{lesson_id}/compiled")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["sections"]["story"]["content_hash"] == content_hash(LESSON_MARKDOWN)
+    assert data["sections"]["reflection"]["blocks"][0]["type"] == "fields"
+
+    assert client.get("/api/lessons/9999/compiled").status_code == 404
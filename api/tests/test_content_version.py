@@ -0,0 +1,109 @@
+"""
+Tests for the trigger-maintained content version.
+"""
+import asyncio
+import sqlite3
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.content_version import ContentVersionWatcher, content_version, read_content_version
+from app.crud import create_lesson, get_content_version
+from app.deps import engine
+from app.metrics import metrics
+from app.schemas import LessonCreate
+from app.search import search_index
+
+
+def _script_connection():
+    """A connection of the kind deploy scripts open, bypassing the API."""
+    return sqlite3.connect(engine.url.database)
+
+
+def _read_version():
+    async def _read():
+        async with AsyncSession(engine) as session:
+            return await read_content_version(session)
+    return asyncio.run(_read())
+
+
+def test_trigger_bumps_version_on_out_of_band_writes(client):
+    before = _read_version()
+    epoch, counter = before.split(".")
+
+    with _script_connection() as conn:
+        conn.execute(
+            "INSERT INTO lesson (slug, title, story, reflection, challenge, quiz, \"order\", module_number, "
+            "is_published, created_at, updated_at) VALUES ('script', 'Script', '', '', '', '[]', 1, 1, 1, "
+            "CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+        )
+        conn.execute("UPDATE lesson SET title = 'Script lesson' WHERE slug = 'script'")
+        conn.execute("DELETE FROM lesson WHERE slug = 'script'")
+
+    assert _read_version() == f"{epoch}.{int(counter) + 3}"
+
+
+def test_watcher_reads_the_row_at_most_once_per_interval(client, fake_clock):
+    watcher = ContentVersionWatcher(interval=1.0, clock=fake_clock)
+    reads = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM contentversion" in statement:
+            reads.append(statement)
+
+    async def _current():
+        async with AsyncSession(engine) as session:
+            return await watcher.current(session)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        first = asyncio.run(_current())
+        fake_clock.now += 0.5
+        assert asyncio.run(_current()) == first
+        assert len(reads) == 1
+        fake_clock.now += 1.0
+        asyncio.run(_current())
+        assert len(reads) == 2
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+def test_out_of_band_write_refreshes_guest_list_and_search(client):
+    first = client.get("/api/lessons")
+    assert first.json() == []
+
+    with _script_connection() as conn:
+        conn.execute(
+            "INSERT INTO lesson (slug, title, story, reflection, challenge, quiz, \"order\", module_number, "
+            "is_published, created_at, updated_at) VALUES ('deployed', 'Deployed', 'Box breathing steadies you.', "
+            "'', '', '[]', 1, 1, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+        )
+    content_version.expire()  # As if the check interval had passed
+
+    second = client.get("/api/lessons")
+    assert [lesson["slug"] for lesson in second.json()] == ["deployed"]
+    assert second.headers["etag"] != first.headers["etag"]
+
+    started = time.perf_counter()
+    while not search_index.search("breathing") and time.perf_counter() - started < 1:
+        client.get("/health")  # Let the background rebuild run
+    assert search_index.search("breathing")[0]["slug"] == "deployed"
+
+
+def test_api_writes_do_not_trigger_a_rebuild(client):
+    changes = metrics.get("content_version_changes_total")
+
+    async def _write_and_read():
+        async with AsyncSession(engine) as session:
+            before = await get_content_version(session)
+            await create_lesson(session, LessonCreate(
+                slug="api", title="API", story="", reflection="", challenge="", quiz="[]",
+            ))
+            after = await get_content_version(session)
+            return before, after
+
+    before, after = asyncio.run(_write_and_read())
+    assert before != after
+    assert after == _read_version()
+    assert metrics.get("content_version_changes_total") == changes
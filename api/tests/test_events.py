@@ -0,0 +1,128 @@
+"""
+Tests for the learning event log and its batched writer.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import events
+from app.deps import engine
+from app.events import EventWriter, event_writer
+from app.metrics import metrics
+from app.models import LearningEvent
+
+
+def _token(client):
+    client.post(
+        "/api/auth/register",
+        json={"email": "ana@example.com", "username": "ana", "password": "secret123"},
+    )
+    return client.post("/api/auth/login", json={"username": "ana", "password": "secret123"}).json()["access_token"]
+
+
+async def _stored_events():
+    async with AsyncSession(engine) as session:
+        result = await session.execute(select(LearningEvent).order_by(LearningEvent.id))
+        return result.scalars().all()
+
+
+def _row(event_type="lesson_view", lesson_id=1):
+    now = datetime.utcnow()
+    return (1, event_type, lesson_id, "{}", now, now)
+
+
+def test_posted_events_are_written_in_the_background(client):
+    token = _token(client)
+    occurred_at = (datetime.now(timezone.utc) - timedelta(hours=1)).astimezone(timezone(timedelta(hours=2)))
+    response = client.post("/api/events", headers={"Authorization": f"Bearer {token}"}, json={"events": [
+        {"event_type": "lesson_view", "lesson_id": 1},
+        {"event_type": "section_switch", "lesson_id": 1, "data": {"section": "story"}},
+        {"event_type": "quiz_attempt", "lesson_id": 1, "data": {"score": 3, "total": 5},
+         "occurred_at": occurred_at.isoformat()},
+    ]})
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 3}
+
+    started = time.perf_counter()
+    events = asyncio.run(_stored_events())
+    while len(events) < 3 and time.perf_counter() - started < 2:
+        time.sleep(0.05)
+        events = asyncio.run(_stored_events())
+    assert [event.event_type for event in events] == ["lesson_view", "section_switch", "quiz_attempt"]
+    assert events[1].data == '{"section":"story"}'
+    assert events[2].occurred_at == occurred_at.astimezone(timezone.utc).replace(tzinfo=None)  # Stored as UTC
+
+
+def test_events_are_validated_and_refused_when_the_buffer_is_full(client, monkeypatch):
+    assert client.post("/api/events", json={"events": [{"event_type": "lesson_view"}]}).status_code == 403
+    headers = {"Authorization": f"Bearer {_token(client)}"}
+    assert client.post("/api/events", headers=headers, json={"events": [{"event_type": "scroll"}]}).status_code == 422
+    assert client.post("/api/events", headers=headers, json={"events": []}).status_code == 422
+    for event in (
+        {"event_type": "lesson_view", "lesson_id": 10**20},
+        {"event_type": "lesson_view", "lesson_id": 0},
+        {"event_type": "lesson_view", "occurred_at": "1970-01-01T00:00:00"},
+        {"event_type": "lesson_view", "occurred_at": (datetime.utcnow() + timedelta(days=1)).isoformat()},
+    ):
+        assert client.post("/api/events", headers=headers, json={"events": [event]}).status_code == 422
+
+    monkeypatch.setattr(event_writer, "max_buffered", 0)
+    response = client.post("/api/events", headers=headers, json={"events": [{"event_type": "lesson_view"}]})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_writer_flushes_by_size_and_on_shutdown(client):
+    async def _run():
+        writer = EventWriter(flush_interval=60, flush_size=2, max_buffered=3)
+        writer.start(engine)
+        assert writer.submit([_row(), _row()])
+        assert not writer.submit([_row(), _row()])  # Would exceed the bound
+        started = time.perf_counter()
+        while len(await _stored_events()) < 2 and time.perf_counter() - started < 2:
+            await asyncio.sleep(0.01)
+        assert len(await _stored_events()) == 2  # Size-triggered, long before the timer
+
+        assert writer.submit([_row("quiz_attempt")])
+        await writer.stop(engine)
+        assert len(writer) == 0
+        async with AsyncSession(engine) as session:
+            return (await session.execute(select(func.count(LearningEvent.id)))).scalar()
+
+    assert asyncio.run(_run()) == 3
+
+
+def test_rows_the_database_refuses_are_dropped_without_blocking_the_rest(client):
+    async def _run():
+        writer = EventWriter(flush_interval=60, flush_size=10, max_buffered=100)
+        # Past the schema checks (e.g. an older client build): too large for the column
+        assert writer.submit([_row(), _row(lesson_id=10**20), _row("quiz_attempt"), _row("section_switch")])
+        written = await writer.flush(engine)
+        assert writer.submit([_row("quiz_attempt")])
+        return written, await writer.flush(engine), len(writer)
+
+    before = metrics.get("learning_events_dropped_total", reason="invalid")
+    assert asyncio.run(_run()) == (3, 1, 0)
+    stored = asyncio.run(_stored_events())
+    assert [event.event_type for event in stored] == ["lesson_view", "quiz_attempt", "section_switch", "quiz_attempt"]
+    assert metrics.get("learning_events_dropped_total", reason="invalid") == before + 1
+
+
+def test_unreachable_database_keeps_events_for_the_next_flush(client, monkeypatch):
+    async def _unreachable(engine, rows):
+        raise ConnectionRefusedError("database is restarting")
+
+    async def _run():
+        writer = EventWriter(flush_interval=60, flush_size=2, max_buffered=10)
+        assert writer.submit([_row(), _row(), _row()])
+        monkeypatch.setattr(events, "write_events", _unreachable)
+        assert await writer.flush(engine) == 0
+        assert len(writer) == 3
+        monkeypatch.undo()
+        return await writer.flush(engine)
+
+    assert asyncio.run(_run()) == 3
+    assert len(asyncio.run(_stored_events())) == 3
@@ -0,0 +1,37 @@
+"""
+Tests for the static content export.
+"""
+import asyncio
+import gzip
+import json
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import create_lesson
+from app.deps import engine
+from app.export import export_content
+from app.schemas import LessonCreate
+
+
+def test_export_matches_api_responses(client, tmp_path):
+    async def _seed():
+        async with AsyncSession(engine) as session:
+            for order, slug in enumerate(("breath", "label", "reset"), start=1):
+                await create_lesson(session, LessonCreate(
+                    slug=slug, title=slug.title(), story=f"# {slug}\n\n**Story** ☐ item",
+                    reflection="", challenge="", quiz="[]", order=order,
+                ))
+
+    asyncio.run(_seed())
+    summary = asyncio.run(export_content(str(tmp_path)))
+    assert summary["lessons"] == 3
+
+    routing = json.loads((tmp_path / "routes.json").read_text())
+    assert set(routing["guest_routes"]) == {"/api/lessons"}
+    for route, path in {**routing["routes"], **routing["guest_routes"]}.items():
+        exported = (tmp_path / path.lstrip("/")).read_bytes()
+        assert gzip.decompress((tmp_path / (path.lstrip("/") + ".gz")).read_bytes()) == exported
+        assert json.loads(exported) == client.get(route).json(), route
+
+    nginx = (tmp_path / "nginx-routes.conf").read_text()
+    assert '"/api/lessons:"' in nginx
@@ -0,0 +1,106 @@
+"""
+Tests for the cached guest lesson list.
+"""
+import asyncio
+import json
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import create_lesson, update_lesson
+from app.deps import engine
+from app.response_cache import accepts_gzip, guest_lessons_cache
+from app.schemas import LessonCreate, LessonUpdate
+
+
+def _seed():
+    async def _create():
+        async with AsyncSession(engine) as session:
+            ids = []
+            for order, slug in enumerate(("breath", "label", "reset"), start=1):
+                lesson = await create_lesson(session, LessonCreate(
+                    slug=slug, title=slug.title(), story="", reflection="",
+                    challenge="", quiz="[]", order=order,
+                ))
+                ids.append(lesson.id)
+            return ids
+    return asyncio.run(_create())
+
+
+def _count_lesson_queries(client, **kwargs):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM lesson " in statement and "count(" not in statement:
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        response = client.get("/api/lessons", **kwargs)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    return response, len(statements)
+
+
+def test_guest_list_is_cached_and_compressed(client):
+    lesson_ids = _seed()
+
+    first, queries = _count_lesson_queries(client)
+    assert queries == 1
+    lessons = first.json()
+    assert [lesson["is_unlocked"] for lesson in lessons] == [True, True, False]
+    assert not any(lesson["is_completed"] for lesson in lessons)
+    assert first.headers["cache-control"].startswith("public")
+    assert "Authorization" in first.headers["vary"]
+
+    # Served from cache: no lesson rows are read again
+    second, queries = _count_lesson_queries(client)
+    assert queries == 0
+    assert second.content == first.content
+    assert second.headers["content-encoding"] == "gzip"
+
+    raw = client.get("/api/lessons", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    assert json.loads(raw.content) == lessons
+
+    etag = first.headers["etag"]
+    not_modified = client.get("/api/lessons", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+
+    # A lesson edit changes the content version and the cached body
+    async def _rename():
+        async with AsyncSession(engine) as session:
+            await update_lesson(session, lesson_ids[0], LessonUpdate(title="Box Breathing"))
+    asyncio.run(_rename())
+
+    changed = client.get("/api/lessons", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()[0]["title"] == "Box Breathing"
+
+
+def test_only_the_default_page_is_cached(client):
+    _seed()
+    client.get("/api/lessons")
+    assert len(guest_lessons_cache) == 1
+
+    for skip in range(40):
+        response = client.get(f"/api/lessons?skip={skip}&limit=1")
+        assert response.status_code == 200
+    assert client.get("/api/lessons?skip=1&limit=1").json()[0]["slug"] == "label"
+    assert len(guest_lessons_cache) == 1
+
+    cached, queries = _count_lesson_queries(client)
+    assert queries == 0
+    assert [lesson["slug"] for lesson in cached.json()] == ["breath", "label", "reset"]
+
+
+def test_accept_encoding_is_parsed():
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("br;q=1.0, GZIP;q=0.5")
+    assert accepts_gzip("br, *")
+    assert not accepts_gzip(None)
+    assert not accepts_gzip("identity")
+    assert not accepts_gzip("gzip;q=0")
+    assert not accepts_gzip("*;q=0")
+    assert not accepts_gzip("br, *;q=0.5, gzip;q=0")
+    assert not accepts_gzip("x-nogzip")
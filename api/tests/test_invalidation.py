@@ -0,0 +1,104 @@
+"""
+Tests for cross-worker cache invalidation.
+"""
+import asyncio
+import time
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.content_version import content_version
+from app.crud import create_lesson, get_content_version, update_lesson
+from app.deps import engine
+from app.invalidation import invalidation_bus
+from app.metrics import metrics
+from app.models import CacheInvalidation, User, UserRole
+from app.schemas import LessonCreate, LessonUpdate
+from app.search import search_index
+from app.token_cache import token_cache
+
+
+def test_lesson_write_reaches_another_worker_within_a_second(client):
+    async def _run():
+        poller = asyncio.create_task(invalidation_bus._poll(engine, interval=0.01))
+        await asyncio.sleep(0.05)  # Let the poller record where it starts
+        async with AsyncSession(engine) as session:
+            lesson = await create_lesson(session, LessonCreate(
+                slug="grounding", title="Grounding", story="Name five things you can see.",
+                reflection="", challenge="", quiz="[]",
+            ))
+            lesson_id = lesson.id
+            await update_lesson(session, lesson_id, LessonUpdate(story="Name five colours you can see."))
+            # Play a worker that did not handle the writes: only the bus can re-index
+            search_index.remove(lesson_id)
+
+        started = time.perf_counter()
+        while not search_index.search("colours") and time.perf_counter() - started < 1:
+            await asyncio.sleep(0.01)
+        poller.cancel()
+        return time.perf_counter() - started
+
+    assert asyncio.run(_run()) < 1
+    assert search_index.search("colours")[0]["slug"] == "grounding"
+
+
+def test_peer_lesson_write_is_applied_without_a_full_rebuild(client):
+    changes = metrics.get("content_version_changes_total")
+
+    async def _run():
+        async with AsyncSession(engine) as session:
+            before = await get_content_version(session)
+            lesson = await create_lesson(session, LessonCreate(
+                slug="grounding", title="Grounding", story="Name five things you can see.",
+                reflection="", challenge="", quiz="[]",
+            ))
+            lesson_id = lesson.id
+            keys = (await session.execute(select(CacheInvalidation.key))).scalars().all()
+
+        # Play a worker that did not handle the write
+        content_version.reset()
+        content_version.set(before)
+        search_index.remove(lesson_id)
+        for key in keys:
+            await invalidation_bus.dispatch(key)
+        content_version.expire()
+        async with AsyncSession(engine) as session:
+            return keys, before, await get_content_version(session)
+
+    keys, before, after = asyncio.run(_run())
+    assert keys == [f"lesson:1@{after}"]
+    assert after != before
+    assert search_index.search("five")[0]["slug"] == "grounding"
+    assert metrics.get("content_version_changes_total") == changes
+
+
+def test_deactivation_applies_to_cached_tokens_without_a_message(client, admin_token):
+    """Cached claims only say who the token is for; the user row is read on every request."""
+    client.post(
+        "/api/auth/register",
+        json={"email": "learner@example.com", "username": "learner", "password": "secret123"},
+    )
+
+    async def _learner_id():
+        async with AsyncSession(engine) as session:
+            return (await session.execute(select(User.id).where(User.username == "learner"))).scalar_one()
+
+    learner_id = asyncio.run(_learner_id())
+    learner_token = client.post("/api/auth/login", json={"username": "learner", "password": "secret123"}).json()["access_token"]
+    learner = {"Authorization": f"Bearer {learner_token}"}
+    assert client.get("/api/auth/me", headers=learner).status_code == 200
+    assert token_cache.get(learner_token) is not None
+
+    response = client.put(
+        f"/api/admin/users/{learner_id}",
+        json={"is_active": False},
+        headers={"Authorization": f"Bearer {admin_token}"},
+    )
+    assert response.status_code == 200
+
+    async def _messages():
+        async with AsyncSession(engine) as session:
+            return (await session.execute(select(CacheInvalidation.key))).scalars().all()
+
+    assert not [key for key in asyncio.run(_messages()) if key.startswith("user:")]
+    assert client.post("/api/lessons/1/complete", headers=learner).status_code == 400
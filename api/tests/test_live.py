@@ -0,0 +1,109 @@
+"""
+Tests for the live admin dashboard stream.
+"""
+import asyncio
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import create_lesson, create_lesson_completion, create_user
+from app.deps import engine
+from app.live import announce_counters, decode_deltas, encode_deltas, live_counters
+from app.models import User, UserRole
+from app.routers.admin import stream_admin_dashboard
+from app.schemas import LessonCreate, UserCreate
+
+
+def _event(chunk: str):
+    lines = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+    return lines["event"], json.loads(lines["data"])
+
+
+def test_deltas_are_published_on_commit_only(client):
+    async def _run():
+        subscription = live_counters.subscribe()
+        async with AsyncSession(engine) as session:
+            user = await create_user(session, UserCreate(email="ana@example.com", username="ana", password="secret123"))
+        first = await subscription.next(timeout=1)
+
+        async with AsyncSession(engine) as session:
+            lesson = await create_lesson(session, LessonCreate(
+                slug="breathe", title="Breathe", story="", reflection="", challenge="", quiz="[]",
+            ))
+            lesson_id = lesson.id
+        assert await subscription.next(timeout=1) == {"deltas": {"total_lessons": 1}}
+        async with AsyncSession(engine) as session:
+            # Rolled back: nothing announced
+            session.add(User(email="cy@example.com", username="cy", hashed_password="x"))
+            await session.flush()
+            await announce_counters(session, total_users=1)
+            await session.rollback()
+            await create_lesson_completion(session, user.id, lesson_id)
+        second = await subscription.next(timeout=1)
+        subscription.close()
+        return first, second
+
+    first, second = asyncio.run(_run())
+    assert first == {"deltas": {"total_users": 1, "active_users": 1}}
+    assert second == {"deltas": {"total_completions": 1}}
+    assert len(live_counters) == 0
+
+
+def _ticket(client, token):
+    response = client.post("/api/admin/stream/ticket", headers={"Authorization": f"Bearer {token}"})
+    return response.status_code, response.json().get("ticket")
+
+
+def test_stream_sends_a_snapshot_then_deltas(client, admin_token):
+    _, ticket = _ticket(client, admin_token)
+
+    async def _run():
+        response = await stream_admin_dashboard(ticket=ticket, credentials=None)
+        assert response.media_type == "text/event-stream"
+        events = response.body_iterator
+        snapshot = _event(await events.__anext__())
+        async with AsyncSession(engine) as session:
+            await create_user(session, UserCreate(email="ben@example.com", username="ben", password="secret123"))
+        delta = _event(await events.__anext__())
+        await events.aclose()
+        return snapshot, delta
+
+    snapshot, delta = asyncio.run(_run())
+    assert snapshot == ("snapshot", {
+        "total_users": 1, "total_lessons": 0, "total_completions": 0, "active_users": 1, "completion_rate": 0.0,
+    })
+    assert delta == ("delta", {"total_users": 1, "active_users": 1})
+    assert len(live_counters) == 0
+
+
+def test_stream_tickets_are_single_use_and_admin_only(client, admin_token):
+    assert client.get("/api/admin/stream").status_code == 401
+    assert client.get("/api/admin/stream?ticket=not-a-ticket").status_code == 401
+    client.post(
+        "/api/auth/register",
+        json={"email": "ana@example.com", "username": "ana", "password": "secret123"},
+    )
+    learner = client.post("/api/auth/login", json={"username": "ana", "password": "secret123"}).json()["access_token"]
+    assert _ticket(client, learner)[0] == 403
+
+    _, ticket = _ticket(client, admin_token)
+
+    async def _open_twice():
+        events = (await stream_admin_dashboard(ticket=ticket, credentials=None)).body_iterator
+        assert _event(await events.__anext__())[0] == "snapshot"
+        await events.aclose()
+        try:
+            await stream_admin_dashboard(ticket=ticket, credentials=None)
+        except HTTPException as error:
+            return error.status_code
+
+    assert asyncio.run(_open_twice()) == 401
+    assert len(live_counters) == 0
+
+
+def test_deltas_round_trip_through_bus_messages():
+    deltas = {"total_users": -1, "active_users": -1}
+    assert decode_deltas(encode_deltas(deltas)) == deltas
+    assert decode_deltas("unknown=3,total_completions=2") == {"total_completions": 2}
@@ -0,0 +1,113 @@
+"""
+Tests for migration-gated startup.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from app.migrations import SchemaOutOfDateError, current_revision, ensure_schema, head_revision
+
+
+def _scratch_engine(tmp_path):
+    return create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/startup.db")
+
+
+def test_unversioned_sqlite_is_bootstrapped_once(tmp_path):
+    engine = _scratch_engine(tmp_path)
+
+    async def _run():
+        first = await ensure_schema(engine, mode="upgrade")
+        async with engine.connect() as conn:
+            revision = await current_revision(conn)
+            tables = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+        await engine.dispose()
+        return first, revision, tables
+
+    outcome, revision, tables = asyncio.run(_run())
+    assert outcome == "bootstrapped"
+    assert revision == head_revision()
+    assert {"user", "lesson", "lessoncompletion", "alembic_version"} <= set(tables)
+
+
+def test_legacy_create_all_database_gets_the_missing_indexes(tmp_path):
+    engine = _scratch_engine(tmp_path)
+    baseline_indexes = {"ix_user_email", "ix_user_username", "ix_lesson_slug"}
+
+    def _baseline_schema(sync_conn):
+        # What the old create_all startup left behind: three tables and their column indexes
+        tables = [SQLModel.metadata.tables[name] for name in ("user", "lesson", "lessoncompletion")]
+        SQLModel.metadata.create_all(sync_conn, tables=tables)
+        for table in tables:
+            for index in table.indexes:
+                if index.name not in baseline_indexes:
+                    index.drop(sync_conn)
+
+    async def _run():
+        async with engine.begin() as conn:
+            await conn.run_sync(_baseline_schema)
+        outcome = await ensure_schema(engine, mode="upgrade")
+        async with engine.connect() as conn:
+            revision = await current_revision(conn)
+            indexes = set((await conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))).scalars())
+            insert_user = text(
+                'INSERT INTO "user" (email, username, hashed_password, is_active, role, created_at) '
+                "VALUES (:email, :username, 'x', 1, 'USER', CURRENT_TIMESTAMP)"
+            )
+            await conn.execute(insert_user, {"email": "ana@example.com", "username": "ana"})
+            with pytest.raises(IntegrityError):
+                await conn.execute(insert_user, {"email": "ANA@example.com", "username": "ANA"})
+        await engine.dispose()
+        return outcome, revision, indexes
+
+    outcome, revision, indexes = asyncio.run(_run())
+    assert outcome == "upgraded"
+    assert revision == head_revision()
+    assert {"ix_user_username_lower", "ix_user_email_lower", "ix_lessoncompletion_user_id_lesson_id"} <= indexes
+
+
+def test_startup_at_head_is_a_single_query(tmp_path):
+    engine = _scratch_engine(tmp_path)
+    statements = []
+
+    async def _run():
+        await ensure_schema(engine, mode="upgrade")
+        event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        outcome = await ensure_schema(engine, mode="upgrade")
+        await engine.dispose()
+        return outcome
+
+    assert asyncio.run(_run()) == "current"
+    assert statements == ["SELECT version_num FROM alembic_version"]
+
+
+def test_concurrent_startups_migrate_once(tmp_path):
+    async def _run():
+        engines = [_scratch_engine(tmp_path) for _ in range(3)]
+        outcomes = await asyncio.gather(*[ensure_schema(engine, mode="upgrade") for engine in engines])
+        for engine in engines:
+            await engine.dispose()
+        return outcomes
+
+    assert sorted(asyncio.run(_run())) == ["bootstrapped", "current", "current"]
+
+
+def test_check_mode_fails_fast(tmp_path):
+    engine = _scratch_engine(tmp_path)
+
+    async def _run():
+        try:
+            await ensure_schema(engine, mode="check")
+        finally:
+            await engine.dispose()
+
+    with pytest.raises(SchemaOutOfDateError):
+        asyncio.run(_run())
+
+
+def test_off_mode_skips(tmp_path):
+    engine = _scratch_engine(tmp_path)
+    assert asyncio.run(ensure_schema(engine, mode="off")) == "skipped"
@@ -0,0 +1,86 @@
+"""
+Tests for offline module packs and the content manifest.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import create_lesson, update_lesson
+from app.deps import engine
+from app.packs import PackStore, pack_store
+from app.schemas import LessonCreate, LessonUpdate
+
+
+def _seed():
+    async def _create():
+        async with AsyncSession(engine) as session:
+            ids = []
+            for order, slug in enumerate(("breath", "label", "reset"), start=1):
+                lesson = await create_lesson(session, LessonCreate(
+                    slug=slug, title=slug.title(), story=f"{slug} story", reflection="",
+                    challenge="", quiz="[]", order=order,
+                ))
+                ids.append(lesson.id)
+            return ids
+    return asyncio.run(_create())
+
+
+def test_module_pack_and_manifest(client, tmp_path):
+    pack_store.directory = str(tmp_path)
+    lesson_ids = _seed()
+
+    manifest = client.get("/api/content/manifest").json()
+    assert [lesson["id"] for lesson in manifest["lessons"]] == lesson_ids
+    module = manifest["modules"][0]
+    assert module["url"] == "/api/modules/1/pack"
+
+    response = client.get(module["url"])
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    body = response.content  # httpx transparently decompresses
+    assert hashlib.sha256(body).hexdigest() == module["sha256"]
+    pack = json.loads(body)
+    assert [lesson["slug"] for lesson in pack["lessons"]] == ["breath", "label", "reset"]
+
+    # Unchanged content revalidates without a body
+    cached = client.get(module["url"], headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+
+    # Editing a lesson produces a new pack version
+    async def _edit():
+        async with AsyncSession(engine) as session:
+            await update_lesson(session, lesson_ids[0], LessonUpdate(story="new story"))
+    asyncio.run(_edit())
+    refreshed = client.get(module["url"], headers={"If-None-Match": response.headers["etag"]})
+    assert refreshed.status_code == 200
+    assert json.loads(refreshed.content)["lessons"][0]["story"] == "new story"
+    # The previous version stays on disk for workers that may still serve it
+    assert len(list(tmp_path.glob("module-1-*.json.gz"))) == 2
+
+    assert client.get("/api/modules/99/pack").status_code == 404
+
+
+def _pack_file(directory, name, age):
+    path = directory / name
+    path.write_bytes(b"")
+    written = time.time() - age
+    os.utime(path, (written, written))
+    return path
+
+
+def test_prune_keeps_recent_packs_of_other_versions(tmp_path):
+    current = _pack_file(tmp_path, "module-1-v1-current.json.gz", age=600)
+    _pack_file(tmp_path, "module-1-v1-old.json.gz", age=120)
+    _pack_file(tmp_path, "module-1-v1-recent.json.gz", age=10)
+    _pack_file(tmp_path, "module-2-v1-old.json.gz", age=120)
+
+    PackStore(str(tmp_path), prune_grace=60)._prune(1, str(current))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "module-1-v1-current.json.gz", "module-1-v1-recent.json.gz", "module-2-v1-old.json.gz",
+    ]
@@ -0,0 +1,45 @@
+"""
+Tests for bcrypt cost calibration and rehash-on-login.
+"""
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.calibrate_bcrypt import calibrate
+from app.deps import (
+    BCRYPT_ROUNDS,
+    authenticate_user,
+    engine,
+    password_context,
+    wait_for_rehashes,
+)
+from app.models import User
+
+
+def test_calibrate_picks_highest_cost_within_target():
+    result = calibrate(target_ms=10_000, min_rounds=4, max_rounds=5, samples=1)
+    assert result["rounds"] == 5
+    assert set(result["timings_ms"]) == {4, 5}
+
+    # A target no cost can meet still returns the minimum
+    assert calibrate(target_ms=0, min_rounds=4, max_rounds=6, samples=1)["rounds"] == 4
+
+
+def test_outdated_hash_is_rehashed_after_login(client):
+    old_hash = password_context().hash("secret123", rounds=BCRYPT_ROUNDS + 1)
+    assert password_context().needs_update(old_hash)
+
+    async def _login_and_reload():
+        async with AsyncSession(engine) as session:
+            user = User(email="old@example.com", username="oldhash", hashed_password=old_hash)
+            session.add(user)
+            await session.commit()
+            assert await authenticate_user(session, "oldhash", "secret123")
+        await wait_for_rehashes()
+        async with AsyncSession(engine) as session:
+            return (await session.get(User, user.id)).hashed_password
+
+    new_hash = asyncio.run(_login_and_reload())
+    assert new_hash != old_hash
+    assert not password_context().needs_update(new_hash)
+    assert password_context().verify("secret123", new_hash)
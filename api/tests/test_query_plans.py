@@ -0,0 +1,150 @@
+"""
+Query-plan regression test for the CRUD read paths.
+
+Seeds a database with enough users and completions for the planner to care,
+captures every statement each crud call issues, and EXPLAINs it. A full scan
+of a large table fails the test unless that call is a deliberate listing.
+Runs on SQLite always and on PostgreSQL when TEST_POSTGRES_URL is set.
+"""
+import asyncio
+import os
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app import crud
+from app.models import Lesson, LessonCompletion, LessonRevision, User
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+LARGE_TABLES = {"user", "lessoncompletion", "lessonrevision", "refreshtoken"}
+USERS = 300
+LESSONS = 40
+
+
+def _crud_calls():
+    """(name, coroutine factory, tables it may scan in full)."""
+    return [
+        ("get_user_by_email", lambda s: crud.get_user_by_email(s, "User7@Example.com"), set()),
+        ("get_user_by_username", lambda s: crud.get_user_by_username(s, "USER7"), set()),
+        ("get_user_by_id", lambda s: crud.get_user_by_id(s, 7), set()),
+        ("get_lessons", lambda s: crud.get_lessons(s), set()),
+        ("get_lesson", lambda s: crud.get_lesson(s, 3), set()),
+        ("get_lesson_by_slug", lambda s: crud.get_lesson_by_slug(s, "lesson-3"), set()),
+        ("get_catalog_version", lambda s: crud.get_catalog_version(s), set()),
+        ("get_content_version", lambda s: crud.get_content_version(s), set()),
+        ("get_lesson_changes", lambda s: crud.get_lesson_changes(s, since=LESSONS - 5), set()),
+        ("get_user_completions", lambda s: crud.get_user_completions(s, 7), set()),
+        ("get_lesson_completions_by_user_id", lambda s: crud.get_lesson_completions_by_user_id(s, 7), set()),
+        ("get_lesson_completion_stats", lambda s: crud.get_lesson_completion_stats(s, 7), set()),
+        ("get_user_module_progress", lambda s: crud.get_user_module_progress(s, 7), set()),
+        ("is_lesson_unlocked", lambda s: crud.is_lesson_unlocked(s, 7, LESSONS), set()),
+        ("get_lessons_with_unlock_status", lambda s: crud.get_lessons_with_unlock_status(s, 7), set()),
+        # Admin listings page through every user, and the total is a full count
+        ("get_users", lambda s: crud.get_users(s, limit=20), {"user"}),
+        ("get_users_with_progress", lambda s: crud.get_users_with_progress(s, limit=20), {"user"}),
+        ("get_total_lesson_completions", lambda s: crud.get_total_lesson_completions(s), {"lessoncompletion"}),
+    ]
+
+
+async def _seed(conn):
+    now = datetime.utcnow()
+    await conn.execute(insert(User), [
+        {"email": f"user{i}@example.com", "username": f"user{i}", "hashed_password": "x",
+         "role": "USER", "is_active": True, "created_at": now}
+        for i in range(1, USERS + 1)
+    ])
+    await conn.execute(insert(Lesson), [
+        {"slug": f"lesson-{i}", "title": f"Lesson {i}", "story": "", "reflection": "",
+         "challenge": "", "quiz": "[]", "order": i, "module_number": (i - 1) // 10 + 1,
+         "is_published": True, "created_at": now, "updated_at": now}
+        for i in range(1, LESSONS + 1)
+    ])
+    await conn.execute(insert(LessonRevision), [
+        {"lesson_id": i, "operation": "create", "changed_fields": "title", "delta": b"x", "created_at": now}
+        for i in range(1, LESSONS + 1)
+    ])
+    await conn.execute(insert(LessonCompletion), [
+        {"user_id": user_id, "lesson_id": lesson_id,
+         "completed_at": now - timedelta(minutes=user_id * LESSONS + lesson_id)}
+        for user_id in range(1, USERS + 1)
+        for lesson_id in range(1, (user_id % LESSONS) + 1)
+    ])
+    await conn.execute(text("ANALYZE"))
+
+
+def _full_scans(plan_rows, dialect: str) -> set:
+    """Tables read by a full table scan in an EXPLAIN output."""
+    scans = set()
+    for row in plan_rows:
+        line = str(row[-1])
+        if dialect == "sqlite":
+            # "SCAN t" is a table scan; "SCAN t USING [COVERING] INDEX" walks an index
+            match = re.match(r'SCAN "?(\w+)"?(?!.*USING)', line)
+        else:
+            match = re.search(r'Seq Scan on "?(\w+)"?', line)
+        if match:
+            scans.add(match.group(1))
+    return scans
+
+
+async def _check_plans(url: str) -> dict:
+    engine = create_async_engine(url)
+    dialect = engine.dialect.name
+    failures = {}
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.drop_all)
+            await conn.run_sync(SQLModel.metadata.create_all)
+            await _seed(conn)
+
+        for name, call, allowed in _crud_calls():
+            captured = []
+
+            def record(conn, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith("SELECT"):
+                    captured.append((statement, parameters))
+
+            event.listen(engine.sync_engine, "before_cursor_execute", record)
+            try:
+                async with AsyncSession(engine) as session:
+                    await call(session)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", record)
+            assert captured, f"{name} issued no SELECT"
+
+            async with engine.connect() as conn:
+                for statement, parameters in captured:
+                    explain = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+                    result = await conn.exec_driver_sql(explain + statement, parameters)
+                    scans = (_full_scans(result.all(), dialect) & LARGE_TABLES) - allowed
+                    if scans:
+                        failures.setdefault(name, []).append((sorted(scans), statement))
+
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.drop_all)
+    finally:
+        await engine.dispose()
+    return failures
+
+
+def test_sqlite_crud_queries_avoid_full_scans(tmp_path):
+    failures = asyncio.run(_check_plans(f"sqlite+aiosqlite:///{tmp_path}/plans.db"))
+    assert failures == {}
+
+
+@pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+def test_postgres_crud_queries_avoid_full_scans():
+    failures = asyncio.run(_check_plans(TEST_POSTGRES_URL))
+    assert failures == {}
+
+
+def test_full_scan_detection():
+    assert _full_scans([(2, 0, 0, "SCAN lessoncompletion")], "sqlite") == {"lessoncompletion"}
+    assert _full_scans([(2, 0, 0, "SCAN lessoncompletion USING COVERING INDEX ix")], "sqlite") == set()
+    assert _full_scans([(2, 0, 0, "SEARCH user USING INDEX ix_user_email_lower (<expr>=?)")], "sqlite") == set()
+    assert _full_scans([("Seq Scan on lessoncompletion  (cost=0.00..1.00 rows=1 width=4)",)], "postgresql") == {"lessoncompletion"}
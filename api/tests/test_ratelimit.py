@@ -0,0 +1,152 @@
+"""
+Tests for login throttling.
+"""
+import asyncio
+import hashlib
+
+from fastapi.testclient import TestClient
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from app.main import app
+from app.metrics import metrics
+from app.ratelimit import BucketPolicy, InMemoryBackend, RedisBackend, RespConnection
+from app.routers import auth
+
+
+def test_in_memory_bucket_refills(fake_clock):
+    backend = InMemoryBackend(shards=4, clock=fake_clock)
+    policy = BucketPolicy(capacity=2, refill_per_second=0.5)
+
+    async def _consume():
+        return await backend.consume("login:user:alice", policy)
+
+    assert asyncio.run(_consume()) == (True, 0.0)
+    assert asyncio.run(_consume()) == (True, 0.0)
+    allowed, retry_after = asyncio.run(_consume())
+    assert not allowed and retry_after == 2.0
+
+    fake_clock.now += 2
+    assert asyncio.run(_consume())[0]
+
+
+def test_in_memory_backend_is_bounded():
+    backend = InMemoryBackend(shards=1, max_keys_per_shard=10)
+    policy = BucketPolicy(capacity=1, refill_per_second=1)
+
+    async def _spray():
+        for i in range(100):
+            await backend.consume(f"login:user:random{i}", policy)
+
+    asyncio.run(_spray())
+    assert len(backend._shards[0][1]) == 10
+
+
+async def _redis_stand_in(reader, writer, buckets, scripts):
+    """A tiny RESP server implementing the commands RedisBackend uses."""
+    async def read_command():
+        header = await reader.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    while (command := await read_command()) is not None:
+        name = command[0].upper()
+        if name == b"SCRIPT":
+            sha = hashlib.sha1(command[2]).hexdigest()
+            scripts.add(sha)
+            writer.write(b"$40\r\n" + sha.encode() + b"\r\n")
+        elif name in (b"EVALSHA", b"EVAL"):
+            key = command[3].decode()
+            capacity, rate, now, cost = (float(arg) for arg in command[4:8])
+            tokens, ts = buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+            if tokens >= cost:
+                tokens, allowed, retry = tokens - cost, 1, 0.0
+            else:
+                allowed, retry = 0, (cost - tokens) / rate
+            buckets[key] = (tokens, now)
+            retry_bytes = str(retry).encode()
+            writer.write(
+                f"*2\r\n:{allowed}\r\n${len(retry_bytes)}\r\n".encode() + retry_bytes + b"\r\n"
+            )
+        else:
+            writer.write(b"-ERR unknown command\r\n")
+        await writer.drain()
+    writer.close()
+
+
+def test_redis_backend_against_stand_in(fake_clock):
+    async def _run():
+        buckets, scripts = {}, set()
+        server = await asyncio.start_server(
+            lambda r, w: _redis_stand_in(r, w, buckets, scripts), "127.0.0.1", 0
+        )
+        port = server.sockets[0].getsockname()[1]
+        backend = RedisBackend(f"redis://127.0.0.1:{port}/0", clock=fake_clock)
+        policy = BucketPolicy(capacity=2, refill_per_second=1)
+
+        results = [await backend.consume("login:ip:1.2.3.4", policy) for _ in range(3)]
+        fake_clock.now += 1
+        results.append(await backend.consume("login:ip:1.2.3.4", policy))
+
+        await backend.connection.close()
+        server.close()
+        await server.wait_closed()
+        return results, buckets, scripts
+
+    results, buckets, scripts = asyncio.run(_run())
+    assert [allowed for allowed, _ in results] == [True, True, False, True]
+    assert results[2][1] == 1.0
+    assert "ratelimit:login:ip:1.2.3.4" in buckets
+    assert len(scripts) == 1
+
+
+def test_resp_encoding():
+    assert RespConnection.encode("GET", "key") == b"*2\r\n$3\r\nGET\r\n$3\r\nkey\r\n"
+
+
+def test_login_throttled_before_password_check(client, monkeypatch):
+    calls = []
+
+    async def fake_authenticate(session, username, password):
+        calls.append(username)
+        return None
+
+    monkeypatch.setattr(auth, "authenticate_user", fake_authenticate)
+    throttled_before = metrics.get("login_throttled_total", scope="username")
+
+    statuses = [
+        client.post("/api/auth/login", json={"username": "Alice", "password": "wrong"}).status_code
+        for _ in range(7)
+    ]
+    assert statuses == [401] * 5 + [429] * 2
+    assert len(calls) == 5
+    assert metrics.get("login_throttled_total", scope="username") == throttled_before + 2
+
+    response = client.post("/api/auth/login", json={"username": "alice", "password": "x"})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert "login_throttled_total" in client.get("/metrics").text
+
+
+def test_login_ip_comes_from_forwarded_for_only_behind_a_trusted_proxy(client, monkeypatch):
+    seen = []
+
+    async def record_check(ip, username):
+        seen.append(ip)
+        return None
+
+    monkeypatch.setattr(auth.login_rate_limiter, "check", record_check)
+    # The test client connects from "testclient"; uvicorn applies FORWARDED_ALLOW_IPS the same way
+    for trusted_proxies in ("testclient", "10.0.0.1"):
+        proxied = TestClient(ProxyHeadersMiddleware(app, trusted_hosts=trusted_proxies))
+        proxied.post(
+            "/api/auth/login",
+            json={"username": "alice", "password": "x"},
+            headers={"X-Forwarded-For": "203.0.113.7"},
+        )
+    assert seen == ["203.0.113.7", "testclient"]
@@ -0,0 +1,101 @@
+"""
+Tests for read-replica routing, using two SQLite databases as primary and replica.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app import deps
+from app.crud import create_lesson
+from app.metrics import metrics
+from app.models import Lesson
+from app.schemas import LessonCreate
+
+
+@pytest.fixture
+def replica(client, tmp_path, monkeypatch):
+    """A second database standing in for a lagging replica."""
+    replica_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica.db")
+    now = datetime.utcnow()
+
+    async def _seed():
+        # Same lessons everywhere; the replica spells titles differently so reads are traceable
+        async with AsyncSession(deps.engine) as session:
+            for order in (1, 2):
+                await create_lesson(session, LessonCreate(
+                    slug=f"lesson-{order}", title=f"Primary {order}", story="", reflection="",
+                    challenge="", quiz="[]", order=order,
+                ))
+        async with replica_engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+            await conn.execute(insert(Lesson), [
+                {"id": order, "slug": f"lesson-{order}", "title": f"Replica {order}", "story": "",
+                 "reflection": "", "challenge": "", "quiz": "[]", "order": order, "module_number": 1,
+                 "is_published": True, "created_at": now, "updated_at": now}
+                for order in (1, 2)
+            ])
+
+    asyncio.run(_seed())
+    monkeypatch.setattr(deps, "read_engine", replica_engine)
+    yield replica_engine
+    asyncio.run(replica_engine.dispose())
+
+
+def _login(client):
+    client.post(
+        "/api/auth/register",
+        json={"email": "reader@example.com", "username": "reader", "password": "secret123"},
+    )
+    token = client.post(
+        "/api/auth/login", json={"username": "reader", "password": "secret123"}
+    ).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_reads_go_to_replica(client, replica):
+    before = metrics.get("db_read_sessions_total", target="replica")
+    assert [lesson["title"] for lesson in client.get("/api/lessons").json()] == ["Replica 1", "Replica 2"]
+    assert client.get("/api/lessons/1").json()["title"] == "Replica 1"
+    assert metrics.get("db_read_sessions_total", target="replica") == before + 2
+
+
+def test_completion_pins_reads_to_primary(client, replica, monkeypatch, fake_clock):
+    monkeypatch.setattr(deps.recent_writers, "_clock", fake_clock)
+    headers = _login(client)
+    assert client.get("/api/progress", headers=headers).json()["completed_lessons"] == 0
+
+    response = client.post("/api/lessons/1/complete", headers=headers)
+    assert response.status_code == 200
+    pinned = {**headers, deps.READ_PIN_HEADER: response.headers[deps.READ_PIN_HEADER]}
+
+    # Within the window the user reads their own write from the primary
+    progress = client.get("/api/progress", headers=pinned).json()
+    assert progress["completed_lessons"] == 1
+    lessons = client.get("/api/lessons", headers=pinned).json()
+    assert lessons[0]["title"] == "Primary 1" and lessons[0]["is_completed"]
+
+    # Other readers are unaffected, and the pin expires
+    assert client.get("/api/lessons").json()[0]["title"] == "Replica 1"
+    fake_clock.now += deps.READ_AFTER_WRITE_SECONDS + 1
+    assert client.get("/api/progress", headers=pinned).json()["completed_lessons"] == 0
+
+
+def test_read_pin_is_honoured_by_every_worker(fake_clock):
+    # Two workers share nothing but the signing secret
+    writer = deps.RecentWriters(window=5, secret="shared", clock=fake_clock)
+    reader = deps.RecentWriters(window=5, secret="shared", clock=fake_clock)
+
+    pin = writer.pin("ana")
+    assert reader.is_recent("ana", pin)
+    assert not reader.is_recent("ben", pin)
+    assert not reader.is_recent("ana", None)
+    until, _, signature = pin.partition(".")
+    assert not reader.is_recent("ana", f"{int(until) + 60}.{signature}")
+    assert not deps.RecentWriters(secret="other", clock=fake_clock).is_recent("ana", pin)
+
+    fake_clock.now += 6
+    assert not reader.is_recent("ana", pin)
@@ -0,0 +1,100 @@
+"""
+Tests for rotating refresh tokens.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel, select
+
+from app.deps import engine, hash_refresh_token
+from app.metrics import metrics
+from app.models import RefreshToken, User
+
+
+def _register_and_login(client):
+    client.post(
+        "/api/auth/register",
+        json={"email": "rota@example.com", "username": "rota", "password": "secret123"},
+    )
+    response = client.post("/api/auth/login", json={"username": "rota", "password": "secret123"})
+    assert response.status_code == 200
+    return response.json()
+
+
+async def _stored_tokens():
+    async with AsyncSession(engine) as session:
+        result = await session.execute(select(RefreshToken).order_by(RefreshToken.id))
+        return result.scalars().all()
+
+
+def test_refresh_rotates_token(client):
+    tokens = _register_and_login(client)
+    assert tokens["refresh_token"]
+
+    response = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+
+    me = client.get("/api/auth/me", headers={"Authorization": f"Bearer {rotated['access_token']}"})
+    assert me.json()["username"] == "rota"
+
+    # Only digests are stored, and both tokens share a family
+    stored = asyncio.run(_stored_tokens())
+    assert [row.token_hash for row in stored] == [
+        hash_refresh_token(tokens["refresh_token"]),
+        hash_refresh_token(rotated["refresh_token"]),
+    ]
+    assert stored[0].used_at is not None and stored[1].used_at is None
+    assert stored[0].family_id == stored[1].family_id
+
+
+def test_reused_refresh_token_revokes_family(client):
+    tokens = _register_and_login(client)
+    first = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+    reuse_before = metrics.get("refresh_token_reuse_total")
+
+    replay = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert replay.status_code == 401
+    assert metrics.get("refresh_token_reuse_total") == reuse_before + 1
+
+    # The legitimate latest token is revoked along with the rest of the family
+    latest = client.post("/api/auth/refresh", json={"refresh_token": first["refresh_token"]})
+    assert latest.status_code == 401
+
+
+def test_logout_revokes_refresh_token(client):
+    tokens = _register_and_login(client)
+    assert client.post("/api/auth/logout", json={"refresh_token": tokens["refresh_token"]}).status_code == 204
+    response = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+    assert client.post("/api/auth/refresh", json={"refresh_token": "unknown"}).status_code == 401
+
+
+def test_deleting_a_user_deletes_their_tokens(tmp_path):
+    # PostgreSQL always enforces foreign keys; SQLite only when asked
+    scratch = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/fk.db")
+    event.listen(scratch.sync_engine, "connect", lambda dbapi_connection, _: dbapi_connection.execute("PRAGMA foreign_keys = ON"))
+
+    async def _run():
+        async with scratch.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        async with AsyncSession(scratch) as session:
+            user = User(email="rota@example.com", username="rota", hashed_password="x")
+            session.add(user)
+            await session.flush()
+            session.add(RefreshToken(
+                user_id=user.id, token_hash=hash_refresh_token("raw"), family_id="family",
+                expires_at=datetime.utcnow() + timedelta(days=1),
+            ))
+            await session.commit()
+
+            await session.delete(user)
+            await session.commit()
+            remaining = (await session.execute(select(RefreshToken))).scalars().all()
+        await scratch.dispose()
+        return remaining
+
+    assert asyncio.run(_run()) == []
@@ -0,0 +1,63 @@
+"""
+Tests for single-round-trip registration.
+"""
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from app.crud import _duplicate_user_field
+from app.deps import engine
+
+
+def _register(client, email, username):
+    return client.post(
+        "/api/auth/register",
+        json={"email": email, "username": username, "password": "secret123"},
+    )
+
+
+def test_registration_is_one_statement(client):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        response = _register(client, "one@example.com", "one")
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    assert response.json()["username"] == "one"
+    assert statements == ["INSERT"]
+
+
+def test_duplicates_are_classified(client):
+    assert _register(client, "dup@example.com", "dup").status_code == 200
+
+    email_taken = _register(client, "dup@example.com", "other")
+    assert email_taken.status_code == 400
+    assert email_taken.json()["detail"] == "Email already registered"
+
+    username_taken = _register(client, "other@example.com", "dup")
+    assert username_taken.status_code == 400
+    assert username_taken.json()["detail"] == "Username already taken"
+
+
+class FakeUniqueViolation(Exception):
+    constraint_name = "ix_user_username"
+
+
+def test_postgres_constraint_names_are_classified():
+    error = IntegrityError("INSERT", {}, FakeUniqueViolation("duplicate key value"))
+    assert _duplicate_user_field(error) == "username"
+
+
+def test_lookups_ignore_case(client):
+    assert _register(client, "Mixed@Example.com", "MixedCase").status_code == 200
+
+    assert _register(client, "mixed@example.com", "another").json()["detail"] == "Email already registered"
+    assert _register(client, "new@example.com", "mixedcase").json()["detail"] == "Username already taken"
+
+    login = client.post("/api/auth/login", json={"username": "MIXEDCASE", "password": "secret123"})
+    assert login.status_code == 200
@@ -0,0 +1,86 @@
+"""
+Tests for lesson revision deltas and incremental change sync.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import create_lesson, delete_lesson, get_catalog_version, update_lesson
+from app.deps import engine
+from app.models import LessonRevision
+from app.revisions import apply_delta, compress_delta, decompress_delta, make_delta
+from app.schemas import LessonCreate, LessonUpdate
+
+
+def test_delta_round_trip():
+    old = {"title": "Breath", "story": "line one\nline two\nline three\n", "order": 1}
+    new = {"title": "Breathing", "story": "line one\nline 2\nline three\nline four\n", "order": 1}
+
+    delta = decompress_delta(compress_delta(make_delta(old, new)))
+    assert set(delta) == {"title", "story"}
+    assert apply_delta(old, delta) == new
+
+
+def test_changes_since_version(client):
+    async def _write():
+        async with AsyncSession(engine) as session:
+            ids = []
+            for slug, story in (("one", "a\nb\n"), ("two", "")):
+                lesson = await create_lesson(session, LessonCreate(
+                    slug=slug, title=slug.title(), story=story, reflection="", challenge="", quiz="[]",
+                ))
+                ids.append(lesson.id)
+            return ids
+
+    first_id, second_id = asyncio.run(_write())
+    baseline = client.get("/api/lessons/changes").json()
+    assert baseline["lesson_ids"] == [first_id, second_id]
+
+    async def _edit():
+        async with AsyncSession(engine) as session:
+            updated = await update_lesson(session, first_id, LessonUpdate(story="a\nc\n"))
+            assert updated.updated_at > updated.created_at
+            await delete_lesson(session, second_id)
+
+    asyncio.run(_edit())
+    changes = client.get(
+        "/api/lessons/changes", params={"since": baseline["version"], "include_deltas": True}
+    ).json()
+    assert changes["version"] == baseline["version"] + 2
+    assert [c["operation"] for c in changes["changes"]] == ["update", "delete"]
+    assert changes["changes"][0]["changed_fields"] == ["story"]
+    assert apply_delta({"story": "a\nb\n"}, changes["changes"][0]["delta"])["story"] == "a\nc\n"
+
+    # Nothing new after the latest version
+    latest = client.get("/api/lessons/changes", params={"since": changes["version"]}).json()
+    assert latest["changes"] == [] and not latest["full_resync"]
+
+
+def test_catalog_version_waits_for_recent_revisions_to_settle(client):
+    async def _run():
+        async with AsyncSession(engine) as session:
+            first = await create_lesson(session, LessonCreate(
+                slug="one", title="One", story="", reflection="", challenge="", quiz="[]",
+            ))
+            first_id = first.id
+            await create_lesson(session, LessonCreate(
+                slug="two", title="Two", story="", reflection="", challenge="", quiz="[]",
+            ))
+            # A lower id could still commit behind revisions this fresh
+            pending = await get_catalog_version(session, settle_seconds=60)
+
+            await session.execute(
+                update(LessonRevision)
+                .where(LessonRevision.lesson_id == first_id)
+                .values(created_at=datetime.utcnow() - timedelta(minutes=5))
+            )
+            await session.commit()
+            return pending, await get_catalog_version(session, settle_seconds=60), await get_catalog_version(session)
+
+    pending, partly_settled, latest = asyncio.run(_run())
+    assert pending == 0
+    assert partly_settled == 1
+    # SQLite commits ids in order, so nothing waits there
+    assert latest == 2
@@ -0,0 +1,98 @@
+"""
+Tests for the in-memory lesson search index.
+"""
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import create_lesson
+from app.deps import engine
+from app.schemas import LessonCreate
+from app.search import LessonSearchIndex, tokenize
+
+
+def make_lesson(lesson_id, title, story="", reflection="", challenge="", published=True):
+    return SimpleNamespace(
+        id=lesson_id, title=title, slug=f"lesson-{lesson_id}", order=lesson_id,
+        module_number=1, story=story, reflection=reflection, challenge=challenge,
+        is_published=published,
+    )
+
+
+LESSONS = [
+    make_lesson(1, "The Red Line Meeting", story="Take one 4-4-4 breath before you answer."),
+    make_lesson(2, "Self-Awareness Foundations", story="Notice the breath and the body."),
+    make_lesson(3, "Empathy in Action", reflection="Listen, reflect, label."),
+    make_lesson(4, "Draft Lesson", story="4-4-4 breath draft", published=False),
+]
+
+
+def test_tokenize_keeps_compounds_and_parts():
+    assert tokenize("The 4-4-4 Breath") == ["4-4-4", "4", "4", "4", "breath"]
+    assert "awareness" in tokenize("self-awareness")
+
+
+def test_search_ranks_and_highlights():
+    index = LessonSearchIndex()
+    index.build(LESSONS)
+
+    results = index.search("4-4-4 breath")
+    assert [result["id"] for result in results] == [1, 2]
+    assert "<mark>4-4-4</mark>" in results[0]["snippet"]
+
+    # Unpublished lessons are never indexed
+    assert all(result["id"] != 4 for result in index.search("draft"))
+
+
+def test_search_prefix_and_incremental_updates():
+    index = LessonSearchIndex()
+    index.build(LESSONS)
+    assert index.search("empa")[0]["id"] == 3
+
+    index.add(make_lesson(3, "Empathy in Action", reflection="Now about gratitude."))
+    assert index.search("label") == []
+    assert index.search("gratitude")[0]["id"] == 3
+
+    index.remove(3)
+    assert index.search("empathy") == []
+
+
+class CountingDict(dict):
+    """Dict that counts item lookups."""
+    lookups = 0
+
+    def __getitem__(self, key):
+        self.lookups += 1
+        return super().__getitem__(key)
+
+
+def test_search_work_scales_with_matches_not_catalog_size():
+    """Only postings of the query terms are scored (timings: python -m benchmarks.search_latency)."""
+    index = LessonSearchIndex()
+    index.build(
+        [make_lesson(i, f"Lesson {i}", story="resilience breath") for i in range(1, 11)]
+        + [make_lesson(i, f"Lesson {i}", story=f"unrelated word{i}") for i in range(11, 1001)]
+    )
+    index._doc_lengths = CountingDict(index._doc_lengths)
+
+    results = index.search("resilience breath")
+    assert len(results) == 10
+    # One length lookup per (term, matching lesson) pair; the other 990 lessons are never touched
+    assert index._doc_lengths.lookups == 2 * 10
+
+
+def test_search_endpoint_reflects_admin_writes(client):
+    """Lessons written through crud are searchable immediately."""
+    async def _create():
+        async with AsyncSession(engine) as session:
+            await create_lesson(session, LessonCreate(
+                slug="breathing", title="Breathing Reset", story="Try the 4-4-4 breath.",
+                reflection="", challenge="", quiz="[]",
+            ))
+
+    asyncio.run(_create())
+    response = client.get("/api/lessons/search", params={"q": "4-4-4"})
+    assert response.status_code == 200
+    assert response.json()[0]["slug"] == "breathing"
+    assert client.get("/api/lessons/search").status_code == 422
@@ -0,0 +1,29 @@
+"""
+Tests for the multi-process serving configuration.
+"""
+from app import serve
+
+
+def test_worker_count_defaults_to_available_cpus(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.setattr(serve, "available_cpus", lambda: 3)
+    assert serve.worker_count() == 3
+
+    monkeypatch.setenv("WEB_CONCURRENCY", "8")
+    assert serve.worker_count() == 8
+    monkeypatch.setenv("WEB_CONCURRENCY", "0")
+    assert serve.worker_count() == 1
+
+
+def test_available_cpus_is_positive():
+    assert serve.available_cpus() >= 1
+
+
+def test_gunicorn_options_preload_and_recycle():
+    options = serve.gunicorn_options(workers=4)
+    assert options["workers"] == 4
+    assert options["preload_app"] is True
+    assert options["worker_class"] == "uvicorn.workers.UvicornWorker"
+    assert options["max_requests"] == serve.MAX_REQUESTS
+    assert options["max_requests_jitter"] == serve.MAX_REQUESTS_JITTER
+    assert options["forwarded_allow_ips"] == serve.FORWARDED_ALLOW_IPS
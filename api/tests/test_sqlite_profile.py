@@ -0,0 +1,57 @@
+"""
+Tests for the SQLite production profile.
+"""
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import create_lesson, create_lesson_completion
+from app.deps import engine, session_class
+from app.metrics import metrics
+from app.models import User
+from app.schemas import LessonCreate
+from app.sqlite_profile import SerializedWriteSession, pragma_statements
+
+
+def test_pragmas_applied_on_connect(client):
+    async def _pragmas():
+        async with engine.connect() as conn:
+            return {
+                name: (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+                for name in ("journal_mode", "synchronous", "busy_timeout")
+            }
+
+    assert asyncio.run(_pragmas()) == {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000}
+    assert "PRAGMA journal_mode = WAL" not in pragma_statements(":memory:")
+
+
+def test_concurrent_writers_are_queued(client):
+    assert session_class is SerializedWriteSession
+
+    async def _setup():
+        async with AsyncSession(engine) as session:
+            lesson = await create_lesson(session, LessonCreate(
+                slug="queue", title="Queue", story="", reflection="", challenge="", quiz="[]", order=1,
+            ))
+            lesson_id = lesson.id
+            session.add_all([
+                User(email=f"writer{i}@example.com", username=f"writer{i}", hashed_password="x")
+                for i in range(20)
+            ])
+            await session.commit()
+            return lesson_id
+
+    async def _complete(user_id, lesson_id):
+        async with session_class(engine) as session:
+            completion = await create_lesson_completion(session, user_id, lesson_id)
+            return completion.id
+
+    async def _run():
+        lesson_id = await _setup()
+        return await asyncio.gather(*[_complete(user_id, lesson_id) for user_id in range(1, 21)])
+
+    waits_before = metrics.get("sqlite_writer_waits_total")
+    completion_ids = asyncio.run(_run())
+    assert sorted(completion_ids) == list(range(1, 21))
+    assert metrics.get("sqlite_writer_waits_total") > waits_before
@@ -0,0 +1,42 @@
+"""
+Import-time regression tests for cold starts.
+"""
+import os
+import subprocess
+import sys
+
+from app.startup_profile import API_DIR, parse_importtime, profile_imports
+
+# Generous, so only a real regression (a new eager heavy import) trips it
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "3000"))
+DEFERRED_MODULES = ("passlib", "jose", "alembic", "numpy")
+
+
+def test_parse_importtime():
+    output = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   app.metrics\n"
+        "import time:      1000 |       1500 | app.main\n"
+    )
+    timings = parse_importtime(output)
+    assert [(t.module, t.self_us, t.cumulative_us, t.depth) for t in timings] == [
+        ("app.metrics", 120, 120, 1),
+        ("app.main", 1000, 1500, 0),
+    ]
+
+
+def test_heavy_modules_are_imported_lazily():
+    result = subprocess.run(
+        [sys.executable, "-c", (
+            "import sys, app.main; "
+            f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+        )],
+        cwd=API_DIR, capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_app_import_time_within_budget():
+    timings = profile_imports("app.main")
+    total_ms = next(t.cumulative_us for t in timings if t.module == "app.main") / 1000
+    assert total_ms < IMPORT_TIME_BUDGET_MS
@@ -0,0 +1,65 @@
+"""
+Tests for the verified-token cache.
+"""
+from datetime import timedelta
+
+from jose import jwt
+
+from app import deps
+from app.metrics import metrics
+from app.token_cache import VerifiedTokenCache, token_cache
+
+
+def test_entries_expire_with_token(fake_clock):
+    cache = VerifiedTokenCache(max_entries=10, clock=fake_clock)
+    cache.put("token-a", {"sub": "alice", "exp": 1060})
+    cache.put("token-b", {"sub": "bob"})  # No exp: never cached
+
+    assert cache.get("token-a") == {"sub": "alice", "exp": 1060}
+    assert cache.get("token-b") is None
+    fake_clock.now = 1060
+    assert cache.get("token-a") is None
+    assert len(cache) == 0
+    assert cache.hit_ratio == 1 / 3
+
+
+def test_cache_is_bounded_lru(fake_clock):
+    cache = VerifiedTokenCache(max_entries=2, clock=fake_clock)
+    cache.put("a", {"exp": 2000})
+    cache.put("b", {"exp": 2000})
+    cache.get("a")
+    cache.put("c", {"exp": 2000})
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+
+def test_authenticated_requests_skip_jwt_decode(client, monkeypatch):
+    client.post(
+        "/api/auth/register",
+        json={"email": "cache@example.com", "username": "cache", "password": "secret123"},
+    )
+    token = client.post(
+        "/api/auth/login", json={"username": "cache", "password": "secret123"}
+    ).json()["access_token"]
+
+    decodes = []
+    real_decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        decodes.append(1)
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt, "decode", counting_decode)
+
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(5):
+        assert client.get("/api/auth/me", headers=headers).status_code == 200
+    assert len(decodes) == 1
+    assert metrics.get("token_cache_size") == 1
+    assert metrics.get("token_cache_hit_ratio") == 0.8
+
+    # Invalid tokens are rejected and never cached
+    bad = deps.create_access_token({"sub": "cache"}, timedelta(minutes=5)) + "x"
+    assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {bad}"}).status_code == 401
+    assert len(token_cache) == 1
@@ -18,12 +18,20 @@ export const apiClient = axios.create({
   },
 })
 
+// Read-your-writes pin ("<until>.<signature>") from the last write response;
+// sent back with reads so they are served by the primary database until it expires
+const READ_PIN_HEADER = 'X-Read-Primary-Until'
+let readPin: string | null = null
+
 // Add auth token to requests if available
 apiClient.interceptors.request.use((config) => {
   const token = localStorage.getItem('access_token')
   if (token) {
     config.headers.Authorization = `Bearer ${token}`
   }
+  if (readPin && Number(readPin.split('.')[0]) * 1000 > Date.now()) {
+    config.headers[READ_PIN_HEADER] = readPin
+  }
   
   // Debug logging
   console.log('API Request:', {
@@ -37,13 +45,54 @@ apiClient.interceptors.request.use((config) => {
   return config
 })
 
+// Refresh tokens are single-use, so concurrent 401s share one refresh request
+let refreshPromise: Promise<string | null> | null = null
+
+const refreshAccessToken = (): Promise<string | null> => {
+  const refreshToken = localStorage.getItem('refresh_token')
+  if (!refreshToken) {
+    return Promise.resolve(null)
+  }
+  if (!refreshPromise) {
+    refreshPromise = axios
+      .post(`${finalApiUrl}/auth/refresh`, { refresh_token: refreshToken })
+      .then((response) => {
+        localStorage.setItem('access_token', response.data.access_token)
+        localStorage.setItem('refresh_token', response.data.refresh_token)
+        return response.data.access_token as string
+      })
+      .catch(() => null)
+      .finally(() => {
+        refreshPromise = null
+      })
+  }
+  return refreshPromise
+}
+
 // Handle auth errors
 apiClient.interceptors.response.use(
-  (response) => response,
-  (error) => {
+  (response) => {
+    const pin = response.headers[READ_PIN_HEADER.toLowerCase()]
+    if (pin) {
+      readPin = pin
+    }
+    return response
+  },
+  async (error) => {
+    const originalRequest = error.config
     if (error.response?.status === 401) {
+      // Try once to renew the access token before logging out
+      if (originalRequest && !originalRequest._retried && !originalRequest.url?.startsWith('/auth/')) {
+        originalRequest._retried = true
+        const accessToken = await refreshAccessToken()
+        if (accessToken) {
+          originalRequest.headers.Authorization = `Bearer ${accessToken}`
+          return apiClient(originalRequest)
+        }
+      }
       // Clear invalid token
       localStorage.removeItem('access_token')
+      localStorage.removeItem('refresh_token')
       localStorage.removeItem('user')
       // Redirect to login or refresh page
       window.location.reload()
@@ -81,6 +130,46 @@ export interface LessonDetail extends Lesson {
   updated_at: string
 }
 
+export interface CompiledBlock {
+  type: string
+  [key: string]: any
+}
+
+export interface CompiledSection {
+  content_hash: string
+  html: string
+  blocks: CompiledBlock[]
+}
+
+export interface CompiledLesson {
+  id: number
+  content_hash: string
+  sections: Record<'story' | 'reflection' | 'challenge', CompiledSection>
+}
+
+export interface LessonSearchResult {
+  id: number
+  title: string
+  slug: string
+  order: number
+  module_number: number
+  score: number
+  snippet: string
+}
+
+export interface ContentManifest {
+  version: string
+  lessons: { id: number; module_number: number; content_hash: string; size: number }[]
+  modules: {
+    module_number: number
+    url: string
+    lesson_ids: number[]
+    sha256: string
+    size: number
+    compressed_size: number
+  }[]
+}
+
 export interface Progress {
   total_lessons: number
   completed_lessons: number
@@ -91,6 +180,7 @@ export interface Progress {
 export interface AuthResponse {
   access_token: string
   token_type: string
+  refresh_token?: string
 }
 
 export interface LoginData {
@@ -151,6 +241,10 @@ export const api = {
     return response.data
   },
 
+  logout: async (refreshToken: string): Promise<void> => {
+    await apiClient.post('/auth/logout', { refresh_token: refreshToken })
+  },
+
   register: async (data: RegisterData): Promise<User> => {
     const response = await apiClient.post('/auth/register', data)
     return response.data
@@ -172,6 +266,26 @@ export const api = {
     return response.data
   },
 
+  searchLessons: async (q: string, limit = 10): Promise<LessonSearchResult[]> => {
+    const response = await apiClient.get('/lessons/search', { params: { q, limit } })
+    return response.data
+  },
+
+  getCompiledLesson: async (id: number): Promise<CompiledLesson> => {
+    const response = await apiClient.get(`/lessons/${id}/compiled`)
+    return response.data
+  },
+
+  getContentManifest: async (): Promise<ContentManifest> => {
+    const response = await apiClient.get('/content/manifest')
+    return response.data
+  },
+
+  getModulePack: async (moduleNumber: number): Promise<{ lessons: LessonDetail[] }> => {
+    const response = await apiClient.get(`/modules/${moduleNumber}/pack`)
+    return response.data
+  },
+
   completeLesson: async (id: number): Promise<void> => {
     await apiClient.post(`/lessons/${id}/complete`)
   },
@@ -188,6 +302,13 @@ export const api = {
     return response.data
   },
 
+  // Server-Sent Events; EventSource cannot send headers, so a single-use ticket goes in the URL.
+  // Requesting it goes through apiClient, which renews an expired access token first.
+  adminStreamUrl: async (): Promise<string> => {
+    const response = await apiClient.post('/admin/stream/ticket')
+    return `${finalApiUrl}/admin/stream?ticket=${encodeURIComponent(response.data.ticket)}`
+  },
+
   getAdminUsers: async (): Promise<AdminUser[]> => {
     const response = await apiClient.get('/admin/users')
     return response.data
@@ -82,6 +82,9 @@ export function AuthProvider({ children }: AuthProviderProps) {
     onSuccess: async (authResponse) => {
       console.log('Login successful, token received')
       localStorage.setItem('access_token', authResponse.access_token)
+      if (authResponse.refresh_token) {
+        localStorage.setItem('refresh_token', authResponse.refresh_token)
+      }
       try {
         // Fetch user data after successful login
         const userData = await api.getCurrentUser()
@@ -180,7 +183,12 @@ export function AuthProvider({ children }: AuthProviderProps) {
   }
 
   const logout = () => {
+    const refreshToken = localStorage.getItem('refresh_token')
+    if (refreshToken) {
+      api.logout(refreshToken).catch(() => {})
+    }
     localStorage.removeItem('access_token')
+    localStorage.removeItem('refresh_token')
     localStorage.removeItem('user')
     setUser(null)
     queryClient.clear()
@@ -1,6 +1,6 @@
-import { useState } from 'react'
+import { useEffect, useState } from 'react'
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
-import { api, AdminUser } from '../api/client'
+import { api, AdminDashboardStats, AdminUser } from '../api/client'
 import { useAuth } from '../hooks/useAuth'
 
 export function AdminDashboard() {
@@ -16,6 +16,69 @@ export function AdminDashboard() {
     enabled: currentUser?.role === 'admin'
   })
 
+  // Keep the stats live: a snapshot, then counter deltas pushed by the server
+  const [streamReconnecting, setStreamReconnecting] = useState(false)
+  useEffect(() => {
+    if (currentUser?.role !== 'admin') return
+    let source: EventSource | null = null
+    let retryTimer: ReturnType<typeof setTimeout> | undefined
+    let stopped = false
+    let failures = 0
+
+    const reconnectLater = () => {
+      if (stopped) return
+      setStreamReconnecting(true)
+      failures += 1
+      retryTimer = setTimeout(connect, Math.min(30000, 1000 * 2 ** failures))
+    }
+
+    // Every connection needs a fresh ticket: they are single-use and expire within seconds
+    const connect = async () => {
+      let url: string
+      try {
+        url = await api.adminStreamUrl()
+      } catch {
+        reconnectLater()
+        return
+      }
+      if (stopped) return
+      source = new EventSource(url)
+      source.addEventListener('snapshot', (event) => {
+        failures = 0
+        setStreamReconnecting(false)
+        queryClient.setQueryData(['adminDashboard'], JSON.parse((event as MessageEvent).data))
+      })
+      source.addEventListener('delta', (event) => {
+        const deltas: Partial<Record<keyof AdminDashboardStats, number>> = JSON.parse((event as MessageEvent).data)
+        queryClient.setQueryData<AdminDashboardStats>(['adminDashboard'], (previous) => {
+          if (!previous) return previous
+          const next = { ...previous }
+          for (const [name, delta] of Object.entries(deltas)) {
+            next[name as keyof AdminDashboardStats] += delta ?? 0
+          }
+          const possible = next.total_users * next.total_lessons
+          next.completion_rate = possible > 0 ? (next.total_completions / possible) * 100 : 0
+          return next
+        })
+      })
+      source.addEventListener('resync', () => {
+        queryClient.invalidateQueries({ queryKey: ['adminDashboard'] })
+      })
+      // EventSource would retry with the spent ticket and give up on the 401; reopen with a new one
+      source.onerror = () => {
+        source?.close()
+        reconnectLater()
+      }
+    }
+
+    connect()
+    return () => {
+      stopped = true
+      clearTimeout(retryTimer)
+      source?.close()
+    }
+  }, [currentUser?.role, queryClient])
+
   // Fetch all users
   const { data: users, isLoading: usersLoading, error: usersError } = useQuery({
     queryKey: ['adminUsers'],
@@ -96,8 +159,11 @@ export function AdminDashboard() {
           <h1 className="text-3xl font-bold text-gray-900">Admin Dashboard</h1>
           <p className="text-gray-600">Manage users and monitor platform activity</p>
         </div>
-        <div className="text-sm text-gray-500">
-          Welcome, {currentUser?.username} (Admin)
+        <div className="text-sm text-gray-500 text-right">
+          <div>Welcome, {currentUser?.username} (Admin)</div>
+          {streamReconnecting && (
+            <div className="text-amber-600">Live updates interrupted, reconnecting…</div>
+          )}
         </div>
       </div>
 